@@ -1,38 +1,70 @@
 """
 API endpoint for predictive escalation analysis
 """
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import time
+from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Dict, Any
 from pydantic import BaseModel
-from ..ml.predictive_escalation import escalation_model
-from ..database import get_db
+from ml.predictive_escalation import escalation_model, parse_horizons
+from ml.risk_grid import risk_grid
+from core.database import get_db
 from sqlalchemy.orm import Session
 
-router = APIRouter(prefix="/ml/predict", tags=["ML Prediction"])
+# Mounted by routers/ml.py, so the routes live under /api/ml/predict
+router = APIRouter(prefix="/predict", tags=["ML Prediction"])
 
 class EscalationRequest(BaseModel):
     reports: List[Dict[str, Any]]
     location: Dict[str, float]  # {"latitude": float, "longitude": float}
-    time_horizon: str = "24h"  # "6h", "12h", "24h", "48h"
+    time_horizon: str = "24h"  # "6h", "12h", "24h", "48h", or a list such as "6h,36h,72h"
+    polygon_points: int = 16
+
+class EscalationBatchItem(BaseModel):
+    location: Dict[str, float]  # {"latitude": float, "longitude": float}
+    reports: List[Dict[str, Any]] = []
+
+class BatchEscalationRequest(BaseModel):
+    items: List[EscalationBatchItem]
+    time_horizon: str = "24h"
+    polygon_points: int = 16
+
+class EscalationOutcomeRequest(BaseModel):
+    reports: List[Dict[str, Any]]
+    outcomes: List[Dict[str, Any]]  # {"escalated": bool}, one per report
 
 class TrustScoreRequest(BaseModel):
     user_id: str
     include_recommendations: bool = True
+    audit: bool = False  # full recompute from the event history instead of the running aggregates
+
+def _horizons(time_horizon: str) -> List[int]:
+    try:
+        return parse_horizons(time_horizon)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid time_horizon: {time_horizon}")
+
+def _polygon_points(points: int) -> int:
+    if not 3 <= points <= 360:
+        raise HTTPException(status_code=400, detail="polygon_points must be between 3 and 360")
+    return points
 
 @router.post("/escalation")
 async def predict_escalation(request: EscalationRequest, db: Session = Depends(get_db)):
     """Predict hazard escalation probability and affected zones"""
+    horizons = _horizons(request.time_horizon)
+    polygon_points = _polygon_points(request.polygon_points)
     try:
         location = (request.location["latitude"], request.location["longitude"])
         
         # Get prediction from ML model
-        prediction = await escalation_model.predict_escalation(request.reports, location)
+        prediction = await escalation_model.predict_escalation(request.reports, location, horizons, polygon_points)
         
         return {
             "success": True,
             "prediction": prediction,
             "metadata": {
-                "model_version": "1.0",
+                "model_version": escalation_model.model_version,
                 "prediction_id": f"pred_{int(time.time())}",
                 "input_reports": len(request.reports)
             }
@@ -41,38 +73,80 @@ async def predict_escalation(request: EscalationRequest, db: Session = Depends(g
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
-@router.post("/trust-score")
-async def calculate_trust_score(request: TrustScoreRequest, db: Session = Depends(get_db)):
-    """Calculate trust score for a user"""
+@router.post("/escalation/batch")
+async def predict_escalation_batch(request: BatchEscalationRequest, db: Session = Depends(get_db)):
+    """Predict escalation for many locations (e.g. every active cluster) in one model pass"""
+    horizons = _horizons(request.time_horizon)
+    polygon_points = _polygon_points(request.polygon_points)
     try:
-        from ..ml.trust_score_engine import trust_engine, TrustEvent, ReportType
-        from datetime import datetime, timedelta
+        locations = [(item.location["latitude"], item.location["longitude"]) for item in request.items]
+        reports_by_location = [item.reports for item in request.items]
         
-        # Mock trust events (in production, fetch from database)
-        mock_events = [
-            TrustEvent(
-                user_id=request.user_id,
-                event_type=ReportType.VERIFIED_CORRECT,
-                timestamp=datetime.utcnow() - timedelta(days=5),
-                confidence=0.9,
-                report_complexity=0.7,
-                verification_source="analyst",
-                location_accuracy=0.95,
-                time_to_verify=timedelta(hours=2)
-            ),
-            TrustEvent(
-                user_id=request.user_id,
-                event_type=ReportType.VERIFIED_CORRECT,
-                timestamp=datetime.utcnow() - timedelta(days=10),
-                confidence=0.85,
-                report_complexity=0.5,
-                verification_source="volunteer",
-                location_accuracy=0.8,
-                time_to_verify=timedelta(hours=4)
-            )
-        ]
+        predictions = await escalation_model.predict_escalation_many(
+            locations, reports_by_location, horizons, polygon_points
+        )
         
-        trust_data = trust_engine.calculate_trust_score(request.user_id, mock_events)
+        return {
+            "success": True,
+            "predictions": [
+                {"location": item.location, "prediction": prediction}
+                for item, prediction in zip(request.items, predictions)
+            ],
+            "metadata": {
+                "model_version": escalation_model.model_version,
+                "prediction_id": f"pred_batch_{int(time.time())}",
+                "locations": len(locations),
+                "input_reports": sum(len(reports) for reports in reports_by_location)
+            }
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+
+@router.post("/escalation/outcomes")
+async def record_escalation_outcomes(request: EscalationOutcomeRequest):
+    """Feed observed outcomes back to the escalation model; retraining happens in the background"""
+    if len(request.reports) != len(request.outcomes):
+        raise HTTPException(status_code=400, detail="reports and outcomes must be the same length")
+    result = await escalation_model.update_model(request.reports, request.outcomes)
+    return {"success": "error" not in result, **result}
+
+@router.get("/escalation/risk")
+async def get_escalation_risk(latitude: float = Query(...), longitude: float = Query(...)):
+    """Precomputed escalation risk at a point, served from the risk grid without running the model"""
+    risk = risk_grid.lookup(latitude, longitude)
+    if risk is None:
+        raise HTTPException(status_code=404, detail="No precomputed risk for this location")
+    return {"success": True, "risk": risk}
+
+@router.get("/escalation/risk/bbox")
+async def get_escalation_risk_bbox(
+    min_lat: float = Query(...),
+    min_lon: float = Query(...),
+    max_lat: float = Query(...),
+    max_lon: float = Query(...)
+):
+    """Precomputed escalation risk for every grid cell in a bounding box"""
+    try:
+        risk = risk_grid.lookup_bbox(min_lat, min_lon, max_lat, max_lon)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if risk is None:
+        raise HTTPException(status_code=404, detail="No precomputed risk for this area")
+    return {"success": True, "risk": risk}
+
+@router.post("/trust-score")
+async def calculate_trust_score(request: TrustScoreRequest):
+    """Trust score of a user from the persisted aggregates, or recomputed from
+    their trust_events log when `audit` is set"""
+    try:
+        from app.services.trust import trust_engine, load_user_trust_events
+        
+        if request.audit:
+            events = await asyncio.to_thread(load_user_trust_events, request.user_id)
+            trust_data = trust_engine.calculate_trust_score(request.user_id, events)
+        else:
+            trust_data = await asyncio.to_thread(trust_engine.get_trust_score, request.user_id)
         
         if request.include_recommendations:
             trust_data["recommendations"] = trust_engine.get_recommendations(trust_data)
@@ -94,8 +168,11 @@ async def get_model_status():
             "escalation_model": {
                 "loaded": escalation_model.is_trained,
                 "last_updated": "2025-01-19T10:00:00Z",
-                "version": "1.0"
+                "version": escalation_model.model_version,
+                "replay_buffer_size": len(escalation_model.replay_buffer),
+                "weather": escalation_model.weather.stats()
             },
+            "risk_grid": risk_grid.status(),
             "trust_engine": {
                 "loaded": True,
                 "version": "1.0"
@@ -38,10 +38,91 @@ class Settings(BaseSettings):
     # MSG91 for mass SMS
     msg91_api_key: str = ""
     
+    # Notification dispatch (per-provider quotas)
+    sms_rate_per_second: float = 100.0
+    sms_concurrency: int = 20
+    sms_batch_size: int = 100  # Numbers per MSG91 bulk request
+    push_rate_per_second: float = 1000.0
+    push_concurrency: int = 10
+    push_batch_size: int = 500  # FCM multicast limit
+    email_rate_per_second: float = 14.0
+    email_concurrency: int = 5
+    notification_max_attempts: int = 4
+    notification_retry_base_seconds: float = 0.5
+    notification_claim_seconds: int = 300  # A recipient claimed but not marked sent is retried after this
+    notification_delivery_retention_days: int = 7  # Delivery records (the cross-worker dedup) kept this long
+    notification_max_failure_ratio: float = 0.05  # Above this share of failed sends the alert is retried
+    alert_recipient_buffer_m: float = 0.0  # Also alert users this close to the zone edge
+    alert_recipient_chunk_size: int = 5000  # Rows per server-side cursor fetch
+    
+    # Alert outbox workers
+    outbox_batch_size: int = 20  # Rows claimed per poll
+    outbox_concurrency: int = 5  # Alerts delivered in parallel per worker
+    outbox_poll_seconds: float = 1.0
+    outbox_lease_seconds: int = 900  # Processing rows not heartbeated for this long are reclaimed
+    outbox_heartbeat_seconds: float = 60.0  # Lease extension interval while delivering; well below the lease
+    outbox_delivery_timeout_seconds: float = 3600.0  # A delivery still running after this is abandoned and retried
+    outbox_max_attempts: int = 5
+    outbox_retry_base_seconds: float = 10.0
+
+    # Nightly bulk trust recompute (python -m app.services.trust)
+    trust_recompute_fetch_size: int = 100000  # trust_events rows per cursor fetch
+    trust_recompute_write_batch: int = 5000  # users (aggregate state included) per bulk UPDATE statement
+
+    # Reporter credibility cache used by report scoring
+    credibility_cache_ttl_seconds: float = 300.0
+    credibility_cache_size: int = 50000
+
+    # Live spatial index of recent reports/social posts (density and corroboration features)
+    activity_index_precision: int = 5  # Geohash length of a bucket, ~5 km cells
+    activity_index_bucket_capacity: int = 256  # Points kept per bucket ring buffer
+    activity_index_window_minutes: float = 180.0  # Longest window a query may ask for
+    density_radius_km: float = 5.0
+    density_window_minutes: float = 60.0
+    density_saturation_reports: int = 10  # Nearby reports for a location density of 1.0
+    corroboration_radius_km: float = 10.0
+    corroboration_window_minutes: float = 120.0
+    corroboration_saturation_posts: int = 5  # Nearby posts for a social corroboration of 1.0
+    
     # Thresholds
     threat_confidence_auto_alert: float = 0.75
     cluster_eps_meters: int = 500
     cluster_min_points: int = 3
+    cluster_time_window_hours: int = 3
+    zone_match_min_iou: float = 0.3  # Overlap needed for a cluster to update an existing zone
+    
+    # WebSocket delivery
+    websocket_queue_size: int = 256  # Outbound messages buffered per client
+    websocket_slow_consumer_policy: str = "drop_oldest"  # "drop_oldest", "coalesce" or "disconnect"
+    websocket_send_timeout_seconds: float = 5.0
+    websocket_subscription_cell_degrees: float = 1.0  # Grid cell size of the subscription index
+    websocket_unsubscribed_receive_all: bool = True  # Clients without a subscription get every event
+    websocket_batch_window_ms: int = 50  # Events within this window share one frame; 0 disables batching
+    websocket_replay_buffer_size: int = 1024  # Events kept for resume-from-seq
+    snapshot_report_window_hours: int = 6  # High-priority reports kept in the connect snapshot
+    snapshot_alert_window_hours: int = 24
+    snapshot_max_reports: int = 200
+    realtime_bus: str = "redis"  # "redis" to fan out across workers, "memory" for a single process
+    realtime_channel: str = "atlas-alert:realtime"
+    
+    # Vector tiles
+    tile_cache_size: int = 2048
+    tile_report_window_hours: int = 24
+    tile_report_refresh_seconds: int = 30
+    tile_version_max_age_seconds: int = 300  # Zone/hotspot versions roll over this often even without a bump
+    tile_aggregate_below_zoom: int = 12  # Report points are grid-aggregated below this zoom
+    tile_cluster_cell_px: int = 256  # Aggregation cell size in tile units (4096 per tile)
+    
+    # Time partitioning of append-only tables
+    partition_interval: str = "daily"  # "daily" or "weekly"
+    partition_premake: int = 7  # Future partitions kept ready ahead of now()
+    partition_retention_days: Dict[str, int] = {
+        "reports": 365,
+        "social_posts": 90,
+        "live_locations": 14
+    }
+    partition_archive_schema: str = "archive"  # Empty string drops expired partitions
+    partition_maintenance_minutes: int = 60
     
     # Authority contacts
     authority_contacts: Dict[str, Dict[str, Any]] = {
@@ -7,24 +7,31 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 import os
+import asyncio
 from contextlib import asynccontextmanager
 
 from .database import engine, Base, init_postgis
-from .routers import reports, social, alerts, admin, websocket, hotspots
+from .routers import reports, social, alerts, admin, websocket, hotspots, tiles
 from .config import settings
-from .websocket_manager import WebSocketManager
-
-# WebSocket manager instance
-websocket_manager = WebSocketManager()
+from .websocket_manager import websocket_manager
+from .services.partitioning import run_partition_maintenance, partition_maintenance_loop
+from .services.activity_index import load_recent_activity
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     init_postgis()
     Base.metadata.create_all(bind=engine)
+    # Partitioned tables reject inserts until their partitions exist
+    run_partition_maintenance()
+    maintenance_task = asyncio.create_task(partition_maintenance_loop())
+    # Density/corroboration features need the recent window after a restart
+    load_recent_activity()
+    await websocket_manager.start()
     yield
     # Shutdown
-    pass
+    maintenance_task.cancel()
+    await websocket_manager.stop()
 
 app = FastAPI(
     title="Atlas-Alert API",
@@ -49,6 +56,7 @@ app.include_router(alerts.router, prefix="/api")
 app.include_router(admin.router, prefix="/api")
 app.include_router(websocket.router, prefix="/api")
 app.include_router(hotspots.router, prefix="/api")
+app.include_router(tiles.router, prefix="/api")
 
 # WebSocket endpoint for real-time updates
 @app.websocket("/ws/realtime")
@@ -57,7 +65,7 @@ async def websocket_endpoint(websocket: WebSocket):
     try:
         while True:
             data = await websocket.receive_text()
-            # Handle incoming messages if needed
+            await websocket_manager.handle_client_message(websocket, data)
     except WebSocketDisconnect:
         websocket_manager.disconnect(websocket)
 
@@ -67,7 +75,11 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "database": "connected"}
+    return {
+        "status": "healthy",
+        "database": "connected",
+        "websocket": websocket_manager.get_metrics()
+    }
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -3,16 +3,23 @@ SQLAlchemy ORM models with PostGIS support
 Atlas-Alert database schema
 """
 
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON, ARRAY
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, JSON, ARRAY, Index
+from sqlalchemy import text as sa_text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from geoalchemy2 import Geography
 from geoalchemy2.elements import WKTElement
 import uuid
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 
 from ..database import Base
 
+# Clustering only reads rows above this confidence; the partial indexes below
+# must use the same literal so the planner can match them. Migrations 001 and
+# 002 create those indexes with it too, so changing it means a new migration
+# that rebuilds them.
+CLUSTER_CONFIDENCE_THRESHOLD = 0.4
+
 
 # -------------------- Helper Functions --------------------
 def point(lat: float, lon: float) -> WKTElement:
@@ -48,7 +55,8 @@ class User(Base):
 class Report(Base):
     __tablename__ = "reports"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Range-partitioned on created_at, so it is part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"))
     source = Column(String(50))
     hazard_type = Column(String(100))
@@ -62,18 +70,34 @@ class Report(Base):
     verified = Column(Boolean, default=False)
     status = Column(String(50), default="pending")
     report_scores = Column(JSON)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
     user = relationship("User", back_populates="reports")
-    alerts = relationship("Alert", back_populates="report")
+    alerts = relationship(
+        "Alert",
+        primaryjoin="Report.id == foreign(Alert.report_id)",
+        back_populates="report",
+    )
+
+    # geom gets its GIST index from geoalchemy2 (spatial_index=True)
+    __table_args__ = (
+        Index("ix_reports_created_at_brin", "created_at", postgresql_using="brin"),
+        Index(
+            "ix_reports_cluster_candidates",
+            "created_at",
+            postgresql_where=sa_text(f"confidence >= {CLUSTER_CONFIDENCE_THRESHOLD}"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
 
 class SocialPost(Base):
     __tablename__ = "social_posts"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Range-partitioned on created_at, so it is part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     platform = Column(String(50))
     post_id = Column(String(255))
     author_handle = Column(String(255))
@@ -89,7 +113,17 @@ class SocialPost(Base):
     keywords = Column(ARRAY(String))
     processed = Column(Boolean, default=False)
     outreach_sent = Column(Boolean, default=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_social_posts_created_at_brin", "created_at", postgresql_using="brin"),
+        Index(
+            "ix_social_posts_cluster_candidates",
+            "created_at",
+            postgresql_where=sa_text(f"relevance >= {CLUSTER_CONFIDENCE_THRESHOLD} AND geom IS NOT NULL"),
+        ),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
 
 class Zone(Base):
@@ -109,13 +143,23 @@ class Zone(Base):
 
     alerts = relationship("Alert", back_populates="zone")
 
+    __table_args__ = (
+        Index(
+            "ix_zones_active_ranking",
+            sa_text("avg_confidence DESC"),
+            sa_text("created_at DESC"),
+            postgresql_where=sa_text("active"),
+        ),
+    )
+
 
 class Alert(Base):
     __tablename__ = "alerts"
 
     id = Column(Integer, primary_key=True, index=True)
     zone_id = Column(Integer, ForeignKey("zones.id"), nullable=True)
-    report_id = Column(Integer, ForeignKey("reports.id"), nullable=True)
+    # No FK constraint: reports is partitioned and its key includes created_at
+    report_id = Column(Integer, nullable=True)
     message = Column(Text)
     channels = Column(ARRAY(String))
     status = Column(String(50), default="pending")
@@ -124,7 +168,46 @@ class Alert(Base):
     issued_at = Column(DateTime(timezone=True), server_default=func.now())
 
     zone = relationship("Zone", back_populates="alerts")
-    report = relationship("Report", back_populates="alerts")
+    report = relationship(
+        "Report",
+        primaryjoin="Report.id == foreign(Alert.report_id)",
+        back_populates="alerts",
+    )
+
+
+class AlertOutbox(Base):
+    """Delivery work for an alert, written in the same transaction as the alert"""
+    __tablename__ = "alert_outbox"
+
+    id = Column(Integer, primary_key=True)
+    alert_id = Column(Integer, ForeignKey("alerts.id", ondelete="CASCADE"), nullable=False)
+    status = Column(String(20), default="pending", nullable=False)  # pending, processing, done, failed
+    attempts = Column(Integer, default=0, nullable=False)
+    available_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    locked_by = Column(String(100))
+    locked_at = Column(DateTime(timezone=True))
+    last_error = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Workers only ever scan claimable rows
+        Index(
+            "ix_alert_outbox_claimable",
+            "available_at",
+            "id",
+            postgresql_where=sa_text("status IN ('pending', 'processing')"),
+        ),
+    )
+
+
+class NotificationDelivery(Base):
+    """One recipient of one notification, keyed by the dispatcher's idempotency key"""
+    __tablename__ = "notification_deliveries"
+
+    key = Column(String(255), primary_key=True)
+    status = Column(String(20), default="claimed", nullable=False)  # claimed, sent
+    claimed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    sent_at = Column(DateTime(timezone=True))
 
 
 class Team(Base):
@@ -143,15 +226,21 @@ class Team(Base):
 class LiveLocation(Base):
     __tablename__ = "live_locations"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Range-partitioned on timestamp, so it is part of the primary key
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     team_id = Column(Integer, ForeignKey("teams.id"))
     lat = Column(Float)
     lon = Column(Float)
     geom = Column(Geography('POINT', srid=4326))
-    timestamp = Column(DateTime(timezone=True), server_default=func.now())
+    timestamp = Column(DateTime(timezone=True), primary_key=True, server_default=func.now())
 
     team = relationship("Team", back_populates="live_locations")
 
+    __table_args__ = (
+        Index("ix_live_locations_timestamp_brin", "timestamp", postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (timestamp)"},
+    )
+
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -171,10 +260,37 @@ class SocialOutreach(Base):
     __tablename__ = "social_outreach"
 
     id = Column(Integer, primary_key=True, index=True)
-    social_post_id = Column(Integer, ForeignKey("social_posts.id"))
+    # No FK constraint: social_posts is partitioned and its key includes created_at
+    social_post_id = Column(Integer)
     outreach_type = Column(String(50))
     status = Column(String(50), default="pending")
     message_sent = Column(Text)
     response_received = Column(Text)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     responded_at = Column(DateTime(timezone=True))
+
+
+class UserTrustAggregate(Base):
+    """Running trust aggregates per reporter (ml/trust_score_engine.TrustAggregate)"""
+    __tablename__ = "user_trust_aggregates"
+
+    user_id = Column(String(64), primary_key=True)
+    state = Column(JSONB, nullable=False)
+    trust_score = Column(Float)
+    confidence = Column(Float)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TrustEventRecord(Base):
+    """Append-only log of trust events, read back in bulk by the nightly recompute"""
+    __tablename__ = "trust_events"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(String(64), nullable=False, index=True)
+    event_type = Column(String(50), nullable=False)
+    timestamp = Column(DateTime(timezone=True), nullable=False)
+    confidence = Column(Float)
+    report_complexity = Column(Float)
+    verification_source = Column(String(50))
+    location_accuracy = Column(Float)
+    time_to_verify_seconds = Column(Float)
@@ -0,0 +1,90 @@
+"""
+Warm-up of the realtime connect snapshot from the app database
+"""
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from realtime.snapshot import RealtimeSnapshot
+
+ACTIVE_ZONES_QUERY = text("""
+    SELECT
+        id AS zone_id,
+        type,
+        avg_confidence AS confidence,
+        report_count,
+        radius_km,
+        zone_metadata,
+        ST_XMin(geom::geometry) AS min_lon,
+        ST_YMin(geom::geometry) AS min_lat,
+        ST_XMax(geom::geometry) AS max_lon,
+        ST_YMax(geom::geometry) AS max_lat
+    FROM zones
+    WHERE active
+""")
+
+RECENT_REPORTS_QUERY = text("""
+    SELECT id, hazard_type, lat, lon, severity, created_at
+    FROM reports
+    WHERE created_at >= now() - make_interval(hours => :window_hours)
+        AND severity IN ('high', 'critical')
+    ORDER BY created_at DESC
+    LIMIT :max_reports
+""")
+
+ACTIVE_ALERTS_QUERY = text("""
+    SELECT id, zone_id, report_id, message, channels, status, issued_at
+    FROM alerts
+    WHERE issued_at >= now() - make_interval(hours => :window_hours)
+        AND status NOT IN ('resolved', 'cancelled', 'expired', 'closed')
+    ORDER BY issued_at DESC
+""")
+
+def warm_snapshot(snapshot: RealtimeSnapshot, db: Session):
+    """Load active zones, recent high-priority reports and active alerts into `snapshot`"""
+    now = time.time()
+
+    zones = []
+    for row in db.execute(ACTIVE_ZONES_QUERY):
+        metadata = row.zone_metadata or {}
+        zones.append({
+            "zone_id": row.zone_id,
+            "type": row.type,
+            "confidence": row.confidence,
+            "report_count": row.report_count,
+            "radius_km": row.radius_km,
+            "bbox": [row.min_lon, row.min_lat, row.max_lon, row.max_lat],
+            "hazard_types": metadata.get("hazard_types")
+        })
+
+    rows = db.execute(RECENT_REPORTS_QUERY, {
+        "window_hours": snapshot.report_window_seconds // 3600,
+        "max_reports": snapshot.max_reports
+    }).fetchall()
+    reports = [
+        (row.created_at.timestamp(), {
+            "id": row.id,
+            "hazard_type": row.hazard_type,
+            "lat": row.lat,
+            "lon": row.lon,
+            "severity": row.severity
+        })
+        for row in reversed(rows)
+    ]
+
+    rows = db.execute(ACTIVE_ALERTS_QUERY, {"window_hours": snapshot.alert_window_seconds // 3600}).fetchall()
+    alerts = [
+        (row.issued_at.timestamp() if row.issued_at else now, {
+            "id": row.id,
+            "zone_id": row.zone_id,
+            "report_id": row.report_id,
+            "message": row.message,
+            "channels": row.channels,
+            "status": row.status,
+            "issued_at": row.issued_at.isoformat() if row.issued_at else None
+        })
+        for row in reversed(rows)
+    ]
+
+    snapshot.load(zones, reports, alerts)
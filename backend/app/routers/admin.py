@@ -7,7 +7,8 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from ..database import get_db
-from ..models.db_models import Team, LiveLocation, Zone, Report, Alert
+from ..models.db_models import Team, LiveLocation, Zone, Report, Alert, point
+from ..services.vector_tiles import tile_cache
 from ..models.schemas import TeamCreate, LiveLocationUpdate, ZoneCreate, AnalyticsResponse
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
@@ -46,13 +47,11 @@ def assign_team_to_zone(team_id: int, zone_id: int, db: Session = Depends(get_db
 @router.post("/live_locations")
 def update_live_location(location: LiveLocationUpdate, db: Session = Depends(get_db)):
     """Update team live location"""
-    from sqlalchemy import text
-    
     db_location = LiveLocation(
         team_id=location.team_id,
         lat=location.lat,
         lon=location.lon,
-        geom=text(f"ST_SetSRID(ST_Point({location.lon}, {location.lat}), 4326)")
+        geom=point(location.lat, location.lon)
     )
     
     db.add(db_location)
@@ -80,6 +79,7 @@ def create_zone(zone: ZoneCreate, db: Session = Depends(get_db)):
         db.add(db_zone)
         db.commit()
         db.refresh(db_zone)
+        tile_cache.bump("zones")
         
         return {"zone_id": db_zone.id, "status": "created"}
         
@@ -2,26 +2,44 @@
 Alerts API endpoints
 Handles alert creation and notification management
 """
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import text
+from typing import List, Optional
 
 from ..database import get_db
-from ..models.db_models import Alert, Zone, Report
+from ..models.db_models import Alert, AlertOutbox, Zone, Report
 from ..models.schemas import AlertCreate, AlertResponse
-from ..services.notification import send_alert_notifications
+from ..websocket_manager import websocket_manager
 
 router = APIRouter(prefix="/alerts", tags=["Alerts"])
 
+ZONE_BBOX_QUERY = text("""
+    SELECT ST_XMin(geom::geometry) AS min_lon, ST_YMin(geom::geometry) AS min_lat,
+           ST_XMax(geom::geometry) AS max_lon, ST_YMax(geom::geometry) AS max_lat
+    FROM zones
+    WHERE id = :zone_id AND geom IS NOT NULL
+""")
+
+def _alert_location(db: Session, zone: Optional[Zone], report: Optional[Report]) -> dict:
+    """Routing fields of an alert: the zone's bounds, else the report's point"""
+    if zone is not None:
+        bounds = db.execute(ZONE_BBOX_QUERY, {"zone_id": zone.id}).first()
+        if bounds is not None:
+            return {"bbox": [bounds.min_lon, bounds.min_lat, bounds.max_lon, bounds.max_lat]}
+    if report is not None and report.lat is not None and report.lon is not None:
+        return {"lat": report.lat, "lon": report.lon}
+    return {}
+
 @router.post("/issue", response_model=AlertResponse)
 async def issue_alert(
     alert: AlertCreate,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Issue an alert for a zone or report"""
     try:
         # Validate zone or report exists
+        zone = report = None
         if alert.zone_id:
             zone = db.query(Zone).filter(Zone.id == alert.zone_id).first()
             if not zone:
@@ -42,11 +60,24 @@ async def issue_alert(
         )
         
         db.add(db_alert)
+        db.flush()
+        
+        # Delivery is queued in the same transaction; outbox workers send it
+        db.add(AlertOutbox(alert_id=db_alert.id))
         db.commit()
         db.refresh(db_alert)
         
-        # Send notifications in background
-        background_tasks.add_task(send_alert_notifications, db_alert.id)
+        # Realtime clients (and their connect snapshot) see the alert immediately
+        await websocket_manager.broadcast_alert_issued({
+            "id": db_alert.id,
+            "zone_id": db_alert.zone_id,
+            "report_id": db_alert.report_id,
+            "message": db_alert.message,
+            "channels": db_alert.channels,
+            "status": db_alert.status,
+            "issued_at": db_alert.issued_at.isoformat() if db_alert.issued_at else None,
+            **_alert_location(db, zone, report)
+        })
         
         return db_alert
         
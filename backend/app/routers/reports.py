@@ -9,13 +9,15 @@ from typing import List, Optional
 from geoalchemy2.functions import ST_SetSRID, ST_Point
 
 from ..database import get_db
-from ..models.db_models import Report, User
+from ..models.db_models import Report, User, point
 from ..models.schemas import ReportCreate, ReportResponse
 from ..services.ml_scoring import score_report_async
-from ..websocket_manager import WebSocketManager
+from ..services.vector_tiles import tile_cache
+from ..services.trust import record_report_outcome
+from ..services.credibility import credibility_cache
+from ..websocket_manager import websocket_manager
 
 router = APIRouter(tags=["Reports"])
-websocket_manager = WebSocketManager()
 
 @router.post("/", response_model=dict)
 async def create_report(
@@ -37,23 +39,25 @@ async def create_report(
             severity=report.severity
         )
         
-        # Set PostGIS geometry
-        db_report.geom = text(f"ST_SetSRID(ST_Point({report.lon}, {report.lat}), 4326)")
+        # Set PostGIS geometry (bound as EWKT, clustering reads this column)
+        db_report.geom = point(report.lat, report.lon)
         
         db.add(db_report)
         db.commit()
         db.refresh(db_report)
+        tile_cache.bump("reports")
         
         # Enqueue ML scoring task
         background_tasks.add_task(score_report_async, db_report.id)
         
-        # Broadcast new report via WebSocket
+        # Broadcast new report via WebSocket; every worker's activity index picks it up from the bus
         await websocket_manager.broadcast_new_report({
             "id": db_report.id,
             "hazard_type": db_report.hazard_type,
             "lat": db_report.lat,
             "lon": db_report.lon,
-            "severity": db_report.severity
+            "severity": db_report.severity,
+            "created_at": db_report.created_at.isoformat() if db_report.created_at else None
         })
         
         return {"id": db_report.id, "status": "pending"}
@@ -115,9 +119,16 @@ def verify_report(report_id: int, db: Session = Depends(get_db)):
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     
-    report.verified = True
-    report.status = "verified"
+    # Conditional update, so repeated or concurrent verifications count only once
+    # towards credibility and trust
+    updated = db.query(Report).filter(Report.id == report_id, Report.verified.isnot(True)).update(
+        {"verified": True, "status": "verified"}, synchronize_session=False
+    )
     db.commit()
+    if not updated:
+        return {"status": "verified", "report_id": report_id}
+    db.refresh(report)
+    tile_cache.bump("reports")
     
     # Update user credibility
     if report.user_id:
@@ -125,5 +136,7 @@ def verify_report(report_id: int, db: Session = Depends(get_db)):
         if user:
             user.credibility_score = min(1.0, user.credibility_score + 0.1)
             db.commit()
+        record_report_outcome(report)
+        credibility_cache.invalidate(report.user_id)
     
     return {"status": "verified", "report_id": report_id}
@@ -8,10 +8,11 @@ from sqlalchemy import text
 from typing import List, Optional
 
 from ..database import get_db
-from ..models.db_models import SocialPost
+from ..models.db_models import SocialPost, point
 from ..models.schemas import SocialPostCreate, SocialPostResponse
 from ..services.nlp_processor import process_social_post
 from ..services.chatbot import trigger_outreach
+from ..websocket_manager import websocket_manager
 
 router = APIRouter(prefix="/social", tags=["Social Media"])
 
@@ -36,11 +37,19 @@ async def ingest_post(
         
         # Set geometry if coordinates available
         if post.lat and post.lon:
-            db_post.geom = text(f"ST_SetSRID(ST_Point({post.lon}, {post.lat}), 4326)")
+            db_post.geom = point(post.lat, post.lon)
         
         db.add(db_post)
         db.commit()
         db.refresh(db_post)
+        posted_at = db_post.posted_at or db_post.created_at
+        # Indexed by every worker's activity index from the bus
+        await websocket_manager.publish("new_social_post", {
+            "id": db_post.id,
+            "lat": db_post.lat,
+            "lon": db_post.lon,
+            "posted_at": posted_at.isoformat() if posted_at else None
+        })
         
         # Process with NLP in background
         background_tasks.add_task(process_social_post, db_post.id)
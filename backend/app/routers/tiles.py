@@ -0,0 +1,33 @@
+"""
+Vector tile API endpoints
+Serves reports, zones and hotspots as Mapbox vector tiles for the live map
+"""
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from ..database import get_db
+from ..services.vector_tiles import LAYERS, render_tile, tile_cache, valid_tile
+
+router = APIRouter(prefix="/tiles", tags=["Tiles"])
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+@router.get("/{layer}/{z}/{x}/{y}.mvt")
+def get_tile(layer: str, z: int, x: int, y: int, request: Request, db: Session = Depends(get_db)):
+    """Get one vector tile of a map layer"""
+    if layer not in LAYERS:
+        raise HTTPException(status_code=404, detail="Unknown layer")
+    if not valid_tile(z, x, y):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+    
+    # Clients revalidate with the layer version; unchanged tiles cost no query
+    etag = f'"{layer}-{tile_cache.version(layer)}-{z}-{x}-{y}"'
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=15"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    tile, _ = render_tile(db, layer, z, x, y)
+    if not tile:
+        return Response(status_code=204, headers=headers)
+    
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers=headers)
@@ -3,10 +3,9 @@ WebSocket API endpoints
 Real-time communication endpoints
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from ..websocket_manager import WebSocketManager
+from ..websocket_manager import websocket_manager
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
-websocket_manager = WebSocketManager()
 
 @router.websocket("/realtime")
 async def websocket_endpoint(websocket: WebSocket):
@@ -14,9 +13,8 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket_manager.connect(websocket)
     try:
         while True:
-            # Keep connection alive and handle incoming messages
+            # Keep connection alive and handle subscribe/unsubscribe messages
             data = await websocket.receive_text()
-            # Echo back for testing
-            await websocket_manager.send_personal_message(f"Echo: {data}", websocket)
+            await websocket_manager.handle_client_message(websocket, data)
     except WebSocketDisconnect:
         websocket_manager.disconnect(websocket)
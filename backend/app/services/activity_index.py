@@ -0,0 +1,66 @@
+"""
+The app's live activity index (ml/activity_index.py) configured from settings
+Every worker indexes each new report and social post from the realtime bus;
+load_recent_activity fills the index from the database after a restart.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from ml.activity_index import REPORTS, SOCIAL, RecentActivityIndex
+from ..config import settings
+from ..database import SessionLocal
+from ..websocket_manager import websocket_manager
+
+RECENT_ACTIVITY_QUERY = {
+    REPORTS: text("""
+        SELECT extract(epoch FROM created_at) AS ts, lat, lon FROM reports
+        WHERE created_at >= :since AND lat IS NOT NULL AND lon IS NOT NULL
+    """),
+    SOCIAL: text("""
+        SELECT extract(epoch FROM coalesce(posted_at, created_at)) AS ts, lat, lon FROM social_posts
+        WHERE created_at >= :since AND lat IS NOT NULL AND lon IS NOT NULL
+    """)
+}
+
+activity_index = RecentActivityIndex(
+    precision=settings.activity_index_precision,
+    bucket_capacity=settings.activity_index_bucket_capacity,
+    max_window_minutes=settings.activity_index_window_minutes
+)
+
+def _index_report(data: dict):
+    activity_index.add_report(data.get("lat"), data.get("lon"), data.get("created_at"))
+
+def _index_social_post(data: dict):
+    activity_index.add_social_post(data.get("lat"), data.get("lon"), data.get("posted_at"))
+
+websocket_manager.add_listener("new_report", _index_report)
+websocket_manager.add_listener("new_social_post", _index_social_post)
+
+def corroboration_features(lat: Optional[float], lon: Optional[float], now=None) -> Dict:
+    """Nearby report and social post counts plus the 0-1 density and
+    corroboration features derived from them"""
+    return activity_index.corroboration_features(
+        lat, lon, now,
+        density_radius_km=settings.density_radius_km,
+        density_window_minutes=settings.density_window_minutes,
+        density_saturation_reports=settings.density_saturation_reports,
+        corroboration_radius_km=settings.corroboration_radius_km,
+        corroboration_window_minutes=settings.corroboration_window_minutes,
+        corroboration_saturation_posts=settings.corroboration_saturation_posts
+    )
+
+def load_recent_activity() -> Dict[str, int]:
+    """Fill the index from the last window of reports and posts, e.g. after a restart"""
+    since = datetime.now(timezone.utc) - timedelta(seconds=activity_index.max_window_seconds)
+    loaded: Dict[str, int] = {}
+    db = SessionLocal()
+    try:
+        for kind, query in RECENT_ACTIVITY_QUERY.items():
+            rows: List = db.execute(query, {"since": since}).fetchall()
+            for row in rows:
+                activity_index.add(kind, row.lat, row.lon, row.ts)
+            loaded[kind] = len(rows)
+    finally:
+        db.close()
+    return loaded
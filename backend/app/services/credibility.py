@@ -0,0 +1,166 @@
+"""
+Read-through cache of reporter credibility for report scoring
+One entry per user blends User.credibility_score with the trust engine
+score from user_trust_aggregates; misses of a whole scoring batch are
+loaded with a single query, and verify_report invalidates the reporter on
+every worker through the realtime bus. While the bus is down other workers
+serve the old entry for at most the cache TTL.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..config import settings
+from ..websocket_manager import websocket_manager
+from .trust import trust_engine
+
+DEFAULT_CREDIBILITY = 0.5
+
+# Roles whose reports count as coming from a verified reporter
+VERIFIED_ROLES = ("analyst", "admin")
+
+CREDIBILITY_QUERY = text("""
+    SELECT u.id::text AS user_id, u.credibility_score, u.role,
+           a.trust_score, a.confidence, a.state -> 'counts' AS counts, (a.state ->> 'total')::int AS total
+    FROM users u
+    LEFT JOIN user_trust_aggregates a ON a.user_id = u.id::text
+    WHERE u.id = ANY(CAST(:user_ids AS uuid[]))
+""")
+
+def _reporter_entry(credibility_score: Optional[float] = None, role: Optional[str] = None,
+                    trust_score: Optional[float] = None, trust_confidence: Optional[float] = None,
+                    counts: Optional[Dict[str, int]] = None, total: Optional[int] = None) -> Dict:
+    """Cache entry for one reporter; unknown users get the neutral defaults"""
+    base = DEFAULT_CREDIBILITY if credibility_score is None else credibility_score
+    confidence = trust_confidence or 0.0
+    if trust_score is None:
+        credibility = base
+    else:
+        # Trust engine scores run min_score..max_score; weight them by how much history backs them
+        trust = (trust_score - trust_engine.min_score) / (trust_engine.max_score - trust_engine.min_score)
+        credibility = (1 - confidence) * base + confidence * trust
+
+    counts = counts or {}
+    correct = counts.get("verified_correct", 0)
+    judged = correct + counts.get("verified_incorrect", 0) + counts.get("false_alarm", 0)
+    return {
+        "credibility": min(1.0, max(0.0, credibility)),
+        "credibility_score": base,
+        "trust_score": trust_score,
+        "trust_confidence": confidence,
+        # ThreatScorer._calculate_reporter_credibility inputs
+        "verified": role in VERIFIED_ROLES,
+        "historical_accuracy": correct / judged if judged else DEFAULT_CREDIBILITY,
+        "total_reports": total or 0
+    }
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+    except ValueError:
+        return False
+    return True
+
+class CredibilityCache:
+    """LRU of reporter credibility entries that also expire after `ttl` seconds"""
+
+    def __init__(self, ttl: float = 300, max_entries: int = 50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; loads that raced one are returned but not cached
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key: str) -> Optional[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, data = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return data
+
+    def get(self, user_id, db: Optional[Session] = None) -> Dict:
+        return self.get_many([user_id], db)[str(user_id)] if user_id else _reporter_entry()
+
+    def get_many(self, user_ids: Iterable, db: Optional[Session] = None) -> Dict[str, Dict]:
+        """Entries for every user id, keyed by its string form; all misses share one query"""
+        found: Dict[str, Dict] = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(str(user_id) for user_id in user_ids if user_id):
+                data = self._lookup(key)
+                if data is None:
+                    missing.append(key)
+                else:
+                    found[key] = data
+            self.hits += len(found)
+            self.misses += len(missing)
+            epoch = self._epoch
+
+        if missing:
+            loaded = self._load(missing, db)
+            with self._lock:
+                cacheable = epoch == self._epoch
+                for key in missing:
+                    # Users without a row are cached too, so unknown ids don't query every time
+                    found[key] = loaded.get(key) or _reporter_entry()
+                    if cacheable:
+                        self._entries[key] = (time.monotonic() + self.ttl, found[key])
+                        self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return found
+
+    def _load(self, user_ids, db: Optional[Session]) -> Dict[str, Dict]:
+        # Ids that are not UUIDs can't match a user; leaving them out keeps the cast from failing the batch
+        user_ids = [user_id for user_id in user_ids if _is_uuid(user_id)]
+        if not user_ids:
+            return {}
+        session = db or SessionLocal()
+        try:
+            rows = session.execute(CREDIBILITY_QUERY, {"user_ids": user_ids}).fetchall()
+        finally:
+            if db is None:
+                session.close()
+        return {
+            row.user_id: _reporter_entry(
+                row.credibility_score, row.role, row.trust_score, row.confidence, row.counts, row.total
+            )
+            for row in rows
+        }
+
+    def invalidate(self, user_id):
+        """Drop a reporter's entry after their credibility or trust score changed, on every worker"""
+        self.apply_invalidation({"user_id": str(user_id)})
+        websocket_manager.publish_threadsafe("credibility_invalidated", {"user_id": str(user_id)})
+
+    def apply_invalidation(self, data: dict):
+        """Drop the entry of data["user_id"] from this worker's cache"""
+        with self._lock:
+            self._epoch += 1
+            self._entries.pop(str(data.get("user_id")), None)
+
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+credibility_cache = CredibilityCache(
+    ttl=settings.credibility_cache_ttl_seconds,
+    max_entries=settings.credibility_cache_size
+)
+websocket_manager.add_listener("credibility_invalidated", credibility_cache.apply_invalidation)
@@ -0,0 +1,73 @@
+"""
+Persistent record of notification deliveries shared by every outbox worker
+The dispatcher claims a batch of recipient keys here before calling the
+provider and marks them sent afterwards, so a retried or reclaimed alert
+skips everyone already notified, whichever worker (or process restart)
+handles it. A claim that is never marked sent (worker crashed mid-send) is
+given up after claim_seconds, making delivery at-least-once.
+"""
+import asyncio
+from typing import List
+from sqlalchemy import text
+from ..database import engine
+
+# DISTINCT: ON CONFLICT cannot touch the same row twice in one statement
+CLAIM_QUERY = text("""
+    INSERT INTO notification_deliveries (key, status, claimed_at)
+    SELECT DISTINCT key, 'claimed', now() FROM unnest(CAST(:keys AS text[])) AS key
+    ON CONFLICT (key) DO UPDATE SET claimed_at = now()
+        WHERE notification_deliveries.status = 'claimed'
+            AND notification_deliveries.claimed_at < now() - make_interval(secs => :claim_seconds)
+    RETURNING key
+""")
+
+SENT_QUERY = text("""
+    UPDATE notification_deliveries
+    SET status = 'sent', sent_at = now()
+    WHERE key = ANY(CAST(:keys AS text[]))
+""")
+
+RELEASE_QUERY = text("""
+    DELETE FROM notification_deliveries
+    WHERE key = ANY(CAST(:keys AS text[])) AND status = 'claimed'
+""")
+
+PURGE_QUERY = text("""
+    DELETE FROM notification_deliveries
+    WHERE claimed_at < now() - make_interval(days => :retention_days)
+""")
+
+class DeliveryLog:
+    """Idempotency store backed by the notification_deliveries table (see IdempotencyStore)"""
+
+    def __init__(self, claim_seconds: float = 300, retention_days: int = 7):
+        self.claim_seconds = claim_seconds
+        self.retention_days = retention_days
+
+    def _claim(self, keys: List[str]) -> List[str]:
+        with engine.begin() as conn:
+            rows = conn.execute(CLAIM_QUERY, {"keys": keys, "claim_seconds": self.claim_seconds})
+            return [row.key for row in rows]
+
+    def _execute(self, query, params: dict) -> int:
+        with engine.begin() as conn:
+            return conn.execute(query, params).rowcount
+
+    async def claim(self, keys: List[str]) -> List[str]:
+        """The keys not yet sent or being sent, now claimed for sending"""
+        if not keys:
+            return []
+        return await asyncio.to_thread(self._claim, keys)
+
+    async def mark_sent(self, keys: List[str]):
+        if keys:
+            await asyncio.to_thread(self._execute, SENT_QUERY, {"keys": keys})
+
+    async def release(self, keys: List[str]):
+        """Give up claims whose sends failed, so a later run retries them"""
+        if keys:
+            await asyncio.to_thread(self._execute, RELEASE_QUERY, {"keys": keys})
+
+    def purge(self) -> int:
+        """Delete records older than the retention window; returns the rows removed"""
+        return self._execute(PURGE_QUERY, {"retention_days": self.retention_days})
@@ -0,0 +1,221 @@
+"""
+Concurrent, rate-limited notification dispatcher
+Each provider (SMS, push, email) gets its own concurrency limit, token
+bucket matching its quota, batch size for multi-recipient APIs and retry
+policy. Recipients are consumed lazily so large audiences stream through
+with bounded memory.
+"""
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from typing import AsyncIterable, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+# (recipient_id, address) — the id keys idempotency, the address is what the provider needs
+Recipient = Tuple[str, str]
+
+# Sends one message to a batch of addresses, returns per-address success
+BatchSender = Callable[[List[str], str], Awaitable[List[bool]]]
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        tokens = min(tokens, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+class IdempotencyStore:
+    """
+    Delivery keys of this process: a key is claimed before its send and
+    marked sent after it, so retried alerts skip done recipients. Only
+    suitable for a single process; the outbox workers share DeliveryLog
+    (app/services/deliveries.py), which implements the same three methods.
+    """
+
+    def __init__(self, ttl: float = 86400, max_keys: int = 1_000_000):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._keys: "OrderedDict[str, float]" = OrderedDict()
+        self._claimed: Set[str] = set()
+
+    def seen(self, key: str) -> bool:
+        expires = self._keys.get(key)
+        if expires is None:
+            return False
+        if expires < time.monotonic():
+            del self._keys[key]
+            return False
+        return True
+
+    async def claim(self, keys: List[str]) -> List[str]:
+        """The keys not yet sent or being sent, now claimed for sending"""
+        fresh = [key for key in dict.fromkeys(keys) if key not in self._claimed and not self.seen(key)]
+        self._claimed.update(fresh)
+        return fresh
+
+    async def mark_sent(self, keys: List[str]):
+        for key in keys:
+            self._claimed.discard(key)
+            self._keys[key] = time.monotonic() + self.ttl
+            self._keys.move_to_end(key)
+        while len(self._keys) > self.max_keys:
+            self._keys.popitem(last=False)
+
+    async def release(self, keys: List[str]):
+        """Give up claims whose sends failed, so a later run retries them"""
+        self._claimed.difference_update(keys)
+
+class Provider:
+    """A delivery channel and its quota"""
+
+    def __init__(
+        self,
+        name: str,
+        send_batch: BatchSender,
+        concurrency: int = 10,
+        rate_per_second: float = 50.0,
+        batch_size: int = 1,
+        max_attempts: int = 4,
+        retry_base_seconds: float = 0.5
+    ):
+        self.name = name
+        self.send_batch = send_batch
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        # Quota is per recipient, a multi-recipient call spends one token each
+        self.bucket = TokenBucket(rate_per_second, capacity=max(rate_per_second, batch_size))
+
+class DispatchResult:
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.sent = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.started = time.monotonic()
+        self.seconds = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "channel": self.channel,
+            "sent": self.sent,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "seconds": round(self.seconds, 3)
+        }
+
+async def _iterate(recipients: Union[Iterable[Recipient], AsyncIterable[Recipient]]):
+    if hasattr(recipients, "__aiter__"):
+        async for recipient in recipients:
+            yield recipient
+    else:
+        for recipient in recipients:
+            yield recipient
+
+class NotificationDispatcher:
+    def __init__(self, providers: Dict[str, Provider], idempotency=None):
+        self.providers = providers
+        self.idempotency = idempotency or IdempotencyStore()
+
+    async def dispatch(
+        self,
+        channel: str,
+        recipients: Union[Iterable[Recipient], AsyncIterable[Recipient]],
+        message: str,
+        idempotency_prefix: str
+    ) -> DispatchResult:
+        """
+        Deliver `message` to every recipient over `channel`. Each batch
+        claims its keys `{idempotency_prefix}:{channel}:{recipient_id}` before
+        sending; recipients already delivered (or being delivered by another
+        worker) are skipped, so re-running an alert never double-sends.
+        """
+        provider = self.providers[channel]
+        result = DispatchResult(channel)
+        # Bounded hand-off: the producer stalls instead of buffering the audience
+        batches: asyncio.Queue = asyncio.Queue(maxsize=provider.concurrency * 2)
+
+        async def produce():
+            batch = []
+            async for recipient_id, address in _iterate(recipients):
+                batch.append((f"{idempotency_prefix}:{channel}:{recipient_id}", address))
+                if len(batch) >= provider.batch_size:
+                    await batches.put(batch)
+                    batch = []
+            if batch:
+                await batches.put(batch)
+            for _ in range(provider.concurrency):
+                await batches.put(None)
+
+        async def consume():
+            while True:
+                batch = await batches.get()
+                if batch is None:
+                    return
+                claimed = set(await self.idempotency.claim([key for key, _ in batch]))
+                result.duplicates += len(batch) - len(claimed)
+                batch = [(key, address) for key, address in batch if key in claimed]
+                if batch:
+                    await self._send_with_retries(provider, batch, message, result)
+
+        # Producer and consumers run together: the first one to fail cancels the
+        # rest and is re-raised, instead of leaving the producer blocked on a full queue
+        tasks = [asyncio.create_task(produce())]
+        tasks += [asyncio.create_task(consume()) for _ in range(provider.concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        result.seconds = time.monotonic() - result.started
+        return result
+
+    async def _send_with_retries(self, provider: Provider, batch: List[Tuple[str, str]], message: str, result: DispatchResult):
+        pending = batch
+        for attempt in range(provider.max_attempts):
+            await provider.bucket.acquire(len(pending))
+            try:
+                outcomes = await provider.send_batch([address for _, address in pending], message)
+            except Exception as e:
+                print(f"[{provider.name}] batch of {len(pending)} failed (attempt {attempt + 1}): {e}")
+                outcomes = [False] * len(pending)
+
+            failed, sent = [], []
+            for (key, address), ok in zip(pending, outcomes):
+                if ok:
+                    sent.append(key)
+                else:
+                    failed.append((key, address))
+            # Recorded per attempt, so a crash mid-retry keeps what already went out
+            if sent:
+                await self.idempotency.mark_sent(sent)
+                result.sent += len(sent)
+
+            # Only the recipients that failed are retried
+            pending = failed
+            if not pending:
+                return
+            if attempt + 1 < provider.max_attempts:
+                # Full jitter: spreads retries of concurrent batches apart
+                await asyncio.sleep(random.uniform(0, provider.retry_base_seconds * 2 ** attempt))
+
+        result.failed += len(pending)
+        await self.idempotency.release([key for key, _ in pending])
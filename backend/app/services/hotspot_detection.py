@@ -2,15 +2,15 @@
 Hotspot detection and clustering service using PostGIS
 """
 import asyncio
+import json
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import text, func
 from ..database import SessionLocal
-from ..models.db_models import Report, SocialPost, Zone
+from ..models.db_models import Report, SocialPost, Zone, CLUSTER_CONFIDENCE_THRESHOLD
 from ..config import settings
-from ..websocket_manager import WebSocketManager
-
-websocket_manager = WebSocketManager()
+from ..websocket_manager import websocket_manager
+from .vector_tiles import tile_cache
 
 async def trigger_clustering():
     """
@@ -21,92 +21,101 @@ async def trigger_clustering():
         # Run clustering algorithm
         clusters = await detect_hotspots(db)
         
-        # Create or update zones for significant clusters
-        for cluster in clusters:
-            if cluster["avg_confidence"] >= settings.threat_confidence_auto_alert:
-                await create_or_update_zone(cluster, db)
+        # Reconcile zones against significant clusters
+        significant = [
+            cluster for cluster in clusters
+            if cluster["avg_confidence"] >= settings.threat_confidence_auto_alert
+        ]
+        changes = reconcile_zones(significant, db)
         
-        # Broadcast zone updates
-        await websocket_manager.broadcast({
-            "type": "zones_updated",
-            "data": {"cluster_count": len(clusters)}
-        })
+        # Broadcast only what changed
+        if any(changes.values()):
+            await websocket_manager.broadcast_zone_changes({
+                "cluster_count": len(clusters),
+                **changes
+            })
         
     finally:
         db.close()
 
+# Reads the stored geom columns so the GIST indexes apply, and binds the
+# window/DBSCAN parameters so the statement text (and its cached plan) never
+# changes. The confidence threshold stays a literal: it is the predicate of the
+# partial indexes in db_models and the planner can only match those against a
+# constant.
+CLUSTERING_CANDIDATES_QUERY = text(f"""
+    WITH pts AS (
+        SELECT 
+            id, 
+            lat, 
+            lon, 
+            confidence,
+            hazard_type,
+            'report' as source_type,
+            geom::geometry as geom
+        FROM reports 
+        WHERE created_at >= now() - make_interval(hours => :window_hours) 
+            AND confidence >= {CLUSTER_CONFIDENCE_THRESHOLD}
+            AND geom IS NOT NULL
+        
+        UNION ALL
+        
+        SELECT 
+            id,
+            lat,
+            lon,
+            relevance as confidence,
+            hazard_type,
+            'social' as source_type,
+            geom::geometry as geom
+        FROM social_posts 
+        WHERE created_at >= now() - make_interval(hours => :window_hours) 
+            AND relevance >= {CLUSTER_CONFIDENCE_THRESHOLD}
+            AND geom IS NOT NULL
+    ),
+    clustered AS (
+        SELECT 
+            id,
+            lat,
+            lon,
+            confidence,
+            hazard_type,
+            source_type,
+            geom,
+            ST_ClusterDBSCAN(
+                ST_Transform(geom, 3857), 
+                eps := :eps_meters, 
+                minpoints := :min_points
+            ) OVER () as cluster_id
+        FROM pts
+    )
+    SELECT 
+        cluster_id,
+        COUNT(*) as point_count,
+        AVG(confidence) as avg_confidence,
+        ST_AsGeoJSON(ST_ConvexHull(ST_Collect(geom))) as cluster_geom,
+        ST_AsGeoJSON(ST_Centroid(ST_Collect(geom))) as centroid,
+        array_agg(DISTINCT hazard_type) as hazard_types,
+        MIN(lat) as min_lat,
+        MAX(lat) as max_lat,
+        MIN(lon) as min_lon,
+        MAX(lon) as max_lon
+    FROM clustered 
+    WHERE cluster_id IS NOT NULL
+    GROUP BY cluster_id
+    HAVING COUNT(*) >= :min_points
+    ORDER BY avg_confidence DESC
+""")
+
 async def detect_hotspots(db: Session) -> List[Dict]:
     """
     Detect hotspots using DBSCAN clustering on recent reports
     """
-    # Get recent high-confidence reports and social posts
-    time_window = "3 hours"
-    confidence_threshold = 0.4
-    
-    # Query for clustering candidates
-    query = text(f"""
-        WITH pts AS (
-            SELECT 
-                id, 
-                lat, 
-                lon, 
-                confidence,
-                hazard_type,
-                'report' as source_type,
-                ST_SetSRID(ST_Point(lon, lat), 4326) as geom
-            FROM reports 
-            WHERE created_at >= now() - interval '{time_window}' 
-                AND confidence >= {confidence_threshold}
-            
-            UNION ALL
-            
-            SELECT 
-                id,
-                lat,
-                lon,
-                relevance as confidence,
-                hazard_type,
-                'social' as source_type,
-                ST_SetSRID(ST_Point(lon, lat), 4326) as geom
-            FROM social_posts 
-            WHERE created_at >= now() - interval '{time_window}' 
-                AND relevance >= {confidence_threshold}
-                AND lat IS NOT NULL 
-                AND lon IS NOT NULL
-        ),
-        clustered AS (
-            SELECT 
-                id,
-                lat,
-                lon,
-                confidence,
-                hazard_type,
-                source_type,
-                geom,
-                ST_ClusterDBSCAN(
-                    ST_Transform(geom, 3857), 
-                    eps := {settings.cluster_eps_meters}, 
-                    minpoints := {settings.cluster_min_points}
-                ) OVER () as cluster_id
-            FROM pts
-        )
-        SELECT 
-            cluster_id,
-            COUNT(*) as point_count,
-            AVG(confidence) as avg_confidence,
-            ST_AsGeoJSON(ST_ConvexHull(ST_Collect(geom))) as cluster_geom,
-            ST_AsGeoJSON(ST_Centroid(ST_Collect(geom))) as centroid,
-            array_agg(DISTINCT hazard_type) as hazard_types,
-            MIN(lat) as min_lat,
-            MAX(lat) as max_lat,
-            MIN(lon) as min_lon,
-            MAX(lon) as max_lon
-        FROM clustered 
-        WHERE cluster_id IS NOT NULL
-        GROUP BY cluster_id
-        HAVING COUNT(*) >= {settings.cluster_min_points}
-        ORDER BY avg_confidence DESC
-    """)
+    query = CLUSTERING_CANDIDATES_QUERY.bindparams(
+        window_hours=settings.cluster_time_window_hours,
+        eps_meters=float(settings.cluster_eps_meters),
+        min_points=settings.cluster_min_points,
+    )
     
     result = db.execute(query)
     clusters = []
@@ -124,53 +133,182 @@ async def detect_hotspots(db: Session) -> List[Dict]:
             "cluster_geom": row.cluster_geom,
             "centroid": row.centroid,
             "hazard_types": row.hazard_types,
-            "radius_km": radius_km
+            "radius_km": radius_km,
+            "bbox": [row.min_lon, row.min_lat, row.max_lon, row.max_lat]
         })
     
     return clusters
 
-async def create_or_update_zone(cluster: Dict, db: Session):
+# Candidate (cluster, zone) pairs with their overlap, computed for every
+# cluster of a run in one statement; the GIST index on zones.geom serves the
+# ST_Intersects join
+ZONE_MATCH_QUERY = text("""
+    WITH c AS (
+        SELECT
+            idx,
+            ST_Buffer(ST_GeomFromGeoJSON(geom)::geography, buffer_m) AS geog
+        FROM jsonb_to_recordset(CAST(:clusters AS jsonb)) AS x(idx int, geom text, buffer_m float)
+    ),
+    pairs AS (
+        SELECT
+            c.idx,
+            z.id AS zone_id,
+            z.avg_confidence,
+            z.report_count,
+            ST_Area(c.geog) AS cluster_area,
+            ST_Area(z.geom) AS zone_area,
+            ST_Area(ST_Intersection(c.geog, z.geom)) AS overlap_area
+        FROM c
+        JOIN zones z
+            ON z.active
+            AND z.type = 'red'
+            AND z.zone_metadata->>'auto_generated' = 'true'
+            AND ST_Intersects(c.geog, z.geom)
+    )
+    SELECT
+        idx,
+        zone_id,
+        avg_confidence,
+        report_count,
+        overlap_area / NULLIF(cluster_area + zone_area - overlap_area, 0) AS iou
+    FROM pairs
+    ORDER BY iou DESC NULLS LAST
+""")
+
+ZONE_UPDATE_QUERY = text("""
+    UPDATE zones z
+    SET
+        geom = ST_Buffer(ST_GeomFromGeoJSON(v.geom)::geography, v.buffer_m),
+        avg_confidence = v.avg_confidence,
+        report_count = v.report_count,
+        radius_km = v.radius_km,
+        zone_metadata = v.zone_metadata::json,
+        updated_at = now()
+    FROM jsonb_to_recordset(CAST(:zones AS jsonb)) AS v(
+        zone_id int, geom text, buffer_m float, avg_confidence float,
+        report_count int, radius_km float, zone_metadata jsonb
+    )
+    WHERE z.id = v.zone_id
+    RETURNING z.id,
+        ST_XMin(z.geom::geometry) AS min_lon, ST_YMin(z.geom::geometry) AS min_lat,
+        ST_XMax(z.geom::geometry) AS max_lon, ST_YMax(z.geom::geometry) AS max_lat
+""")
+
+ZONE_INSERT_QUERY = text("""
+    INSERT INTO zones (type, name, geom, avg_confidence, report_count, radius_km, zone_metadata, active)
+    SELECT
+        'red',
+        v.name,
+        ST_Buffer(ST_GeomFromGeoJSON(v.geom)::geography, v.buffer_m),
+        v.avg_confidence,
+        v.report_count,
+        v.radius_km,
+        v.zone_metadata::json,
+        true
+    FROM jsonb_to_recordset(CAST(:zones AS jsonb)) AS v(
+        idx int, name text, geom text, buffer_m float, avg_confidence float,
+        report_count int, radius_km float, zone_metadata jsonb
+    )
+    RETURNING id, name,
+        ST_XMin(geom::geometry) AS min_lon, ST_YMin(geom::geometry) AS min_lat,
+        ST_XMax(geom::geometry) AS max_lon, ST_YMax(geom::geometry) AS max_lat
+""")
+
+ZONE_DEACTIVATE_QUERY = text("""
+    UPDATE zones
+    SET active = false, updated_at = now()
+    WHERE active
+        AND type = 'red'
+        AND zone_metadata->>'auto_generated' = 'true'
+        AND NOT (id = ANY(CAST(:keep_ids AS int[])))
+    RETURNING id
+""")
+
+def _zone_row(idx: int, cluster: Dict) -> Dict:
+    """Cluster fields as stored on a zone row"""
+    return {
+        "idx": idx,
+        "name": f"Hotspot Cluster {cluster['cluster_id']}",
+        "geom": cluster["cluster_geom"],
+        "buffer_m": max(1000, cluster["radius_km"] * 1000),  # At least 1km buffer
+        "avg_confidence": cluster["avg_confidence"],
+        "report_count": cluster["point_count"],
+        "radius_km": cluster["radius_km"],
+        "zone_metadata": {"hazard_types": cluster["hazard_types"], "auto_generated": True}
+    }
+
+def reconcile_zones(clusters: List[Dict], db: Session) -> Dict[str, List]:
     """
-    Create or update a red zone based on cluster data
+    Match clusters to active auto-generated red zones by spatial overlap (IoU),
+    update matched zones in bulk, insert unmatched clusters as new zones and
+    deactivate zones no cluster supports any more. Returns the diff.
     """
+    changes = {"created": [], "updated": [], "deactivated": []}
+    rows = [_zone_row(idx, cluster) for idx, cluster in enumerate(clusters)]
+    
     try:
-        # Create buffered polygon around cluster
-        buffer_meters = max(1000, cluster["radius_km"] * 1000)  # At least 1km buffer
+        # Greedy one-to-one assignment, best overlaps first
+        matches = {}
+        previous = {}
+        if rows:
+            candidates = db.execute(ZONE_MATCH_QUERY, {"clusters": json.dumps([
+                {"idx": row["idx"], "geom": row["geom"], "buffer_m": row["buffer_m"]}
+                for row in rows
+            ])})
+            claimed_zones = set()
+            for pair in candidates:
+                if pair.iou is None or pair.iou < settings.zone_match_min_iou:
+                    break
+                if pair.idx in matches or pair.zone_id in claimed_zones:
+                    continue
+                matches[pair.idx] = pair.zone_id
+                claimed_zones.add(pair.zone_id)
+                previous[pair.zone_id] = (pair.avg_confidence, pair.report_count)
         
-        # Create zone with buffered geometry
-        zone_query = text(f"""
-            INSERT INTO zones (type, name, geom, avg_confidence, report_count, radius_km, metadata)
-            VALUES (
-                'red',
-                'Hotspot Cluster {cluster["cluster_id"]}',
-                ST_Buffer(ST_GeomFromGeoJSON('{cluster["cluster_geom"]}'), {buffer_meters}),
-                {cluster["avg_confidence"]},
-                {cluster["point_count"]},
-                {cluster["radius_km"]},
-                '{{"hazard_types": {cluster["hazard_types"]}, "auto_generated": true}}'::jsonb
-            )
-            ON CONFLICT DO NOTHING
-            RETURNING id
-        """)
+        updates = [{**row, "zone_id": matches[row["idx"]]} for row in rows if row["idx"] in matches]
+        inserts = [row for row in rows if row["idx"] not in matches]
         
-        result = db.execute(zone_query)
-        zone_id = result.fetchone()
+        if updates:
+            stored = {zone.id: zone for zone in db.execute(ZONE_UPDATE_QUERY, {"zones": json.dumps(updates)})}
+            for row in updates:
+                old_confidence, old_count = previous[row["zone_id"]]
+                if old_count != row["report_count"] or round(old_confidence or 0.0, 3) != round(row["avg_confidence"], 3):
+                    changes["updated"].append(_zone_event(stored[row["zone_id"]], row))
         
-        if zone_id:
-            db.commit()
-            print(f"Created red zone {zone_id[0]} for cluster {cluster['cluster_id']}")
-            
-            # Broadcast new zone
-            await websocket_manager.broadcast_new_zone({
-                "zone_id": zone_id[0],
-                "type": "red",
-                "confidence": cluster["avg_confidence"],
-                "radius_km": cluster["radius_km"]
-            })
+        if inserts:
+            by_name = {row["name"]: row for row in inserts}
+            for created in db.execute(ZONE_INSERT_QUERY, {"zones": json.dumps(inserts)}):
+                changes["created"].append(_zone_event(created, by_name[created.name]))
+        
+        keep_ids = [row["zone_id"] for row in updates] + [zone["zone_id"] for zone in changes["created"]]
+        deactivated = db.execute(ZONE_DEACTIVATE_QUERY, {"keep_ids": keep_ids})
+        changes["deactivated"] = [row.id for row in deactivated]
+        
+        db.commit()
+        if any(changes.values()):
+            tile_cache.bump("zones")
+        print(f"Zone reconciliation: {len(changes['created'])} created, "
+              f"{len(updates)} matched, {len(changes['deactivated'])} deactivated")
     
     except Exception as e:
         db.rollback()
-        print(f"Error creating zone for cluster {cluster['cluster_id']}: {e}")
+        print(f"Error reconciling zones: {e}")
+        return {"created": [], "updated": [], "deactivated": []}
+    
+    return changes
+
+def _zone_event(stored, row: Dict) -> Dict:
+    """Zone payload for realtime broadcasts; `stored` is the zone row RETURNING its id and bounds"""
+    return {
+        "zone_id": stored.id,
+        "type": "red",
+        "confidence": row["avg_confidence"],
+        "report_count": row["report_count"],
+        "radius_km": row["radius_km"],
+        # Bounds of the stored (buffered) zone; routes the event to geo-subscribed clients
+        "bbox": [stored.min_lon, stored.min_lat, stored.max_lon, stored.max_lat],
+        "hazard_types": row["zone_metadata"]["hazard_types"]
+    }
 
 def get_current_hotspots(db: Session) -> List[Dict]:
     """
@@ -182,10 +320,12 @@ def get_current_hotspots(db: Session) -> List[Dict]:
             type,
             name,
             ST_AsGeoJSON(geom) as geom_json,
+            ST_Y(ST_Centroid(geom::geometry)) as center_lat,
+            ST_X(ST_Centroid(geom::geometry)) as center_lon,
             avg_confidence,
             report_count,
             radius_km,
-            metadata,
+            zone_metadata as metadata,
             created_at
         FROM zones 
         WHERE active = true 
@@ -201,6 +341,8 @@ def get_current_hotspots(db: Session) -> List[Dict]:
             "type": row.type,
             "name": row.name,
             "poly_geojson": row.geom_json,
+            "center_lat": row.center_lat or 0.0,
+            "center_lon": row.center_lon or 0.0,
             "avg_confidence": float(row.avg_confidence) if row.avg_confidence else 0.0,
             "report_count": row.report_count,
             "radius_km": float(row.radius_km) if row.radius_km else 0.0,
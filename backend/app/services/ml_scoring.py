@@ -4,11 +4,15 @@ ML scoring service using ONNX models with fallback logic
 import os
 import json
 import numpy as np
-from typing import Dict, Optional
+from datetime import datetime
+from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from ..database import SessionLocal
 from ..models.db_models import Report
 from ..config import settings
+from .vector_tiles import tile_cache
+from .credibility import credibility_cache
+from .activity_index import corroboration_features
 
 try:
     import onnxruntime as ort
@@ -174,52 +178,75 @@ async def score_report_async(report_id: int):
     """
     Asynchronously score a report using ML models
     """
+    await score_reports_async([report_id])
+
+async def score_reports_async(report_ids: List[int]):
+    """
+    Score a batch of reports; reporter credibility for the whole batch is
+    prefetched up front, so scoring makes no per-report credibility query
+    """
     db = SessionLocal()
     try:
-        report = db.query(Report).filter(Report.id == report_id).first()
-        if not report:
+        reports = db.query(Report).filter(Report.id.in_(report_ids)).all()
+        if not reports:
             return
+        reporters = credibility_cache.get_many([report.user_id for report in reports], db)
         
-        # Score text content
-        text_score = ml_scorer.score_text(report.description)
-        
-        # Score image if available
-        image_score = {"labels": {}, "confidence": 0.0}
-        if report.media_url:
-            image_score = ml_scorer.score_image(report.media_url)
-        
-        # Calculate overall threat confidence
-        threat_confidence = calculate_threat_confidence(
-            text_score, image_score, report
-        )
-        
-        # Update report with scores
-        report.confidence = threat_confidence
-        report.report_scores = {
-            "text_analysis": text_score,
-            "image_analysis": image_score,
-            "threat_confidence": threat_confidence,
-            "timestamp": str(datetime.utcnow())
-        }
-        
-        # Update hazard type if ML suggests different type
-        max_hazard = max(text_score["hazard_type_probs"].items(), key=lambda x: x[1])
-        if max_hazard[1] > 0.6:  # High confidence threshold
-            report.hazard_type = max_hazard[0]
+        max_confidence = 0.0
+        for report in reports:
+            # Score text content
+            text_score = ml_scorer.score_text(report.description)
+            
+            # Score image if available
+            image_score = {"labels": {}, "confidence": 0.0}
+            if report.media_url:
+                image_score = ml_scorer.score_image(report.media_url)
+            
+            # Nearby activity as of the report's creation, from the in-memory index
+            activity = corroboration_features(report.lat, report.lon, report.created_at)
+            
+            # Calculate overall threat confidence
+            threat_confidence = calculate_threat_confidence(
+                text_score, image_score, report,
+                reporter=reporters.get(str(report.user_id)),
+                activity=activity
+            )
+            max_confidence = max(max_confidence, threat_confidence)
+            
+            # Update report with scores
+            report.confidence = threat_confidence
+            report.report_scores = {
+                "text_analysis": text_score,
+                "image_analysis": image_score,
+                "activity": activity,
+                "threat_confidence": threat_confidence,
+                "timestamp": str(datetime.utcnow())
+            }
+            
+            # Update hazard type if ML suggests different type
+            max_hazard = max(text_score["hazard_type_probs"].items(), key=lambda x: x[1])
+            if max_hazard[1] > 0.6:  # High confidence threshold
+                report.hazard_type = max_hazard[0]
         
         db.commit()
+        tile_cache.bump("reports")
         
         # Trigger clustering if confidence is high
-        if threat_confidence >= settings.threat_confidence_auto_alert:
+        if max_confidence >= settings.threat_confidence_auto_alert:
             from .hotspot_detection import trigger_clustering
             await trigger_clustering()
     
     finally:
         db.close()
 
-def calculate_threat_confidence(text_score: Dict, image_score: Dict, report) -> float:
+def calculate_threat_confidence(text_score: Dict, image_score: Dict, report,
+                                reporter: Optional[Dict] = None,
+                                activity: Optional[Dict] = None) -> float:
     """
     Calculate overall threat confidence score
+    `reporter` is the reporter's credibility cache entry; when omitted it is
+    read through the cache (batch callers prefetch it instead). `activity`
+    holds the nearby report/post features from the activity index.
     """
     # Base weights
     text_weight = 0.4
@@ -234,14 +261,19 @@ def calculate_threat_confidence(text_score: Dict, image_score: Dict, report) ->
     # Image confidence
     image_confidence = image_score.get("confidence", 0.0)
     
-    # User credibility (mock - would use actual user credibility)
-    user_credibility = 0.5  # Default credibility
+    # User credibility (profile score blended with the trust engine score)
+    if reporter is None:
+        reporter = credibility_cache.get(report.user_id)
+    user_credibility = reporter["credibility"]
+    
+    if activity is None:
+        activity = corroboration_features(report.lat, report.lon, report.created_at)
     
-    # Location density (mock - would calculate nearby reports)
-    location_density = 0.3
+    # Location density (recent reports nearby)
+    location_density = activity["location_density"]
     
-    # Social corroboration (mock - would check social media mentions)
-    social_corroboration = 0.2
+    # Social corroboration (recent geotagged posts nearby)
+    social_corroboration = activity["social_corroboration"]
     
     # Calculate weighted score
     threat_confidence = (
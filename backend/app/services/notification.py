@@ -2,44 +2,77 @@
 Notification service for SMS, email, and push notifications
 """
 import asyncio
-from typing import List, Dict
+import random
+import uuid
+from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
 from ..database import SessionLocal
-from ..models.db_models import Alert, Zone, Report, User
+from ..models.db_models import Alert, Zone, Report
 from ..config import settings
+from .deliveries import DeliveryLog
+from .dispatcher import DispatchResult, NotificationDispatcher, Provider
+from .recipients import stream_zone_recipients
 
-async def send_alert_notifications(alert_id: int):
+class DeliveryIncomplete(RuntimeError):
+    """Too many recipients of an alert could not be reached; the alert should be retried"""
+
+async def deliver_alert(alert_id: int) -> Optional[Dict]:
     """
-    Send alert notifications via multiple channels
+    Send alert notifications via multiple channels and return the delivery
+    counters without writing them (the outbox worker records a batch at once).
+    None if the alert does not exist. Raises DeliveryIncomplete when more than
+    notification_max_failure_ratio of the sends failed; recipients already
+    reached are recorded, so the retry only sends to the rest.
     """
     db = SessionLocal()
     try:
         alert = db.query(Alert).filter(Alert.id == alert_id).first()
         if not alert:
-            return
+            return None
         
-        sms_count = 0
+        results: List[DispatchResult] = []
         
         # Send to authorities
         if "sms" in alert.channels:
-            authority_count = await send_authority_notifications(alert)
-            sms_count += authority_count
+            results.extend(await send_authority_notifications(alert))
         
         # Send to citizens in affected area
         if alert.zone_id:
-            citizen_count = await send_citizen_notifications(alert, db)
-            sms_count += citizen_count
+            citizen_result = await send_citizen_notifications(alert, db)
+            if citizen_result is not None:
+                results.append(citizen_result)
+        
+        failed = sum(result.failed for result in results)
+        attempted = failed + sum(result.sent for result in results)
+        if attempted and failed / attempted > settings.notification_max_failure_ratio:
+            raise DeliveryIncomplete(f"Alert {alert.id}: {failed} of {attempted} notifications failed")
         
-        # Update alert status
+        # Recipients reached by an earlier attempt count as delivered too
+        sms_count = sum(result.sent + result.duplicates for result in results if result.channel == "sms")
+        return {"alert_id": alert.id, "sms_count": sms_count, "authority_notified": True}
+        
+    finally:
+        db.close()
+
+async def send_alert_notifications(alert_id: int):
+    """
+    Send alert notifications and update the alert row directly
+    """
+    counters = await deliver_alert(alert_id)
+    if counters is None:
+        return
+    
+    db = SessionLocal()
+    try:
+        alert = db.query(Alert).filter(Alert.id == alert_id).first()
         alert.status = "sent"
-        alert.sms_count = sms_count
-        alert.authority_notified = True
+        alert.sms_count = counters["sms_count"]
+        alert.authority_notified = counters["authority_notified"]
         db.commit()
-        
     finally:
         db.close()
 
-async def send_authority_notifications(alert: Alert) -> int:
+async def send_authority_notifications(alert: Alert) -> List[DispatchResult]:
     """
     Send notifications to relevant authorities
     """
@@ -58,54 +91,48 @@ async def send_authority_notifications(alert: Alert) -> int:
     authority_info = settings.authority_contacts.get(hazard_type, 
         settings.authority_contacts.get("oil_spill"))  # Default fallback
     
-    sms_count = 0
+    phones = authority_info.get("phones", [])
+    emails = authority_info.get("emails", [])
     
-    # Send SMS to authority phones
-    for phone in authority_info.get("phones", []):
-        success = await send_sms(
-            phone, 
-            f"ATLAS-ALERT: {alert.message} - Authority: {authority_info['agency']}"
+    # SMS and email go out concurrently, each within its provider quota
+    return list(await asyncio.gather(
+        dispatcher.dispatch(
+            "sms",
+            [(phone, phone) for phone in phones],
+            f"ATLAS-ALERT: {alert.message} - Authority: {authority_info['agency']}",
+            idempotency_prefix=f"alert:{alert.id}:authority"
+        ),
+        dispatcher.dispatch(
+            "email",
+            [(email, email) for email in emails],
+            f"Ocean Hazard Alert\n\n{alert.message}",
+            idempotency_prefix=f"alert:{alert.id}:authority"
         )
-        if success:
-            sms_count += 1
-    
-    # Send emails (mock implementation)
-    for email in authority_info.get("emails", []):
-        await send_email(email, "Ocean Hazard Alert", alert.message)
-    
-    return sms_count
+    ))
 
-async def send_citizen_notifications(alert: Alert, db: Session) -> int:
+async def send_citizen_notifications(alert: Alert, db: Session) -> Optional[DispatchResult]:
     """
     Send notifications to citizens in affected area
     """
     if not alert.zone_id:
-        return 0
+        return None
     
     zone = db.query(Zone).filter(Zone.id == alert.zone_id).first()
     if not zone:
-        return 0
-    
-    # Find users within the zone (mock implementation)
-    # In production, would use PostGIS spatial queries
-    affected_users = db.query(User).filter(
-        User.last_known_lat.isnot(None),
-        User.last_known_lon.isnot(None)
-    ).limit(100).all()  # Limit for demo
+        return None
     
-    sms_count = 0
-    
-    for user in affected_users:
-        if user.phone_hash:  # Only send to users with phone numbers
-            # In production, would unhash phone number securely
+    async def recipients():
+        # Users whose last known position is in the zone, streamed in chunks
+        async for user_id, phone_hash in stream_zone_recipients(zone.id):
+            # In production, would unhash phone numbers securely
             mock_phone = "+91" + "9" * 10  # Mock phone number
-            
-            message = f"OCEAN ALERT: {alert.message} Stay safe and follow official guidance. Atlas-Alert"
-            success = await send_sms(mock_phone, message)
-            if success:
-                sms_count += 1
+            yield user_id, mock_phone
+    
+    message = f"OCEAN ALERT: {alert.message} Stay safe and follow official guidance. Atlas-Alert"
+    result = await dispatcher.dispatch("sms", recipients(), message, idempotency_prefix=f"alert:{alert.id}")
+    print(f"Citizen notifications for alert {alert.id}: {result.to_dict()}")
     
-    return sms_count
+    return result
 
 async def send_sms(phone: str, message: str) -> bool:
     """
@@ -118,13 +145,23 @@ async def send_sms(phone: str, message: str) -> bool:
         print(f"[SMS] Sent to {phone}: {message[:50]}...")
         
         # Mock 95% success rate
-        import random
         return random.random() < 0.95
         
     except Exception as e:
         print(f"SMS sending failed: {e}")
         return False
 
+async def send_sms_batch(phones: List[str], message: str) -> List[bool]:
+    """
+    Send one SMS to many numbers in a single MSG91 bulk request
+    """
+    # Mock bulk API call - one round trip regardless of recipient count
+    await asyncio.sleep(0.1)
+    print(f"[SMS] Bulk send to {len(phones)} numbers: {message[:50]}...")
+    
+    # Mock 95% per-recipient success rate
+    return [random.random() < 0.95 for _ in phones]
+
 async def send_email(email: str, subject: str, body: str) -> bool:
     """
     Send email notification
@@ -140,22 +177,71 @@ async def send_email(email: str, subject: str, body: str) -> bool:
         print(f"Email sending failed: {e}")
         return False
 
-async def send_push_notification(user_tokens: List[str], title: str, body: str) -> int:
+async def send_email_batch(emails: List[str], message: str) -> List[bool]:
     """
-    Send push notifications to mobile devices
+    Send an email per address; message is "subject\n\nbody"
     """
-    success_count = 0
-    
-    for token in user_tokens:
-        try:
-            # Mock push notification
-            await asyncio.sleep(0.05)
-            print(f"[PUSH] Sent to {token[:20]}...: {title}")
-            success_count += 1
-        except Exception as e:
-            print(f"Push notification failed: {e}")
-    
-    return success_count
+    subject, _, body = message.partition("\n\n")
+    return list(await asyncio.gather(*(send_email(email, subject, body) for email in emails)))
+
+async def send_push_batch(tokens: List[str], message: str) -> List[bool]:
+    """
+    Send one push notification to many devices in a single FCM multicast
+    """
+    # Mock multicast call
+    await asyncio.sleep(0.05)
+    title = message.partition("\n\n")[0]
+    print(f"[PUSH] Multicast to {len(tokens)} devices: {title}")
+    return [True] * len(tokens)
+
+async def send_push_notification(
+    user_tokens: List[str], title: str, body: str, idempotency_key: Optional[str] = None
+) -> int:
+    """
+    Send push notifications to mobile devices. Repeating a call with the same
+    idempotency_key skips devices that already received it.
+    """
+    result = await dispatcher.dispatch(
+        "push",
+        [(token, token) for token in user_tokens],
+        f"{title}\n\n{body}",
+        idempotency_prefix=idempotency_key or f"push:{uuid.uuid4().hex}"
+    )
+    return result.sent
+
+# Shared by every worker process, so retries and reclaimed alerts skip reached recipients
+delivery_log = DeliveryLog(
+    claim_seconds=settings.notification_claim_seconds,
+    retention_days=settings.notification_delivery_retention_days
+)
+
+# Provider quotas; batch sizes follow the bulk APIs (MSG91 bulk SMS, FCM multicast)
+dispatcher = NotificationDispatcher({
+    "sms": Provider(
+        "sms", send_sms_batch,
+        concurrency=settings.sms_concurrency,
+        rate_per_second=settings.sms_rate_per_second,
+        batch_size=settings.sms_batch_size,
+        max_attempts=settings.notification_max_attempts,
+        retry_base_seconds=settings.notification_retry_base_seconds
+    ),
+    "push": Provider(
+        "push", send_push_batch,
+        concurrency=settings.push_concurrency,
+        rate_per_second=settings.push_rate_per_second,
+        batch_size=settings.push_batch_size,
+        max_attempts=settings.notification_max_attempts,
+        retry_base_seconds=settings.notification_retry_base_seconds
+    ),
+    "email": Provider(
+        "email", send_email_batch,
+        concurrency=settings.email_concurrency,
+        rate_per_second=settings.email_rate_per_second,
+        batch_size=1,
+        max_attempts=settings.notification_max_attempts,
+        retry_base_seconds=settings.notification_retry_base_seconds
+    )
+}, idempotency=delivery_log)
 
 def get_notification_analytics() -> Dict:
     """
@@ -0,0 +1,196 @@
+"""
+Transactional outbox worker for alert delivery
+issue_alert writes an alert_outbox row in the alert's own transaction; any
+number of worker processes claim rows with FOR UPDATE SKIP LOCKED, deliver
+them and record the results in bulk. While delivering, a worker keeps
+extending the lease on its rows, up to a per-delivery deadline after which
+the row goes back for retry; a crashed worker's rows are reclaimed once the
+lease expires, and the new owner resumes from the delivery log, sending only
+to recipients that were not reached yet.
+
+Run with: python -m app.services.outbox
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import time
+from typing import Dict, List
+from sqlalchemy import text
+from ..database import engine
+from ..config import settings
+from .notification import deliver_alert, delivery_log
+
+# How often each worker deletes expired delivery records
+DELIVERY_PURGE_SECONDS = 3600
+
+# Pending rows that are due, plus processing rows whose worker went silent
+CLAIM_QUERY = text("""
+    UPDATE alert_outbox o
+    SET status = 'processing',
+        locked_by = :worker,
+        locked_at = now(),
+        attempts = o.attempts + 1
+    WHERE o.id IN (
+        SELECT id
+        FROM alert_outbox
+        WHERE (status = 'pending' AND available_at <= now())
+            OR (status = 'processing' AND locked_at < now() - make_interval(secs => :lease_seconds))
+        ORDER BY id
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING o.id, o.alert_id, o.attempts
+""")
+
+# Lease heartbeat: rows still owned by this worker stay claimed while it delivers
+EXTEND_LEASE_QUERY = text("""
+    UPDATE alert_outbox
+    SET locked_at = now()
+    WHERE id = ANY(CAST(:ids AS int[])) AND locked_by = :worker AND status = 'processing'
+""")
+
+ALERT_COUNTERS_QUERY = text("""
+    UPDATE alerts a
+    SET status = 'sent',
+        sms_count = v.sms_count,
+        authority_notified = v.authority_notified
+    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS v(alert_id int, sms_count int, authority_notified boolean)
+    WHERE a.id = v.alert_id
+""")
+
+OUTBOX_DONE_QUERY = text("""
+    UPDATE alert_outbox
+    SET status = 'done', locked_by = NULL, locked_at = NULL, last_error = NULL
+    WHERE id = ANY(CAST(:ids AS int[])) AND locked_by = :worker
+""")
+
+# Failed rows go back to pending after their backoff, or to failed for good
+OUTBOX_RETRY_QUERY = text("""
+    UPDATE alert_outbox o
+    SET status = CASE WHEN o.attempts >= :max_attempts THEN 'failed' ELSE 'pending' END,
+        available_at = now() + make_interval(secs => v.backoff_seconds),
+        locked_by = NULL,
+        locked_at = NULL,
+        last_error = v.error
+    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS v(id int, backoff_seconds float, error text)
+    WHERE o.id = v.id AND o.locked_by = :worker
+""")
+
+ALERTS_FAILED_QUERY = text("""
+    UPDATE alerts
+    SET status = 'failed'
+    WHERE id IN (
+        SELECT alert_id FROM alert_outbox
+        WHERE id = ANY(CAST(:ids AS int[])) AND status = 'failed'
+    )
+""")
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def claim_batch(worker: str) -> List:
+    with engine.begin() as conn:
+        return conn.execute(CLAIM_QUERY, {
+            "worker": worker,
+            "lease_seconds": settings.outbox_lease_seconds,
+            "batch_size": settings.outbox_batch_size
+        }).fetchall()
+
+def extend_leases(worker: str, ids: List[int]) -> int:
+    """Bump locked_at of the worker's rows; returns how many it still owns"""
+    with engine.begin() as conn:
+        return conn.execute(EXTEND_LEASE_QUERY, {"ids": ids, "worker": worker}).rowcount
+
+async def keep_leases(worker: str, ids: List[int]):
+    """Extend the lease on `ids` every outbox_heartbeat_seconds until cancelled"""
+    while True:
+        await asyncio.sleep(settings.outbox_heartbeat_seconds)
+        try:
+            owned = await asyncio.to_thread(extend_leases, worker, ids)
+            if owned < len(ids):
+                print(f"Outbox {worker}: lost the lease on {len(ids) - owned} of {len(ids)} rows")
+        except Exception as e:
+            print(f"Outbox {worker}: lease heartbeat failed: {e}")
+
+def record_results(worker: str, delivered: List[Dict], failed: List[Dict]):
+    """Write alert counters and outbox outcomes for a whole batch in one transaction"""
+    with engine.begin() as conn:
+        if delivered:
+            conn.execute(ALERT_COUNTERS_QUERY, {"rows": json.dumps([row["counters"] for row in delivered])})
+            conn.execute(OUTBOX_DONE_QUERY, {"ids": [row["id"] for row in delivered], "worker": worker})
+        if failed:
+            conn.execute(OUTBOX_RETRY_QUERY, {
+                "rows": json.dumps([
+                    {"id": row["id"], "backoff_seconds": row["backoff_seconds"], "error": row["error"]}
+                    for row in failed
+                ]),
+                "max_attempts": settings.outbox_max_attempts,
+                "worker": worker
+            })
+            conn.execute(ALERTS_FAILED_QUERY, {"ids": [row["id"] for row in failed]})
+
+def _backoff(attempts: int) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, settings.outbox_retry_base_seconds * 2 ** (attempts - 1))
+
+async def process_batch(worker: str) -> int:
+    """Claim and deliver one batch; returns the number of rows claimed"""
+    claimed = await asyncio.to_thread(claim_batch, worker)
+    if not claimed:
+        return 0
+
+    semaphore = asyncio.Semaphore(settings.outbox_concurrency)
+    delivered, failed = [], []
+
+    async def deliver(row):
+        async with semaphore:
+            try:
+                # A wedged delivery must end, or the heartbeat would keep its row claimed forever
+                counters = await asyncio.wait_for(
+                    deliver_alert(row.alert_id), settings.outbox_delivery_timeout_seconds
+                )
+                if counters is None:
+                    # Alert deleted since: nothing left to deliver
+                    counters = {"alert_id": row.alert_id, "sms_count": 0, "authority_notified": False}
+                delivered.append({"id": row.id, "counters": counters})
+            except asyncio.TimeoutError:
+                error = f"Delivery exceeded {settings.outbox_delivery_timeout_seconds}s"
+                failed.append({"id": row.id, "backoff_seconds": _backoff(row.attempts), "error": error})
+            except Exception as e:
+                failed.append({"id": row.id, "backoff_seconds": _backoff(row.attempts), "error": str(e)[:1000]})
+
+    # Large alerts take far longer than the lease at provider rate limits
+    heartbeat = asyncio.create_task(keep_leases(worker, [row.id for row in claimed]))
+    try:
+        await asyncio.gather(*(deliver(row) for row in claimed))
+        await asyncio.to_thread(record_results, worker, delivered, failed)
+    finally:
+        heartbeat.cancel()
+    print(f"Outbox {worker}: {len(delivered)} delivered, {len(failed)} failed")
+    return len(claimed)
+
+async def run_worker():
+    """Poll the outbox until cancelled; drains back-to-back while work is waiting"""
+    worker = worker_id()
+    print(f"Alert outbox worker {worker} started")
+    last_purge = 0.0
+    while True:
+        if time.monotonic() - last_purge >= DELIVERY_PURGE_SECONDS:
+            last_purge = time.monotonic()
+            try:
+                purged = await asyncio.to_thread(delivery_log.purge)
+                print(f"Outbox {worker}: purged {purged} expired delivery records")
+            except Exception as e:
+                print(f"Delivery record purge failed: {e}")
+        try:
+            claimed = await process_batch(worker)
+        except Exception as e:
+            print(f"Outbox worker error: {e}")
+            claimed = 0
+        if claimed < settings.outbox_batch_size:
+            await asyncio.sleep(settings.outbox_poll_seconds)
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -0,0 +1,187 @@
+"""
+Time-range partition maintenance for append-only tables
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from ..database import engine
+from ..config import settings
+
+# Partitioned table -> partition key column (see __table_args__ in db_models)
+PARTITIONED_TABLES = {
+    "reports": "created_at",
+    "social_posts": "created_at",
+    "live_locations": "timestamp"
+}
+
+PARTITION_SUFFIX_FORMAT = "%Y%m%d"
+
+logger = logging.getLogger(__name__)
+
+def _interval() -> timedelta:
+    return timedelta(weeks=1) if settings.partition_interval == "weekly" else timedelta(days=1)
+
+def partition_start(moment: datetime) -> datetime:
+    """Start of the partition range containing `moment` (UTC midnight, Monday for weekly)"""
+    day = moment.astimezone(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    if settings.partition_interval == "weekly":
+        day -= timedelta(days=day.weekday())
+    return day
+
+def partition_name(table: str, start: datetime) -> str:
+    return f"{table}_p{start.strftime(PARTITION_SUFFIX_FORMAT)}"
+
+def _parse_partition_start(table: str, name: str) -> Optional[datetime]:
+    """Recover the range start from a managed partition name, None for others"""
+    prefix = f"{table}_p"
+    if not name.startswith(prefix):
+        return None
+    try:
+        return datetime.strptime(name[len(prefix):], PARTITION_SUFFIX_FORMAT).replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None
+
+def list_partitions(conn, table: str) -> List[str]:
+    """Names of the partitions currently attached to `table`"""
+    rows = conn.execute(text("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+    """), {"table": table})
+    return [row.relname for row in rows]
+
+# Highest upper bound among the partitions this module does not manage (not
+# <table>_p*, not the default), i.e. the <table>_legacy partition migration 002
+# attached for [MINVALUE, cutover). Postgres prints the bound as
+# FOR VALUES FROM (...) TO ('<timestamptz>'); MAXVALUE has no literal and is ignored.
+UNMANAGED_UPPER_BOUND_QUERY = text("""
+    SELECT max((regexp_match(pg_get_expr(child.relpartbound, child.oid), 'TO [(]''([^'']+)''[)]'))[1]::timestamptz)
+    FROM pg_inherits
+    JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+    WHERE parent.relname = :table
+        AND child.relname <> :default_partition
+        AND left(child.relname, length(:managed_prefix)) <> :managed_prefix
+""")
+
+def covered_until(conn, table: str) -> Optional[datetime]:
+    """End of the range already covered by unmanaged partitions of `table`, None if there are none"""
+    return conn.execute(UNMANAGED_UPPER_BOUND_QUERY, {
+        "table": table,
+        "default_partition": f"{table}_default",
+        "managed_prefix": f"{table}_p"
+    }).scalar()
+
+def _create_partition(conn, table: str, name: str, start: datetime, end: datetime):
+    """
+    Add the partition for [start, end). Rows already in that range sit in the
+    default partition, and Postgres refuses a new partition overlapping them,
+    so the table is built detached, those rows are moved into it and it is
+    attached afterwards, all in the caller's transaction.
+    """
+    column = PARTITIONED_TABLES[table]
+    # Bounds are DDL literals, they cannot be bound parameters
+    bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    moved = conn.execute(text(f"""
+        WITH moved AS (
+            DELETE FROM {table}_default WHERE {column} >= :start AND {column} < :end RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+    """), {"start": start, "end": end}).rowcount
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    if moved:
+        logger.info("Moved %d rows of %s from the default partition into %s", moved, table, name)
+
+def ensure_partitions(now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Create the current and upcoming partitions (plus a default catch-all)
+    for every partitioned table. Idempotent.
+
+    Ranges below the legacy partition's upper bound are already covered and
+    are skipped; a range the bound falls inside starts at the bound instead,
+    keeping the name of its full range.
+    """
+    now = now or datetime.now(timezone.utc)
+    step = _interval()
+    first = partition_start(now)
+    created = {}
+
+    with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            existing = set(list_partitions(conn, table))
+            covered = covered_until(conn, table)
+            count = 0
+
+            if f"{table}_default" not in existing:
+                conn.execute(text(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"))
+                count += 1
+
+            for i in range(settings.partition_premake + 1):
+                start = first + step * i
+                end = start + step
+                name = partition_name(table, start)
+                if name in existing or (covered is not None and end <= covered):
+                    continue
+                if covered is not None and start < covered:
+                    start = covered
+                _create_partition(conn, table, name, start, end)
+                count += 1
+
+            created[table] = count
+
+    return created
+
+def expire_partitions(now: Optional[datetime] = None) -> Dict[str, List[str]]:
+    """
+    Detach partitions that ended before the table's retention window and
+    move them to the archive schema (or drop them when archiving is off)
+    """
+    now = now or datetime.now(timezone.utc)
+    step = _interval()
+    archive_schema = settings.partition_archive_schema
+    expired = {}
+
+    with engine.begin() as conn:
+        if archive_schema:
+            conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+
+        for table in PARTITIONED_TABLES:
+            retention = settings.partition_retention_days.get(table)
+            if not retention:
+                continue
+            cutoff = now - timedelta(days=retention)
+            expired[table] = []
+
+            for name in list_partitions(conn, table):
+                start = _parse_partition_start(table, name)
+                if start is None or start + step > cutoff:
+                    continue
+
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                if archive_schema:
+                    conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+                else:
+                    conn.execute(text(f"DROP TABLE {name}"))
+                expired[table].append(name)
+
+    return expired
+
+def run_partition_maintenance() -> Dict[str, Dict]:
+    """Create upcoming partitions and expire old ones"""
+    result = {"created": ensure_partitions(), "expired": expire_partitions()}
+    logger.info("Partition maintenance: %s", result)
+    return result
+
+async def partition_maintenance_loop():
+    """Background loop started from the app lifespan"""
+    while True:
+        await asyncio.sleep(settings.partition_maintenance_minutes * 60)
+        try:
+            await asyncio.to_thread(run_partition_maintenance)
+        except Exception:
+            logger.exception("Partition maintenance failed")
@@ -0,0 +1,52 @@
+"""
+Spatial recipient resolution for zone alerts
+Matches users' last known positions against the zone geometry in PostGIS and
+streams them through a server-side cursor, so audiences of any size flow
+into the notification dispatcher chunk by chunk.
+"""
+import asyncio
+from typing import AsyncIterator, Tuple
+from sqlalchemy import text
+from ..database import engine
+from ..config import settings
+
+# ST_DWithin on the two geography columns uses the GIST index on
+# users.last_known_geom; a distance of 0 is a plain intersection test
+ZONE_RECIPIENTS_QUERY = text("""
+    SELECT u.id, u.phone_hash
+    FROM zones z
+    JOIN users u ON ST_DWithin(u.last_known_geom, z.geom, :buffer_m)
+    WHERE z.id = :zone_id
+        AND u.phone_hash IS NOT NULL
+""")
+
+async def stream_zone_recipients(
+    zone_id: int,
+    buffer_m: float = None,
+    chunk_size: int = None
+) -> AsyncIterator[Tuple[str, str]]:
+    """
+    Yield (user_id, phone_hash) for every user inside the zone, or within
+    `buffer_m` metres of it. Rows are fetched `chunk_size` at a time from a
+    server-side cursor in a worker thread; the event loop never blocks and
+    at most one chunk is held in memory.
+    """
+    buffer_m = settings.alert_recipient_buffer_m if buffer_m is None else buffer_m
+    chunk_size = chunk_size or settings.alert_recipient_chunk_size
+
+    conn = await asyncio.to_thread(
+        lambda: engine.connect().execution_options(stream_results=True, max_row_buffer=chunk_size)
+    )
+    try:
+        result = await asyncio.to_thread(conn.execute, ZONE_RECIPIENTS_QUERY, {
+            "zone_id": zone_id,
+            "buffer_m": buffer_m
+        })
+        while True:
+            rows = await asyncio.to_thread(result.fetchmany, chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                yield str(row.id), row.phone_hash
+    finally:
+        await asyncio.to_thread(conn.close)
@@ -0,0 +1,171 @@
+"""
+Reporter trust scoring backed by the database
+Each verification outcome is folded into the reporter's running aggregates
+(user_trust_aggregates) in O(1); scores are read from those aggregates
+without replaying the reporter's history.
+
+The nightly job rebuilding every reporter's aggregates (and so their
+persisted score) from the full trust_events log runs with:
+python -m app.services.trust
+"""
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import numpy as np
+from sqlalchemy import text
+from ml.trust_score_engine import (
+    TrustScoreEngine, SQLTrustStore, TrustEvent, TrustEventColumns, ReportType, EVENT_TYPES
+)
+from ..database import engine
+from ..models.db_models import Report
+from ..config import settings
+
+TRUST_EVENTS_QUERY = text("""
+    SELECT user_id, event_type, extract(epoch FROM timestamp) AS ts, confidence, report_complexity,
+           verification_source, location_accuracy, time_to_verify_seconds
+    FROM trust_events
+""")
+
+USER_TRUST_EVENTS_QUERY = text("""
+    SELECT event_type, timestamp, confidence, report_complexity,
+           verification_source, location_accuracy, time_to_verify_seconds
+    FROM trust_events
+    WHERE user_id = :user_id
+    ORDER BY timestamp
+""")
+
+# Rows whose aggregates took new events since the log was read keep them (total no longer matches)
+TRUST_AGGREGATES_UPDATE = text("""
+    UPDATE user_trust_aggregates a
+    SET state = v.state,
+        trust_score = v.trust_score,
+        confidence = v.confidence,
+        updated_at = now()
+    FROM jsonb_to_recordset(CAST(:rows AS jsonb)) AS v(user_id text, state jsonb, trust_score float, confidence float)
+    WHERE a.user_id = v.user_id
+        AND (a.state ->> 'total')::int = (v.state ->> 'total')::int
+""")
+
+trust_engine = TrustScoreEngine(store=SQLTrustStore(engine))
+
+def record_report_outcome(
+    report: Report,
+    event_type: ReportType = ReportType.VERIFIED_CORRECT,
+    verification_source: str = "analyst"
+) -> Optional[Dict]:
+    """Record the verification outcome of a user's report; returns the updated trust score"""
+    if not report.user_id:
+        return None
+    now = datetime.now(timezone.utc)
+    created_at = report.created_at or now
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return trust_engine.record_event(TrustEvent(
+        user_id=str(report.user_id),
+        event_type=event_type,
+        timestamp=now,
+        confidence=report.confidence or 0.0,
+        report_complexity=0.5,
+        verification_source=verification_source,
+        location_accuracy=1.0 if report.lat is not None and report.lon is not None else 0.5,
+        time_to_verify=max(now - created_at, timedelta(0))
+    ))
+
+def load_user_trust_events(user_id: str) -> List[TrustEvent]:
+    """A reporter's full event log, for auditing the running aggregates"""
+    event_types = {t.value: t for t in EVENT_TYPES}
+    with engine.connect() as conn:
+        rows = conn.execute(USER_TRUST_EVENTS_QUERY, {"user_id": user_id}).fetchall()
+    return [
+        TrustEvent(
+            user_id=user_id,
+            event_type=event_types.get(row.event_type, ReportType.UNVERIFIED),
+            # calculate_trust_score works in naive UTC
+            timestamp=row.timestamp.astimezone(timezone.utc).replace(tzinfo=None),
+            confidence=row.confidence or 0.0,
+            report_complexity=row.report_complexity or 0.0,
+            verification_source=row.verification_source or "",
+            location_accuracy=row.location_accuracy or 0.0,
+            time_to_verify=timedelta(seconds=row.time_to_verify_seconds or 0.0)
+        )
+        for row in rows
+    ]
+
+def load_trust_event_columns() -> TrustEventColumns:
+    """Every trust event as parallel NumPy arrays, read through a server-side cursor"""
+    chunks = []
+    with engine.connect().execution_options(stream_results=True) as conn:
+        result = conn.execute(TRUST_EVENTS_QUERY)
+        while True:
+            rows = result.fetchmany(settings.trust_recompute_fetch_size)
+            if not rows:
+                break
+            chunks.append([np.array(column) for column in zip(*rows)])
+
+    if not chunks:
+        empty = np.array([])
+        return TrustEventColumns(np.array([], dtype=object), empty.astype(np.int64), empty.astype(np.int64),
+                                 empty, empty, empty, np.array([], dtype=object), empty, empty)
+
+    user_col, type_col, ts, confidence, complexity, source, location, verify = (
+        np.concatenate(parts) for parts in zip(*chunks)
+    )
+    user_ids, users = np.unique(user_col.astype(str), return_inverse=True)
+    # Event type names to ReportType codes, one dict lookup per distinct name
+    type_names, type_index = np.unique(type_col.astype(str), return_inverse=True)
+    codes = {t.value: i for i, t in enumerate(EVENT_TYPES)}
+    unverified = codes[ReportType.UNVERIFIED.value]
+    event_types = np.array([codes.get(name, unverified) for name in type_names], dtype=np.int64)[type_index]
+
+    as_float = lambda column, default: np.where(column == None, default, column).astype(float)  # noqa: E711
+    return TrustEventColumns(
+        user_ids=user_ids,
+        users=users,
+        event_types=event_types,
+        timestamps=ts.astype(float),
+        confidence=as_float(confidence, 0.0),
+        report_complexity=as_float(complexity, 0.0),
+        verification_sources=np.where(source == None, "", source).astype(str),  # noqa: E711
+        location_accuracy=as_float(location, 0.0),
+        time_to_verify_seconds=as_float(verify, 0.0)
+    )
+
+def recompute_all_trust_scores() -> Dict:
+    """Rebuild every reporter's aggregates from the full event log and write them back in bulk
+
+    The stored score is score_aggregate of the rebuilt aggregates, the same
+    definition record_event keeps applying to them afterwards.
+    """
+    started = time.monotonic()
+    columns = load_trust_event_columns()
+    loaded = time.monotonic()
+    aggregates = trust_engine.build_aggregates_bulk(columns)
+    rows = []
+    for aggregate in aggregates:
+        score = trust_engine.score_aggregate(aggregate)
+        rows.append({
+            "user_id": aggregate.user_id,
+            "state": aggregate.to_dict(),
+            "trust_score": score["trust_score"],
+            "confidence": score["confidence"]
+        })
+    scored = time.monotonic()
+
+    batch = settings.trust_recompute_write_batch
+    updated = 0
+    with engine.begin() as conn:
+        for start in range(0, len(rows), batch):
+            updated += conn.execute(TRUST_AGGREGATES_UPDATE, {"rows": json.dumps(rows[start:start + batch])}).rowcount
+
+    return {
+        "users": len(rows),
+        "updated": updated,
+        "events": int(len(columns.users)),
+        "load_seconds": round(loaded - started, 3),
+        "score_seconds": round(scored - loaded, 3),
+        "write_seconds": round(time.monotonic() - scored, 3)
+    }
+
+if __name__ == "__main__":
+    print(f"Trust recompute: {recompute_all_trust_scores()}")
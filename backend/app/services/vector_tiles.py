@@ -0,0 +1,210 @@
+"""
+Mapbox vector tile rendering for the live map layers using PostGIS ST_AsMVT
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..websocket_manager import websocket_manager
+
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+WEB_MERCATOR_WORLD_M = 40075016.68557849
+
+LAYERS = ("reports", "zones", "hotspots")
+
+# Layers whose version changes whenever a given table is written
+LAYERS_BY_TABLE = {
+    "reports": ("reports",),
+    "zones": ("zones", "hotspots")
+}
+
+# Tile envelope in 3857 for clipping and in 4326 geography for the GIST
+# index lookups on the stored geom columns
+_BOUNDS_CTE = f"""
+    bounds AS (
+        SELECT
+            ST_TileEnvelope(:z, :x, :y) AS env,
+            ST_Transform(ST_TileEnvelope(:z, :x, :y, margin => {TILE_BUFFER / TILE_EXTENT}), 4326)::geography AS search
+    )
+"""
+
+REPORT_POINTS_TILE_QUERY = text(f"""
+    WITH {_BOUNDS_CTE},
+    mvtgeom AS (
+        SELECT
+            ST_AsMVTGeom(ST_Transform(r.geom::geometry, 3857), bounds.env, {TILE_EXTENT}, {TILE_BUFFER}, true) AS geom,
+            r.id,
+            r.hazard_type,
+            r.severity,
+            r.confidence,
+            r.verified,
+            r.status
+        FROM reports r, bounds
+        WHERE r.created_at >= now() - make_interval(hours => :window_hours)
+            AND r.geom && bounds.search
+    )
+    SELECT ST_AsMVT(mvtgeom.*, 'reports', {TILE_EXTENT}, 'geom') FROM mvtgeom
+""")
+
+# Low zooms: one point per grid cell carrying the count and worst severity
+REPORT_CLUSTERS_TILE_QUERY = text(f"""
+    WITH {_BOUNDS_CTE},
+    pts AS (
+        SELECT
+            ST_Transform(r.geom::geometry, 3857) AS geom,
+            CASE r.severity WHEN 'high' THEN 3 WHEN 'medium' THEN 2 ELSE 1 END AS severity_rank,
+            r.confidence
+        FROM reports r, bounds
+        WHERE r.created_at >= now() - make_interval(hours => :window_hours)
+            AND r.geom && bounds.search
+    ),
+    cells AS (
+        SELECT
+            ST_Centroid(ST_Collect(geom)) AS geom,
+            COUNT(*) AS point_count,
+            MAX(severity_rank) AS max_severity,
+            AVG(confidence) AS avg_confidence
+        FROM pts
+        GROUP BY ST_SnapToGrid(geom, :cell_size)
+    ),
+    mvtgeom AS (
+        SELECT
+            ST_AsMVTGeom(cells.geom, bounds.env, {TILE_EXTENT}, {TILE_BUFFER}, true) AS geom,
+            point_count,
+            max_severity,
+            avg_confidence
+        FROM cells, bounds
+    )
+    SELECT ST_AsMVT(mvtgeom.*, 'reports', {TILE_EXTENT}, 'geom') FROM mvtgeom
+""")
+
+ZONES_TILE_QUERY = text(f"""
+    WITH {_BOUNDS_CTE},
+    mvtgeom AS (
+        SELECT
+            ST_AsMVTGeom(
+                ST_SimplifyPreserveTopology(ST_Transform(z.geom::geometry, 3857), :tolerance),
+                bounds.env, {TILE_EXTENT}, {TILE_BUFFER}, true
+            ) AS geom,
+            z.id,
+            z.type,
+            z.name,
+            z.avg_confidence,
+            z.report_count,
+            z.radius_km
+        FROM zones z, bounds
+        WHERE z.active
+            AND z.geom && bounds.search
+    )
+    SELECT ST_AsMVT(mvtgeom.*, 'zones', {TILE_EXTENT}, 'geom') FROM mvtgeom
+""")
+
+HOTSPOTS_TILE_QUERY = text(f"""
+    WITH {_BOUNDS_CTE},
+    mvtgeom AS (
+        SELECT
+            ST_AsMVTGeom(ST_Transform(ST_Centroid(z.geom::geometry), 3857), bounds.env, {TILE_EXTENT}, {TILE_BUFFER}, true) AS geom,
+            z.id AS cluster_id,
+            z.avg_confidence,
+            z.report_count,
+            z.radius_km
+        FROM zones z, bounds
+        WHERE z.active
+            AND z.type = 'red'
+            AND z.geom && bounds.search
+    )
+    SELECT ST_AsMVT(mvtgeom.*, 'hotspots', {TILE_EXTENT}, 'geom') FROM mvtgeom
+""")
+
+def tile_pixel_size(z: int) -> float:
+    """Web Mercator metres covered by one tile-extent unit at zoom z"""
+    return WEB_MERCATOR_WORLD_M / (2 ** z) / TILE_EXTENT
+
+def valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= 22 and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+class TileCache:
+    """
+    LRU of rendered tiles keyed by layer data version
+
+    A bump picks a fresh version token and publishes it on the realtime bus,
+    so every worker switches to the same version (and ETag). Each version
+    also rolls over after a fixed period, which bounds how long a worker
+    that missed a bump (e.g. during a bus reconnect) keeps serving it.
+    """
+
+    def __init__(self, max_tiles: int = 2048):
+        self.max_tiles = max_tiles
+        self._tiles: OrderedDict = OrderedDict()
+        self._versions: Dict[str, str] = {layer: "0" for layer in LAYERS}
+        self._lock = threading.Lock()
+
+    def version(self, layer: str) -> str:
+        """
+        Data version of a layer. The report layer only shows a sliding time
+        window, so it rolls over every refresh period; the others after
+        tile_version_max_age_seconds.
+        """
+        period = settings.tile_report_refresh_seconds if layer == "reports" else settings.tile_version_max_age_seconds
+        return f"{self._versions[layer]}.{int(time.time() // period)}"
+
+    def bump(self, table: str):
+        """Invalidate every layer rendered from `table`, on every worker"""
+        token = format(time.time_ns(), "x")
+        self.apply_bump({"table": table, "version": token})
+        websocket_manager.publish_threadsafe("tiles_changed", {"table": table, "version": token})
+
+    def apply_bump(self, data: dict):
+        """Switch the layers of data["table"] to the published version token"""
+        with self._lock:
+            for layer in LAYERS_BY_TABLE.get(data.get("table"), ()):
+                self._versions[layer] = str(data["version"])
+
+    def get(self, key: Tuple) -> Optional[bytes]:
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+            return tile
+
+    def put(self, key: Tuple, tile: bytes):
+        with self._lock:
+            self._tiles[key] = tile
+            if len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+
+tile_cache = TileCache(max_tiles=settings.tile_cache_size)
+websocket_manager.add_listener("tiles_changed", tile_cache.apply_bump)
+
+def render_tile(db: Session, layer: str, z: int, x: int, y: int) -> Tuple[bytes, str]:
+    """Return (tile bytes, version) for a layer tile, rendering it on cache miss"""
+    version = tile_cache.version(layer)
+    key = (layer, version, z, x, y)
+
+    tile = tile_cache.get(key)
+    if tile is not None:
+        return tile, version
+
+    params = {"z": z, "x": x, "y": y}
+    if layer == "reports":
+        params["window_hours"] = settings.tile_report_window_hours
+        if z < settings.tile_aggregate_below_zoom:
+            params["cell_size"] = tile_pixel_size(z) * settings.tile_cluster_cell_px
+            query = REPORT_CLUSTERS_TILE_QUERY
+        else:
+            query = REPORT_POINTS_TILE_QUERY
+    elif layer == "zones":
+        params["tolerance"] = tile_pixel_size(z)
+        query = ZONES_TILE_QUERY
+    else:
+        query = HOTSPOTS_TILE_QUERY
+
+    result = db.execute(query, params).scalar()
+    tile = bytes(result) if result is not None else b""
+
+    tile_cache.put(key, tile)
+    return tile, version
@@ -2,51 +2,499 @@
 WebSocket connection manager for real-time updates
 """
 from fastapi import WebSocket
-from typing import List
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import asyncio
 import json
+import time
+
+from .config import settings
+from .database import SessionLocal
+from .event_stream import (
+    ReplayBuffer, StreamEvent, ZoneDeltaTracker, build_frame, encode_frame, supported_encoding
+)
+from .realtime_snapshot import warm_snapshot
+from realtime.bus import STREAM_POSITION, create_bus, new_epoch
+from realtime.connection import BroadcastMetrics, ClientConnection
+from realtime.geo_subscriptions import BBox, Subscription, SubscriptionIndex, point_bbox, radius_bbox, parse_bbox
+from realtime.snapshot import RealtimeSnapshot
 
 class WebSocketManager:
+    """
+    Per-process connection registry. Public broadcast_* methods publish to
+    the realtime bus; every worker (this one included) delivers what it
+    receives from the bus to its own sockets, batching events that arrive
+    within websocket_batch_window_ms into one frame per client.
+
+    Each broadcast is one bus event sequenced by the bus, so every worker
+    numbers it the same and a client can resume on any worker. When this
+    worker misses events (bus outage, gap in the sequence) or has to deliver
+    locally, it moves to the new stream position, reloads its snapshot and
+    tells its clients to resync.
+    """
+
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.bus = None
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.metrics = BroadcastMetrics()
+        self.subscriptions = SubscriptionIndex(cell_degrees=settings.websocket_subscription_cell_degrees)
+        # Connections without a subscription (receive regional events only if
+        # websocket_unsubscribed_receive_all is on)
+        self._unfiltered: Set[WebSocket] = set()
+        self.stream = ReplayBuffer(size=settings.websocket_replay_buffer_size)
+        # True while delivering without the bus under a stream of this worker's own
+        self._local_stream = False
+        self.zone_deltas = ZoneDeltaTracker()
+        self.snapshot = self._new_snapshot()
+        self._pending: List[StreamEvent] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self.frames_sent = 0
+        # Bus events handled by other modules (cache invalidation and the like), by event name
+        self._listeners: Dict[str, List[Callable[[dict], None]]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def start(self):
+        """Warm the snapshot and attach to the realtime bus; called from the app lifespan"""
+        await self._reload_snapshot()
+        self._loop = asyncio.get_running_loop()
+        self.bus = await create_bus(
+            self._dispatch,
+            kind=settings.realtime_bus,
+            redis_url=settings.redis_url,
+            channel=settings.realtime_channel
+        )
+
+    @staticmethod
+    def _new_snapshot() -> RealtimeSnapshot:
+        return RealtimeSnapshot(
+            report_window_hours=settings.snapshot_report_window_hours,
+            alert_window_hours=settings.snapshot_alert_window_hours,
+            max_reports=settings.snapshot_max_reports
+        )
+
+    def _load_snapshot(self) -> RealtimeSnapshot:
+        snapshot = self._new_snapshot()
+        db = SessionLocal()
+        try:
+            warm_snapshot(snapshot, db)
+        finally:
+            db.close()
+        return snapshot
+
+    async def _reload_snapshot(self) -> bool:
+        """Replace the snapshot with one loaded from the database (off the event loop)"""
+        try:
+            snapshot = await asyncio.to_thread(self._load_snapshot)
+        except Exception as e:
+            print(f"Realtime snapshot load failed, keeping the current one: {e}")
+            return False
+        snapshot.version = self.snapshot.version + 1
+        self.snapshot = snapshot
+        return True
+
+    async def stop(self):
+        if self.bus is not None:
+            await self.bus.stop()
+            self.bus = None
+        self._flush()
+
+    async def _publish(self, event: str, data: dict):
+        if self.bus is None:
+            # Not started (scripts, tests): deliver locally
+            await self._dispatch({"event": event, "data": data})
+            return
+        try:
+            # Broadcasts are sequenced by the bus; listener events are not part of the stream
+            await self.bus.publish({"event": event, "data": data}, sequenced=event in self._DELIVERY)
+        except Exception as e:
+            # A disconnected bus already logs its outage; don't repeat it per event
+            if self.bus.connected:
+                print(f"Realtime bus publish failed, delivering locally: {e}")
+            await self._dispatch({"event": event, "data": data})
+
+    def publish_threadsafe(self, event: str, data: dict):
+        """
+        Publish from synchronous code, including threadpool endpoints. Does
+        nothing before start(); callers apply their own change locally first.
+        """
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            loop.create_task(self._publish(event, data))
+        else:
+            asyncio.run_coroutine_threadsafe(self._publish(event, data), loop)
+
+    async def publish(self, event: str, data: dict):
+        """Publish an event for the listeners of every worker; it is not sent to clients"""
+        await self._publish(event, data)
+
+    def add_listener(self, event: str, listener: Callable[[dict], None]):
+        """Call `listener(data)` for every `event` received from the bus, on every worker"""
+        self._listeners.setdefault(event, []).append(listener)
+
+    async def _dispatch(self, event: dict):
+        name = event.get("event")
+        if name == STREAM_POSITION:
+            self._follow(event["epoch"], event["seq"])
+            return
+        if "seq" in event and event["epoch"] == self.stream.epoch and event["seq"] <= self.stream.seq:
+            return  # Already delivered
+        for listener in self._listeners.get(name, ()):
+            try:
+                listener(event["data"])
+            except Exception as e:
+                print(f"Realtime listener for {name} failed: {e}")
+        deliver = self._DELIVERY.get(name)
+        if deliver is None:
+            return
+        if "seq" in event:
+            self._follow(event["epoch"], event["seq"] - 1)
+        elif not self._local_stream:
+            # Bus down or not started: number this worker's events under its own epoch
+            self._follow(new_epoch(), 0, local=True)
+        deliver(self, event["data"])
+
+    def _follow(self, epoch: str, seq: int, local: bool = False):
+        """
+        Continue the stream at (epoch, seq), the position just before the next
+        event. Moving anywhere but straight ahead means this worker's clients
+        (and snapshot) may lack events, so they are told to resync.
+        """
+        self._local_stream = local
+        if epoch == self.stream.epoch and seq == self.stream.seq:
+            return
+        self._flush()
+        missed = self.stream.seq > 0
+        self.stream.reset(epoch, seq)
+        if missed:
+            asyncio.create_task(self._resync_clients(epoch, seq))
+        else:
+            self._notify_resync(epoch, seq)
+
+    async def _resync_clients(self, epoch: str, seq: int):
+        await self._reload_snapshot()
+        self._notify_resync(epoch, seq)
+
+    def _notify_resync(self, epoch: str, seq: int):
+        """Tell every client to reload (reconnect for a fresh snapshot); the stream went on from (epoch, seq)"""
+        if not self.active_connections:
+            return
+        notice = json.dumps({"type": "resync", "epoch": epoch, "seq": seq})
+        for connection in list(self.active_connections.values()):
+            connection.enqueue(notice, urgent=True)
+
+    async def broadcast_new_report(self, report_data: dict):
+        """Broadcast a new report to subscribed clients on every worker"""
+        await self._publish("new_report", report_data)
+
+    async def broadcast_new_zone(self, zone_data: dict):
+        """Broadcast a new zone to subscribed clients on every worker"""
+        await self._publish("new_zone", zone_data)
+
+    async def broadcast_zone_changes(self, changes: dict):
+        """
+        Broadcast a clustering run's zone diff to subscribed clients on every
+        worker, one event per zone; they go out together in the same batch
+        """
+        for zone in changes.get("created", []):
+            await self._publish("zone_created", zone)
+        for zone in changes.get("updated", []):
+            await self._publish("zone_updated", zone)
+        for zone_id in changes.get("deactivated", []):
+            await self._publish("zone_deactivated", {"zone_id": zone_id})
+
+    async def broadcast_alert_issued(self, alert_data: dict):
+        """Broadcast an alert to subscribed clients on every worker"""
+        await self._publish("alert_issued", alert_data)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        connection = ClientConnection(
+            websocket,
+            metrics=self.metrics,
+            on_close=lambda: self.disconnect(websocket),
+            max_queue=settings.websocket_queue_size,
+            policy=settings.websocket_slow_consumer_policy,
+            send_timeout=settings.websocket_send_timeout_seconds
+        )
+        # ?encoding=msgpack switches event frames to binary msgpack
+        connection.encoding = supported_encoding(websocket.query_params.get("encoding"))
+        self.active_connections[websocket] = connection
+        self._unfiltered.add(websocket)
+
+        # First message: current state plus the stream position it reflects;
+        # events with a higher seq are the diffs to apply on top of it
+        # (urgent so an alert flushed in the meantime cannot overtake it)
+        connection.enqueue(self.snapshot.encoded(
+            epoch=self.stream.epoch,
+            seq=self.stream.seq,
+            encoding=connection.encoding
+        ), urgent=True)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.subscriptions.unsubscribe(websocket)
+        self._unfiltered.discard(websocket)
+        connection = self.active_connections.pop(websocket, None)
+        if connection is not None:
+            connection.close()
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
+        connection = self.active_connections.get(websocket)
+        if connection is not None:
+            connection.enqueue(message)
+
+    async def handle_client_message(self, websocket: WebSocket, data: str):
+        """
+        Apply a client control message. Supported actions:
+        {"action": "subscribe", "bbox": [min_lon, min_lat, max_lon, max_lat],
+         "geohashes": ["tdr1", ...], "hazard_types": ["flood", ...]}
+        {"action": "unsubscribe"}
+        {"action": "resume", "epoch": "...", "seq": 42}
+        Anything else is echoed back.
+        """
+        try:
+            message = json.loads(data)
+        except ValueError:
+            message = None
+
+        if not isinstance(message, dict) or "action" not in message:
+            await self.send_personal_message(f"Echo: {data}", websocket)
+            return
 
-    async def broadcast(self, message: dict):
-        """Broadcast message to all connected clients"""
-        message_str = json.dumps(message)
-        for connection in self.active_connections:
+        action = message["action"]
+        if action == "subscribe":
             try:
-                await connection.send_text(message_str)
-            except:
-                # Remove broken connections
-                self.active_connections.remove(connection)
+                subscription = Subscription.from_message(message)
+            except (TypeError, ValueError) as e:
+                await self._reply(websocket, {"type": "error", "action": action, "detail": str(e)})
+                return
+            self.subscriptions.subscribe(websocket, subscription)
+            self._unfiltered.discard(websocket)
+            await self._reply(websocket, {
+                "type": "subscribed",
+                "areas": [list(area) for area in subscription.areas],
+                "hazard_types": sorted(subscription.hazard_types) if subscription.hazard_types else None
+            })
+        elif action == "unsubscribe":
+            self.subscriptions.unsubscribe(websocket)
+            if websocket in self.active_connections:
+                self._unfiltered.add(websocket)
+            await self._reply(websocket, {"type": "unsubscribed"})
+        elif action == "resume":
+            self._resume(websocket, message)
+        else:
+            await self._reply(websocket, {"type": "error", "action": action, "detail": "Unknown action"})
 
-    async def broadcast_new_report(self, report_data: dict):
-        """Broadcast new report to all clients"""
-        await self.broadcast({
+    async def _reply(self, websocket: WebSocket, message: dict):
+        await self.send_personal_message(json.dumps(message), websocket)
+
+    def _resume(self, websocket: WebSocket, message: dict):
+        """
+        Replay buffered events after the client's last seq (filtered by its
+        current subscription), or tell it to resync when they are gone
+        """
+        connection = self.active_connections.get(websocket)
+        if connection is None:
+            return
+
+        missed = None
+        if message.get("epoch") == self.stream.epoch and isinstance(message.get("seq"), int):
+            missed = self.stream.since(message["seq"])
+
+        if missed is None:
+            connection.enqueue(json.dumps({"type": "resync", "epoch": self.stream.epoch, "seq": self.stream.seq}))
+            return
+
+        missed = [event for event in missed if self._receives(websocket, event)]
+        if missed:
+            connection.enqueue(encode_frame(build_frame(missed), connection.encoding))
+
+    def _receives(self, websocket: WebSocket, event: StreamEvent) -> bool:
+        if event.bbox is None:
+            return True
+        if websocket in self._unfiltered:
+            return settings.websocket_unsubscribed_receive_all
+        return websocket in self.subscriptions.match(event.bbox, event.hazard_types)
+
+    def _recipients(self, bbox: Optional[BBox], hazard_types: Optional[Iterable[str]]) -> List[WebSocket]:
+        """Sockets an event should reach; every socket when the event has no location"""
+        if bbox is None:
+            return list(self.active_connections)
+        recipients = list(self.subscriptions.match(bbox, hazard_types))
+        if settings.websocket_unsubscribed_receive_all:
+            recipients.extend(self._unfiltered)
+        return recipients
+
+    def broadcast(
+        self,
+        message: dict,
+        key: Optional[str] = None,
+        urgent: bool = False,
+        bbox: Optional[BBox] = None,
+        hazard_types: Optional[Iterable[str]] = None
+    ):
+        """
+        Queue message for this worker's clients. Events with a bbox only reach
+        subscribers whose areas (and hazard filters) they match. Urgent
+        events flush the batch immediately; others wait for the batch window.
+        """
+        event = StreamEvent(self.stream.next_seq(), message, bbox, hazard_types, key, urgent)
+        self.stream.append(event)
+        self._pending.append(event)
+
+        if urgent or settings.websocket_batch_window_ms <= 0:
+            self._flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(settings.websocket_batch_window_ms / 1000)
+        self._flush_task = None
+        self._flush()
+
+    def _flush(self):
+        """
+        Send pending events. Clients receiving the same set of events share
+        one frame, serialized once per encoding.
+        """
+        events, self._pending = self._pending, []
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if not events:
+            return
+
+        started = time.perf_counter()
+        received: Dict[WebSocket, List[int]] = {}
+        for i, event in enumerate(events):
+            for websocket in self._recipients(event.bbox, event.hazard_types):
+                received.setdefault(websocket, []).append(i)
+
+        groups: Dict[Tuple[int, ...], List[WebSocket]] = {}
+        for websocket, indexes in received.items():
+            groups.setdefault(tuple(indexes), []).append(websocket)
+
+        recipients = 0
+        for indexes, websockets in groups.items():
+            batch = [events[i] for i in indexes]
+            frame = build_frame(batch)
+            key = batch[0].key if len(batch) == 1 else None
+            urgent = any(event.urgent for event in batch)
+            encoded = {}
+            for websocket in websockets:
+                # Slow-consumer disconnects during fan-out leave the dict
+                connection = self.active_connections.get(websocket)
+                if connection is None:
+                    continue
+                if connection.encoding not in encoded:
+                    encoded[connection.encoding] = encode_frame(frame, connection.encoding)
+                connection.enqueue(encoded[connection.encoding], key=key, urgent=urgent, seq=batch[-1].seq)
+                recipients += 1
+
+        self.frames_sent += recipients
+        self.metrics.record_fanout(recipients, time.perf_counter() - started)
+
+    def _deliver_new_report(self, report_data: dict):
+        """Send a new report to local clients subscribed to its location"""
+        self.snapshot.apply("new_report", report_data)
+        self.broadcast({
             "type": "new_report",
             "data": report_data
-        })
+        }, bbox=point_bbox(report_data["lat"], report_data["lon"]),
+            hazard_types=[report_data.get("hazard_type")])
 
-    async def broadcast_new_zone(self, zone_data: dict):
-        """Broadcast new zone creation to all clients"""
-        await self.broadcast({
+    def _deliver_new_zone(self, zone_data: dict):
+        """Send a new zone to local clients subscribed to its area"""
+        self.snapshot.apply("new_zone", zone_data)
+        self.broadcast({
             "type": "new_zone",
-            "data": zone_data
+            "data": self.zone_deltas.created(zone_data)
+        }, key=f"zone:{zone_data.get('zone_id')}",
+            bbox=self._event_bbox(zone_data),
+            hazard_types=zone_data.get("hazard_types"))
+
+    def _deliver_zone_created(self, zone: dict):
+        """Send a zone created by a clustering run to local clients subscribed to its area"""
+        self.snapshot.apply("zone_created", zone)
+        self.broadcast({
+            "type": "zone_created",
+            "data": self.zone_deltas.created(zone)
+        }, key=f"zone:{zone['zone_id']}",
+            bbox=self._event_bbox(zone), hazard_types=zone.get("hazard_types"))
+
+    def _deliver_zone_updated(self, zone: dict):
+        """
+        Send a zone update to local clients subscribed to its area, as the
+        changed fields only once the zone's previous state was broadcast.
+        A delta is never coalesced (it has no key): replacing it would lose
+        the fields it changed.
+        """
+        self.snapshot.apply("zone_updated", zone)
+        data = self.zone_deltas.updated(zone)
+        self.broadcast({
+            "type": "zone_updated",
+            "data": data
+        }, key=None if data.get("delta") else f"zone:{zone['zone_id']}",
+            bbox=self._event_bbox(zone), hazard_types=zone.get("hazard_types"))
+
+    def _deliver_zone_deactivated(self, data: dict):
+        """Send a zone deactivation to every local client (no location left to route by)"""
+        zone_id = data["zone_id"]
+        self.zone_deltas.deactivated(zone_id)
+        self.snapshot.apply("zone_deactivated", {"zone_id": zone_id})
+        self.broadcast({
+            "type": "zone_deactivated",
+            "data": {"zone_id": zone_id}
         })
 
-    async def broadcast_alert_issued(self, alert_data: dict):
-        """Broadcast alert issuance to all clients"""
-        await self.broadcast({
+    def _deliver_alert_issued(self, alert_data: dict):
+        """Send an alert to local clients subscribed to its area (all if unlocated)"""
+        self.snapshot.apply("alert_issued", alert_data)
+        self.broadcast({
             "type": "alert_issued",
             "data": alert_data
-        })
+        }, urgent=True, bbox=self._event_bbox(alert_data))
+
+    @staticmethod
+    def _event_bbox(data: dict) -> Optional[BBox]:
+        """Routing bbox of an event payload: explicit bbox, or lat/lon with optional radius"""
+        if data.get("bbox"):
+            return parse_bbox(data["bbox"])
+        if data.get("lat") is not None and data.get("lon") is not None:
+            return radius_bbox(data["lat"], data["lon"], data.get("radius_km") or 0.0)
+        return None
+
+    _DELIVERY = {
+        "new_report": _deliver_new_report,
+        "new_zone": _deliver_new_zone,
+        "zone_created": _deliver_zone_created,
+        "zone_updated": _deliver_zone_updated,
+        "zone_deactivated": _deliver_zone_deactivated,
+        "alert_issued": _deliver_alert_issued
+    }
+
+    def get_metrics(self) -> dict:
+        """Connection count plus fan-out and delivery timings"""
+        return {
+            "bus": self.bus.name if self.bus is not None else None,
+            "bus_connected": self.bus.connected if self.bus is not None else False,
+            "connections": len(self.active_connections),
+            "subscribed": len(self.subscriptions),
+            "queued": sum(connection.pending() for connection in self.active_connections.values()),
+            "stream": {
+                "epoch": self.stream.epoch,
+                "seq": self.stream.seq,
+                "local": self._local_stream,
+                "frames": self.frames_sent
+            },
+            "snapshot_version": self.snapshot.version,
+            **self.metrics.snapshot()
+        }
+
+# The one manager of this worker process; import this instead of constructing
+# another, or broadcasts will miss the sockets registered here
+websocket_manager = WebSocketManager()
@@ -35,9 +35,27 @@ class Settings(BaseSettings):
     TWILIO_ACCOUNT_SID: str = ""
     TWILIO_AUTH_TOKEN: str = ""
 
+    # WebSocket delivery
+    WEBSOCKET_QUEUE_SIZE: int = 256
+    WEBSOCKET_SLOW_CONSUMER_POLICY: str = "drop_oldest"  # drop_oldest, coalesce or disconnect
+    WEBSOCKET_SEND_TIMEOUT_SECONDS: float = 5.0
+
     # Redis for caching
     REDIS_URL: str = "redis://localhost:6379"
 
+    # Realtime fan-out across workers: "redis" pub/sub or "memory" (single process)
+    REALTIME_BUS: str = "redis"
+    REALTIME_CHANNEL: str = "atlas-alert:realtime:core"
+
+    # Precomputed escalation risk grid (ml/risk_grid.py)
+    RISK_GRID_DIR: str = "models/risk_grid"
+    RISK_GRID_BOUNDS: List[float] = [5.0, 25.0, 65.0, 95.0]  # lat_min, lat_max, lon_min, lon_max
+    RISK_GRID_RESOLUTION_DEG: float = 0.1
+    RISK_GRID_REFRESH_SECONDS: int = 300
+    RISK_GRID_REPORT_WINDOW_HOURS: int = 6  # Reports scored into each refresh
+    # Refresh from a single `python -m ml.risk_grid` process; enable only for a one-worker API
+    RISK_GRID_REFRESH_IN_API: bool = False
+
     # File storage
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
@@ -0,0 +1,95 @@
+"""
+Warm-up of the realtime connect snapshot from the legacy database
+Active hotspots stand in for zones; reports and alerts use the legacy tables.
+"""
+import time
+
+from realtime.snapshot import RealtimeSnapshot
+
+ACTIVE_HOTSPOTS_QUERY = """
+    SELECT id, center_latitude, center_longitude, radius, hazard_type, severity,
+           report_count, confidence_score, last_updated
+    FROM hotspots
+    WHERE is_active
+"""
+
+RECENT_REPORTS_QUERY = """
+    SELECT id, hazard_type, severity, latitude, longitude, location_name,
+           urgency_level, verified, created_at
+    FROM hazard_reports
+    WHERE created_at >= now() - make_interval(hours => :window_hours)
+        AND lower(severity) IN ('high', 'critical')
+    ORDER BY created_at DESC
+    LIMIT :max_reports
+"""
+
+ACTIVE_ALERTS_QUERY = """
+    SELECT id, title, message, alert_type, severity, affected_area, expires_at, created_at
+    FROM alerts
+    WHERE is_active
+        AND (expires_at IS NULL OR expires_at > now())
+        AND created_at >= now() - make_interval(hours => :window_hours)
+    ORDER BY created_at DESC
+"""
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+async def warm_snapshot(snapshot: RealtimeSnapshot):
+    """Load active hotspots, recent high-priority reports and active alerts into `snapshot`"""
+    # Imported here so the manager stays importable without the database drivers (benchmarks)
+    from .database import database
+
+    now = time.time()
+
+    zones = [
+        {
+            "zone_id": row["id"],
+            "hazard_types": [row["hazard_type"]],
+            "severity": row["severity"],
+            "lat": row["center_latitude"],
+            "lon": row["center_longitude"],
+            "radius_km": row["radius"],
+            "report_count": row["report_count"],
+            "confidence": row["confidence_score"],
+            "last_updated": _isoformat(row["last_updated"])
+        }
+        for row in await database.fetch_all(ACTIVE_HOTSPOTS_QUERY)
+    ]
+
+    rows = await database.fetch_all(RECENT_REPORTS_QUERY, {
+        "window_hours": snapshot.report_window_seconds // 3600,
+        "max_reports": snapshot.max_reports
+    })
+    reports = [
+        (row["created_at"].timestamp() if row["created_at"] else now, {
+            "id": row["id"],
+            "hazard_type": row["hazard_type"],
+            "severity": row["severity"],
+            "latitude": row["latitude"],
+            "longitude": row["longitude"],
+            "location_name": row["location_name"],
+            "urgency_level": row["urgency_level"],
+            "verified": row["verified"],
+            "created_at": _isoformat(row["created_at"])
+        })
+        for row in reversed(rows)
+    ]
+
+    rows = await database.fetch_all(ACTIVE_ALERTS_QUERY, {"window_hours": snapshot.alert_window_seconds // 3600})
+    alerts = [
+        (row["created_at"].timestamp() if row["created_at"] else now, {
+            "id": row["id"],
+            "type": row["alert_type"],
+            "severity": row["severity"],
+            "title": row["title"],
+            "message": row["message"],
+            "affected_area": row["affected_area"],
+            "issued_at": _isoformat(row["created_at"]),
+            "expires_at": _isoformat(row["expires_at"]),
+            "status": "ACTIVE"
+        })
+        for row in reversed(rows)
+    ]
+
+    snapshot.load(zones, reports, alerts)
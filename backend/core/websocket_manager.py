@@ -1,71 +1,171 @@
 from fastapi import WebSocket
-from typing import Dict, List
+from typing import Callable, Dict, List, Set
 import json
 import asyncio
+import time
+
+from realtime.bus import create_bus
+from realtime.connection import BroadcastMetrics, ClientConnection
+from realtime.snapshot import RealtimeSnapshot
+from .config import settings
+from .realtime_snapshot import warm_snapshot
 
 
 class WebSocketManager:
+    """
+    Per-process connection registry. Broadcasts go through the realtime bus so
+    clients connected to any worker receive them exactly once.
+    """
+
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
-        self.user_rooms: Dict[str, List[str]] = {}  # user_id -> [room_ids]
+        self.bus = None
+        self.active_connections: Dict[str, ClientConnection] = {}
+        self.user_rooms: Dict[str, Set[str]] = {}  # user_id -> {room_ids}
+        self.room_members: Dict[str, Set[str]] = {}  # room_id -> {user_ids}
+        self.metrics = BroadcastMetrics()
+        # Last-known state sent as the first message on connect
+        self.snapshot = RealtimeSnapshot()
+        self._listeners: Dict[str, List[Callable[[dict], None]]] = {}
+
+    async def start(self):
+        """Warm the snapshot and attach to the realtime bus; called from the app lifespan"""
+        try:
+            await warm_snapshot(self.snapshot)
+        except Exception as e:
+            print(f"Realtime snapshot warm-up failed, starting empty: {e}")
+        self.bus = await create_bus(
+            self._dispatch,
+            kind=settings.REALTIME_BUS,
+            redis_url=settings.REDIS_URL,
+            channel=settings.REALTIME_CHANNEL
+        )
+
+    async def stop(self):
+        if self.bus is not None:
+            await self.bus.stop()
+            self.bus = None
+
+    async def _publish(self, event: dict):
+        if self.bus is None:
+            await self._dispatch(event)
+            return
+        try:
+            await self.bus.publish(event)
+        except Exception as e:
+            # A disconnected bus already logs its outage; don't repeat it per event
+            if self.bus.connected:
+                print(f"Realtime bus publish failed, delivering locally: {e}")
+            await self._dispatch(event)
+
+    def add_listener(self, message_type: str, listener: Callable[[dict], None]):
+        """Call `listener(data)` for every global `message_type` broadcast received from the bus, on every worker"""
+        self._listeners.setdefault(message_type, []).append(listener)
+
+    async def _dispatch(self, event: dict):
+        """Deliver a bus event to this worker's clients"""
+        message = event.get("message")
+        if message is None:
+            # Stream positions: this manager's clients are not sequenced
+            return
+        room_id = event.get("room_id")
+        if room_id is None:
+            # Room broadcasts are partial views; only global state goes into the snapshot
+            self.snapshot.apply(message.get("type"), message.get("data") or {})
+            for listener in self._listeners.get(message.get("type"), ()):
+                try:
+                    listener(message.get("data") or {})
+                except Exception as e:
+                    print(f"Realtime listener for {message.get('type')} failed: {e}")
+            targets = list(self.active_connections)
+        else:
+            targets = list(self.room_members.get(room_id, ()))
+        if targets:
+            self._fan_out(targets, message, urgent=event.get("urgent", False))
 
     async def connect(self, websocket: WebSocket, client_id: str):
         await websocket.accept()
-        self.active_connections[client_id] = websocket
+        previous = self.active_connections.get(client_id)
+        if previous is not None:
+            # Same client id reconnected: retire the old writer
+            previous.on_close = lambda: None
+            previous.close()
+        self.active_connections[client_id] = ClientConnection(
+            websocket,
+            metrics=self.metrics,
+            on_close=lambda: self._connection_closed(client_id, websocket),
+            max_queue=settings.WEBSOCKET_QUEUE_SIZE,
+            policy=settings.WEBSOCKET_SLOW_CONSUMER_POLICY,
+            send_timeout=settings.WEBSOCKET_SEND_TIMEOUT_SECONDS
+        )
+        self.active_connections[client_id].enqueue(self.snapshot.encoded(), urgent=True)
         print(f"🔌 Client {client_id} connected. Total connections: {len(self.active_connections)}")
 
+    def _connection_closed(self, client_id: str, websocket: WebSocket):
+        connection = self.active_connections.get(client_id)
+        if connection is not None and connection.websocket is websocket:
+            self.disconnect(client_id)
+
     def disconnect(self, client_id: str):
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
+        connection = self.active_connections.pop(client_id, None)
+        if connection is not None:
+            connection.close()
             print(f"🔌 Client {client_id} disconnected. Total connections: {len(self.active_connections)}")
 
-    async def send_personal_message(self, message: str, client_id: str):
-        if client_id in self.active_connections:
-            websocket = self.active_connections[client_id]
-            try:
-                await websocket.send_text(message)
-            except:
-                self.disconnect(client_id)
-
-    async def broadcast_to_all(self, message: dict):
-        """Broadcast message to all connected clients"""
-        if self.active_connections:
-            message_str = json.dumps(message)
-            disconnected = []
-
-            for client_id, websocket in self.active_connections.items():
-                try:
-                    await websocket.send_text(message_str)
-                except:
-                    disconnected.append(client_id)
+        # Drop memberships so rooms only index live clients; clients re-join on reconnect
+        for room_id in self.user_rooms.pop(client_id, ()):
+            members = self.room_members.get(room_id)
+            if members is not None:
+                members.discard(client_id)
+                if not members:
+                    del self.room_members[room_id]
 
-            # Clean up disconnected clients
-            for client_id in disconnected:
-                self.disconnect(client_id)
+    async def send_personal_message(self, message: str, client_id: str):
+        connection = self.active_connections.get(client_id)
+        if connection is not None:
+            connection.enqueue(message)
 
-    async def broadcast_to_room(self, room_id: str, message: dict):
-        """Broadcast message to specific room (e.g., geographic area)"""
+    def _fan_out(self, client_ids, message: dict, urgent: bool = False):
+        """Serialize once and enqueue on each client's writer; never awaits the network"""
+        started = time.perf_counter()
         message_str = json.dumps(message)
+        recipients = 0
+        for client_id in client_ids:
+            connection = self.active_connections.get(client_id)
+            if connection is not None:
+                connection.enqueue(message_str, urgent=urgent)
+                recipients += 1
+        self.metrics.record_fanout(recipients, time.perf_counter() - started)
 
-        for user_id, rooms in self.user_rooms.items():
-            if room_id in rooms and user_id in self.active_connections:
-                try:
-                    await self.active_connections[user_id].send_text(message_str)
-                except:
-                    self.disconnect(user_id)
+    async def broadcast_to_all(self, message: dict, urgent: bool = False):
+        """Broadcast message to all connected clients on every worker"""
+        await self._publish({"message": message, "urgent": urgent})
+
+    async def broadcast(self, message: dict, urgent: bool = False):
+        await self.broadcast_to_all(message, urgent=urgent)
+
+    async def broadcast_to_room(self, room_id: str, message: dict, urgent: bool = False):
+        """Broadcast message to specific room (e.g., geographic area) on every worker"""
+        await self._publish({"room_id": room_id, "message": message, "urgent": urgent})
 
     async def join_room(self, user_id: str, room_id: str):
         """Add user to a room for targeted broadcasts"""
-        if user_id not in self.user_rooms:
-            self.user_rooms[user_id] = []
-        if room_id not in self.user_rooms[user_id]:
-            self.user_rooms[user_id].append(room_id)
+        self.user_rooms.setdefault(user_id, set()).add(room_id)
+        self.room_members.setdefault(room_id, set()).add(user_id)
 
     async def leave_room(self, user_id: str, room_id: str):
         """Remove user from a room"""
-        if user_id in self.user_rooms and room_id in self.user_rooms[user_id]:
-            self.user_rooms[user_id].remove(room_id)
+        rooms = self.user_rooms.get(user_id)
+        if rooms is not None:
+            rooms.discard(room_id)
+            if not rooms:
+                del self.user_rooms[user_id]
+
+        members = self.room_members.get(room_id)
+        if members is not None:
+            members.discard(user_id)
+            if not members:
+                del self.room_members[room_id]
 
 
-def websocket_manager():
-    return None
\ No newline at end of file
+# The one manager of this worker process
+websocket_manager = WebSocketManager()
\ No newline at end of file
@@ -9,11 +9,12 @@ import asyncio
 from routers import auth, analytics, ml, real_time, emergency, admin, citizen, analyst
 from core.config import settings
 from core.database import init_db
-from core.websocket_manager import WebSocketManager
+from core.websocket_manager import websocket_manager
 from ml.model_manager import ModelManager
+from ml.predictive_escalation import escalation_model
+from ml.risk_grid import load_recent_reports, risk_grid
 
-# Initialize WebSocket manager and ML models
-websocket_manager = WebSocketManager()
+# Initialize ML models
 model_manager = ModelManager()
 
 @asynccontextmanager
@@ -21,9 +22,20 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     await model_manager.load_models()
+    await websocket_manager.start()
+    risk_grid.configure(settings.RISK_GRID_DIR, settings.RISK_GRID_BOUNDS, settings.RISK_GRID_RESOLUTION_DEG)
+    if settings.RISK_GRID_REFRESH_IN_API:
+        await escalation_model.initialize()
+        risk_grid.start(
+            escalation_model,
+            settings.RISK_GRID_REFRESH_SECONDS,
+            lambda: load_recent_reports(settings.RISK_GRID_REPORT_WINDOW_HOURS)
+        )
     print("🚀 Atlas-Alert Backend Started Successfully")
     yield
     # Shutdown
+    await risk_grid.stop()
+    await websocket_manager.stop()
     print("🛑 Atlas-Alert Backend Shutting Down")
 
 app = FastAPI(
@@ -0,0 +1,36 @@
+-- Spatial and temporal indexes for the hotspot clustering inputs
+-- Mirrors the __table_args__ declared in app/models/db_models.py for databases
+-- created before those indexes existed. CONCURRENTLY keeps ingest writable
+-- while the indexes build, so run this file outside a transaction (psql -f).
+
+-- GIST indexes on stored geometry (geoalchemy2 creates these for new tables)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_reports_geom ON reports USING GIST (geom);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_social_posts_geom ON social_posts USING GIST (geom);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_zones_geom ON zones USING GIST (geom);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_live_locations_geom ON live_locations USING GIST (geom);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_last_known_geom ON users USING GIST (last_known_geom);
+
+-- BRIN indexes on append-only time columns (rows arrive in created_at order)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_reports_created_at_brin ON reports USING BRIN (created_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_social_posts_created_at_brin ON social_posts USING BRIN (created_at);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_live_locations_timestamp_brin ON live_locations USING BRIN (timestamp);
+
+-- Partial indexes matching the clustering confidence threshold
+-- (CLUSTER_CONFIDENCE_THRESHOLD in app/models/db_models.py; a new value needs
+-- a migration that recreates these indexes)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_reports_cluster_candidates
+    ON reports (created_at)
+    WHERE confidence >= 0.4;
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_social_posts_cluster_candidates
+    ON social_posts (created_at)
+    WHERE relevance >= 0.4 AND geom IS NOT NULL;
+
+-- Active zone listing (get_current_hotspots)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_zones_active_ranking
+    ON zones (avg_confidence DESC, created_at DESC)
+    WHERE active;
+
+ANALYZE reports;
+ANALYZE social_posts;
+ANALYZE zones;
+ANALYZE live_locations;
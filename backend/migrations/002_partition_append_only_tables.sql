@@ -0,0 +1,77 @@
+-- Convert reports, social_posts and live_locations to range-partitioned tables
+-- The existing table is kept as a single "<table>_legacy" partition covering
+-- everything before the cutover (start of tomorrow, UTC), so no rows are
+-- copied. Managed partitions from the cutover on are created by
+-- app.services.partitioning.ensure_partitions() at startup and hourly after.
+-- Run in a maintenance window: each conversion takes an ACCESS EXCLUSIVE lock.
+
+BEGIN;
+
+-- Foreign keys cannot reference a partitioned table by id alone
+ALTER TABLE alerts DROP CONSTRAINT IF EXISTS alerts_report_id_fkey;
+ALTER TABLE social_outreach DROP CONSTRAINT IF EXISTS social_outreach_social_post_id_fkey;
+
+DO $$
+DECLARE
+    tbl TEXT;
+    key_col TEXT;
+    idx TEXT;
+    cutover TIMESTAMPTZ := date_trunc('day', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + interval '1 day';
+BEGIN
+    FOR tbl, key_col IN
+        SELECT * FROM (VALUES
+            ('reports', 'created_at'),
+            ('social_posts', 'created_at'),
+            ('live_locations', 'timestamp')
+        ) AS t(tbl, key_col)
+    LOOP
+        -- Partition bounds exclude NULL keys
+        EXECUTE format('UPDATE %I SET %I = now() WHERE %I IS NULL', tbl, key_col, key_col);
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN %I SET NOT NULL', tbl, key_col);
+
+        -- Free the index and constraint names for the new parent
+        FOR idx IN SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = tbl LOOP
+            EXECUTE format('ALTER INDEX %I RENAME TO %I', idx, left(idx, 48) || '_legacy');
+        END LOOP;
+
+        EXECUTE format('ALTER TABLE %I RENAME TO %I', tbl, tbl || '_legacy');
+        EXECUTE format(
+            'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS) PARTITION BY RANGE (%I)',
+            tbl, tbl || '_legacy', key_col
+        );
+        EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id, %I)', tbl, key_col);
+
+        -- Keep the id sequence with the new parent
+        EXECUTE format('ALTER SEQUENCE %I OWNED BY %I.id', tbl || '_id_seq', tbl);
+
+        EXECUTE format(
+            'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (MINVALUE) TO (%L)',
+            tbl, tbl || '_legacy', cutover
+        );
+        EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', tbl || '_default', tbl);
+    END LOOP;
+END $$;
+
+-- Indexes declared on the parent cascade to every partition; the 0.4 in the
+-- partial indexes is CLUSTER_CONFIDENCE_THRESHOLD in app/models/db_models.py
+CREATE INDEX IF NOT EXISTS ix_reports_id ON reports (id);
+CREATE INDEX IF NOT EXISTS idx_reports_geom ON reports USING GIST (geom);
+CREATE INDEX IF NOT EXISTS ix_reports_created_at_brin ON reports USING BRIN (created_at);
+CREATE INDEX IF NOT EXISTS ix_reports_cluster_candidates ON reports (created_at) WHERE confidence >= 0.4;
+
+CREATE INDEX IF NOT EXISTS ix_social_posts_id ON social_posts (id);
+CREATE INDEX IF NOT EXISTS idx_social_posts_geom ON social_posts USING GIST (geom);
+CREATE INDEX IF NOT EXISTS ix_social_posts_created_at_brin ON social_posts USING BRIN (created_at);
+CREATE INDEX IF NOT EXISTS ix_social_posts_cluster_candidates
+    ON social_posts (created_at)
+    WHERE relevance >= 0.4 AND geom IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS ix_live_locations_id ON live_locations (id);
+CREATE INDEX IF NOT EXISTS idx_live_locations_geom ON live_locations USING GIST (geom);
+CREATE INDEX IF NOT EXISTS ix_live_locations_timestamp_brin ON live_locations USING BRIN (timestamp);
+
+COMMIT;
+
+ANALYZE reports;
+ANALYZE social_posts;
+ANALYZE live_locations;
@@ -0,0 +1,24 @@
+-- One-off cleanup of duplicate auto-generated red zones
+-- Before zone reconciliation, every clustering run inserted a fresh zone per
+-- cluster. Deactivate every active auto-generated zone that overlaps a newer
+-- one by at least 0.3, the zone_match_min_iou default, so reconciliation
+-- starts from one zone per hazard. It runs once: zone_match_min_iou only
+-- governs reconciliation from then on, so later changes to it need no rerun.
+
+UPDATE zones older
+SET active = false, updated_at = now()
+WHERE older.active
+    AND older.type = 'red'
+    AND older.zone_metadata->>'auto_generated' = 'true'
+    AND EXISTS (
+        SELECT 1
+        FROM zones newer
+        WHERE newer.active
+            AND newer.type = 'red'
+            AND newer.zone_metadata->>'auto_generated' = 'true'
+            AND newer.id > older.id
+            AND ST_Intersects(newer.geom, older.geom)
+            AND ST_Area(ST_Intersection(newer.geom, older.geom))
+                / NULLIF(ST_Area(newer.geom) + ST_Area(older.geom) - ST_Area(ST_Intersection(newer.geom, older.geom)), 0)
+                >= 0.3
+    );
@@ -0,0 +1,15 @@
+-- Spatial recipient resolution for zone alerts
+-- send_citizen_notifications matches users.last_known_geom against the zone
+-- geometry with ST_DWithin. Backfill the geography column from the lat/lon
+-- pair for users that only have those, and make sure the GIST index exists
+-- (create_all adds it for new databases).
+
+UPDATE users
+SET last_known_geom = ST_SetSRID(ST_MakePoint(last_known_lon, last_known_lat), 4326)::geography
+WHERE last_known_geom IS NULL
+    AND last_known_lat IS NOT NULL
+    AND last_known_lon IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_users_last_known_geom ON users USING GIST (last_known_geom);
+
+ANALYZE users;
@@ -0,0 +1,200 @@
+"""
+Live spatial index of recent reports and geotagged social posts
+Points are bucketed by geohash cell, each bucket a fixed-size ring buffer of
+timestamps and positions. "How many within R km in the last T minutes" reads
+only the populated buckets covering the circle, so the scorers get density
+and corroboration features without a database query per report.
+
+Shared by the app and legacy scorers; each process keeps its own index, fed
+from the realtime bus so every worker sees every point.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from realtime.geo_subscriptions import geohash_cell, geohash_from_cell
+
+REPORTS, SOCIAL = "reports", "social"
+KINDS = (REPORTS, SOCIAL)
+
+EARTH_RADIUS_KM = 6371.0
+
+def _timestamp(value) -> float:
+    """Epoch seconds of a datetime or ISO 8601 string (naive means UTC), epoch number or None (now)"""
+    if value is None:
+        return time.time()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+def _unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    lat_r, lon_r = math.radians(lat), math.radians(lon)
+    return (math.cos(lat_r) * math.cos(lon_r), math.cos(lat_r) * math.sin(lon_r), math.sin(lat_r))
+
+class _RingStore:
+    """Ring buffers of every bucket of one kind, one row each, so a query
+    evaluates all the buckets it covers in a single vectorised pass
+
+    Points are stored as unit vectors; "within R km" is a dot product
+    against cos(R / earth radius). The oldest point of a full row is overwritten.
+    """
+
+    def __init__(self, capacity: int, rows: int = 64):
+        self.capacity = capacity
+        self.ts = np.full((rows, capacity), -np.inf)
+        self.xyz = np.zeros((3, rows, capacity))
+        self.pos = np.zeros(rows, dtype=np.int64)
+        self.latest = np.full(rows, -np.inf)
+        self.rows: Dict[str, int] = {}
+        self._free: List[int] = list(range(rows - 1, -1, -1))
+
+    def _row(self, geohash: str) -> int:
+        row = self.rows.get(geohash)
+        if row is None:
+            if not self._free:
+                self._grow()
+            row = self.rows[geohash] = self._free.pop()
+        return row
+
+    def _grow(self):
+        rows = self.ts.shape[0]
+        self.ts = np.concatenate([self.ts, np.full((rows, self.capacity), -np.inf)])
+        self.xyz = np.concatenate([self.xyz, np.zeros((3, rows, self.capacity))], axis=1)
+        self.pos = np.concatenate([self.pos, np.zeros(rows, dtype=np.int64)])
+        self.latest = np.concatenate([self.latest, np.full(rows, -np.inf)])
+        self._free.extend(range(2 * rows - 1, rows - 1, -1))
+
+    def add(self, geohash: str, ts: float, xyz: Tuple[float, float, float]):
+        row = self._row(geohash)
+        slot = self.pos[row]
+        self.ts[row, slot] = ts
+        self.xyz[:, row, slot] = xyz
+        self.pos[row] = (slot + 1) % self.capacity
+        self.latest[row] = max(self.latest[row], ts)
+
+    def prune(self, cutoff: float):
+        """Free the rows of buckets with nothing newer than `cutoff`"""
+        for geohash in [g for g, row in self.rows.items() if self.latest[row] < cutoff]:
+            row = self.rows.pop(geohash)
+            self.ts[row] = -np.inf
+            self.pos[row] = 0
+            self.latest[row] = -np.inf
+            self._free.append(row)
+
+    def count(self, geohashes, xyz: Tuple[float, float, float], min_dot: float, since: float, until: float) -> int:
+        rows = [row for row in map(self.rows.get, geohashes) if row is not None and self.latest[row] >= since]
+        if not rows:
+            return 0
+        ts = self.ts[rows]
+        dot = self.xyz[0, rows] * xyz[0] + self.xyz[1, rows] * xyz[1] + self.xyz[2, rows] * xyz[2]
+        return int(np.count_nonzero((ts >= since) & (ts < until) & (dot >= min_dot)))
+
+class RecentActivityIndex:
+    def __init__(self, precision: int = 5, bucket_capacity: int = 256,
+                 max_window_minutes: float = 180, max_cover_entries: int = 4096):
+        self.precision = precision
+        self.bucket_capacity = bucket_capacity
+        self.max_window_seconds = max_window_minutes * 60
+        bits = 5 * precision
+        self.cell_lat_deg = 180.0 / (1 << (bits // 2))
+        self.cell_lon_deg = 360.0 / (1 << ((bits + 1) // 2))
+        self._stores: Dict[str, _RingStore] = {kind: _RingStore(bucket_capacity) for kind in KINDS}
+        # (lat index, lon index, radius) -> geohashes of every cell the circle can reach
+        self._covers: OrderedDict = OrderedDict()
+        self.max_cover_entries = max_cover_entries
+        self._lock = threading.Lock()
+        self._added = 0
+
+    def add(self, kind: str, lat: Optional[float], lon: Optional[float], timestamp=None):
+        """Index one point; points without coordinates are ignored"""
+        if lat is None or lon is None:
+            return
+        ts = _timestamp(timestamp)
+        geohash = geohash_from_cell(*geohash_cell(lat, lon, self.precision), self.precision)
+        xyz = _unit_vector(lat, lon)
+        with self._lock:
+            self._stores[kind].add(geohash, ts, xyz)
+            self._added += 1
+            if self._added % 1000 == 0:
+                cutoff = time.time() - self.max_window_seconds
+                for store in self._stores.values():
+                    store.prune(cutoff)
+
+    def add_report(self, lat: Optional[float], lon: Optional[float], timestamp=None):
+        self.add(REPORTS, lat, lon, timestamp)
+
+    def add_social_post(self, lat: Optional[float], lon: Optional[float], timestamp=None):
+        self.add(SOCIAL, lat, lon, timestamp)
+
+    def _cover(self, lat: float, lon: float, radius_km: float) -> Tuple[str, ...]:
+        """Geohashes of the cells within `radius_km` of any point of the cell containing (lat, lon)"""
+        lat_index, lon_index = geohash_cell(lat, lon, self.precision)
+        key = (lat_index, lon_index, radius_km)
+        cover = self._covers.get(key)
+        if cover is not None:
+            self._covers.move_to_end(key)
+            return cover
+
+        cell_min_lat = lat_index * self.cell_lat_deg - 90.0
+        farthest_lat = min(89.9, max(abs(cell_min_lat), abs(cell_min_lat + self.cell_lat_deg)) + radius_km / 111.0)
+        lat_steps = math.ceil(radius_km / 111.0 / self.cell_lat_deg)
+        lon_steps = math.ceil(radius_km / (111.0 * math.cos(math.radians(farthest_lat))) / self.cell_lon_deg)
+        cover = tuple(
+            geohash_from_cell(i, j, self.precision)
+            for i in range(lat_index - lat_steps, lat_index + lat_steps + 1)
+            for j in range(lon_index - lon_steps, lon_index + lon_steps + 1)
+            if 0 <= i < (1 << (5 * self.precision // 2)) and 0 <= j < (1 << ((5 * self.precision + 1) // 2))
+        )
+        self._covers[key] = cover
+        if len(self._covers) > self.max_cover_entries:
+            self._covers.popitem(last=False)
+        return cover
+
+    def count(self, kind: str, lat: float, lon: float, radius_km: float,
+              window_minutes: float, now=None) -> int:
+        """Points of `kind` within `radius_km` of (lat, lon) timestamped in the
+        `window_minutes` before `now` (exclusive, so a point never counts itself)"""
+        until = _timestamp(now)
+        since = until - min(window_minutes * 60, self.max_window_seconds)
+        min_dot = math.cos(min(radius_km / EARTH_RADIUS_KM, math.pi))
+        with self._lock:
+            return self._stores[kind].count(
+                self._cover(lat, lon, radius_km), _unit_vector(lat, lon), min_dot, since, until
+            )
+
+    def corroboration_features(self, lat: Optional[float], lon: Optional[float], now=None,
+                               density_radius_km: float = 5.0, density_window_minutes: float = 60.0,
+                               density_saturation_reports: int = 10, corroboration_radius_km: float = 10.0,
+                               corroboration_window_minutes: float = 120.0,
+                               corroboration_saturation_posts: int = 5) -> Dict:
+        """Nearby report and social post counts plus the 0-1 density and
+        corroboration features derived from them"""
+        if lat is None or lon is None:
+            return {"nearby_reports": 0, "nearby_posts": 0, "location_density": 0.0, "social_corroboration": 0.0}
+        nearby_reports = self.count(REPORTS, lat, lon, density_radius_km, density_window_minutes, now)
+        nearby_posts = self.count(SOCIAL, lat, lon, corroboration_radius_km, corroboration_window_minutes, now)
+        return {
+            "nearby_reports": nearby_reports,
+            "nearby_posts": nearby_posts,
+            "location_density": min(1.0, nearby_reports / density_saturation_reports),
+            "social_corroboration": min(1.0, nearby_posts / corroboration_saturation_posts)
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "precision": self.precision,
+                "bucket_capacity": self.bucket_capacity,
+                "max_window_minutes": self.max_window_seconds / 60,
+                "buckets": {kind: len(store.rows) for kind, store in self._stores.items()},
+                "cached_covers": len(self._covers)
+            }
@@ -0,0 +1,188 @@
+"""
+Compiled Tree Inference
+Flattens the escalation RandomForestClassifier, the zone GradientBoostingRegressor
+and the StandardScaler into plain NumPy arrays, evaluated by a small
+vectorised tree walker. Skips sklearn's per-call validation and joblib
+dispatch, which dominate single-row latency.
+
+Export the current model version with: python -m ml.compiled_trees
+"""
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class CompiledForest:
+    """All trees of an ensemble packed into shared node arrays
+
+    Node i of the packed arrays tests `feature[i] <= threshold[i]` and goes to
+    `left[i]` or `right[i]`. Leaves point back at themselves, so every row
+    can take exactly `max_depth` steps without a leaf test, and carry
+    `leaf_value[i]`.
+    """
+
+    def __init__(self, left: np.ndarray, right: np.ndarray, feature: np.ndarray,
+                 threshold: np.ndarray, leaf_value: np.ndarray, roots: np.ndarray,
+                 max_depth: int, scale: float = 1.0, offset: float = 0.0, mean: bool = False):
+        self.left = left
+        self.right = right
+        self.feature = feature
+        self.threshold = threshold
+        self.leaf_value = leaf_value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.scale = float(scale)
+        self.offset = float(offset)
+        self.mean = bool(mean)
+
+    @classmethod
+    def from_trees(cls, trees, leaf_values, **kwargs) -> "CompiledForest":
+        """Pack fitted sklearn `Tree` objects with one leaf value array per tree"""
+        left, right, feature, threshold, values, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for tree, leaf_value in zip(trees, leaf_values):
+            is_leaf = tree.children_left == -1
+            nodes = np.arange(tree.node_count) + offset
+            roots.append(offset)
+            left.append(np.where(is_leaf, nodes, tree.children_left + offset))
+            right.append(np.where(is_leaf, nodes, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+            values.append(leaf_value)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+        return cls(
+            left=np.concatenate(left).astype(np.int32),
+            right=np.concatenate(right).astype(np.int32),
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            leaf_value=np.concatenate(values).astype(np.float64),
+            roots=np.array(roots, dtype=np.int32),
+            max_depth=max_depth,
+            **kwargs
+        )
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        # sklearn compares float32 features against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat = X.ravel()
+        row_offsets = (np.arange(X.shape[0], dtype=np.int32) * X.shape[1])[:, None]
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.roots.shape[0]))
+        for _ in range(self.max_depth):
+            go_left = flat[row_offsets + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        values = self.leaf_value[nodes]
+        combined = values.mean(axis=1) if self.mean else values.sum(axis=1)
+        return self.offset + self.scale * combined
+
+    def arrays(self, prefix: str) -> dict:
+        return {
+            f"{prefix}_left": self.left,
+            f"{prefix}_right": self.right,
+            f"{prefix}_feature": self.feature,
+            f"{prefix}_threshold": self.threshold,
+            f"{prefix}_leaf_value": self.leaf_value,
+            f"{prefix}_roots": self.roots,
+            f"{prefix}_params": np.array([self.max_depth, self.scale, self.offset, self.mean], dtype=np.float64)
+        }
+
+    @classmethod
+    def from_arrays(cls, data, prefix: str) -> "CompiledForest":
+        max_depth, scale, offset, mean = data[f"{prefix}_params"]
+        return cls(
+            left=data[f"{prefix}_left"],
+            right=data[f"{prefix}_right"],
+            feature=data[f"{prefix}_feature"],
+            threshold=data[f"{prefix}_threshold"],
+            leaf_value=data[f"{prefix}_leaf_value"],
+            roots=data[f"{prefix}_roots"],
+            max_depth=int(max_depth),
+            scale=scale,
+            offset=offset,
+            mean=bool(mean)
+        )
+
+def compile_random_forest_classifier(model) -> CompiledForest:
+    """P(class 1): the mean over trees of each leaf's class-1 fraction"""
+    positive = list(model.classes_).index(1)
+    leaf_values = []
+    for estimator in model.estimators_:
+        value = estimator.tree_.value[:, 0, :]
+        totals = value.sum(axis=1)
+        leaf_values.append(np.divide(value[:, positive], totals, out=np.zeros_like(totals), where=totals > 0))
+    return CompiledForest.from_trees([e.tree_ for e in model.estimators_], leaf_values, mean=True)
+
+def compile_gradient_boosting_regressor(model) -> CompiledForest:
+    """init + learning_rate * sum of stage predictions"""
+    if model.init_ == 'zero':
+        baseline = 0.0
+    else:
+        baseline = float(np.ravel(model.init_.predict(np.zeros((1, model.n_features_in_))))[0])
+    trees = [stage[0].tree_ for stage in model.estimators_]
+    return CompiledForest.from_trees(
+        trees, [tree.value[:, 0, 0] for tree in trees],
+        scale=model.learning_rate, offset=baseline
+    )
+
+class CompiledEscalationModel:
+    """Scaler, escalation classifier and zone regressor as one array bundle"""
+
+    def __init__(self, mean: np.ndarray, scale: np.ndarray,
+                 escalation: CompiledForest, zone: CompiledForest):
+        self.mean = mean
+        self.scale = scale
+        self.escalation = escalation
+        self.zone = zone
+
+    def score(self, features: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Escalation probabilities and zone sizes (km², floored at 1) for a raw feature matrix"""
+        features_scaled = (np.asarray(features, dtype=np.float64) - self.mean) / self.scale
+        return self.escalation.predict(features_scaled), np.maximum(1, self.zone.predict(features_scaled))
+
+    def save(self, path: str):
+        np.savez(
+            path, mean=self.mean, scale=self.scale,
+            **self.escalation.arrays("escalation"), **self.zone.arrays("zone")
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledEscalationModel":
+        with np.load(path) as data:
+            return cls(
+                mean=data["mean"],
+                scale=data["scale"],
+                escalation=CompiledForest.from_arrays(data, "escalation"),
+                zone=CompiledForest.from_arrays(data, "zone")
+            )
+
+def compile_escalation_model(escalation_model, zone_predictor, scaler) -> Optional[CompiledEscalationModel]:
+    """Compile the three fitted estimators, or None if one of them has no compiled form"""
+    from sklearn.ensemble import GradientBoostingRegressor, RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+
+    if not (isinstance(escalation_model, RandomForestClassifier)
+            and isinstance(zone_predictor, GradientBoostingRegressor)
+            and isinstance(scaler, StandardScaler)):
+        return None
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(scaler.n_features_in_)
+    scale = scaler.scale_ if scaler.with_std else np.ones(scaler.n_features_in_)
+    return CompiledEscalationModel(
+        mean=np.asarray(mean, dtype=np.float64),
+        scale=np.asarray(scale, dtype=np.float64),
+        escalation=compile_random_forest_classifier(escalation_model),
+        zone=compile_gradient_boosting_regressor(zone_predictor)
+    )
+
+if __name__ == "__main__":
+    import asyncio
+    from .predictive_escalation import escalation_model
+
+    async def _main():
+        await escalation_model.initialize()
+        path = escalation_model.export_compiled()
+        print(f"Compiled escalation model v{escalation_model.model_version} written to {path}")
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -4,7 +4,7 @@ Uses ML to predict probability of hazard escalation and affected zones
 """
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import logging
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
@@ -12,31 +12,89 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.cluster import DBSCAN
 import joblib
 import asyncio
+import copy
+import fcntl
+import os
+from collections import deque
+from sklearn.base import clone
 import aiohttp
 from geopy.distance import geodesic
 import json
+from .compiled_trees import CompiledEscalationModel, compile_escalation_model
+from .weather_provider import MockWeatherProvider, WeatherService
 
 logger = logging.getLogger(__name__)
 
+MODEL_DIR = 'models'
+MANIFEST_PATH = os.path.join(MODEL_DIR, 'escalation_manifest.json')
+# Held while a process allocates a version, writes its files and swaps the manifest
+MANIFEST_LOCK_PATH = os.path.join(MODEL_DIR, 'escalation_manifest.lock')
+
+# Online learning: retrain on a sliding window of the most recent labelled samples
+REPLAY_BUFFER_SIZE = 5000
+MIN_RETRAIN_SAMPLES = 50
+KEEP_MODEL_VERSIONS = 3
+
+# Projection horizons (hours) and affected-zone polygon vertices
+DEFAULT_HORIZONS = (0, 6, 12, 24)
+STANDARD_HORIZONS = (0, 6, 12, 24, 48, 72)
+DEFAULT_POLYGON_POINTS = 16
+
+# Probability multipliers are anchored at these hours and interpolated between them
+_ANCHOR_HOURS = np.array([0.0, 6.0, 12.0, 24.0])
+_LEVEL_THRESHOLDS = np.array([0.4, 0.6, 0.8])
+_LEVELS = np.array(["low", "medium", "high", "critical"])
+
+def parse_horizons(spec: str) -> List[int]:
+    """Hours to project for a request's `time_horizon`
+    
+    "48h" means every standard horizon up to 48 hours ([0, 6, 12, 24, 48]);
+    a comma-separated list such as "6h,36h,72h" is taken as given.
+    Raises ValueError for anything else, which the API reports as a 400.
+    """
+    try:
+        hours = sorted({int(float(part.strip().rstrip('hH'))) for part in spec.split(',') if part.strip()})
+    except (ValueError, OverflowError):
+        raise ValueError(f"Invalid time horizon: {spec}")
+    if not hours or any(h < 0 for h in hours):
+        raise ValueError(f"Invalid time horizon: {spec}")
+    if len(hours) == 1:
+        limit = hours[0]
+        hours = sorted({h for h in STANDARD_HORIZONS if h <= limit} | {limit})
+    return hours
+
+def _horizon_key(hours: int) -> str:
+    return "now" if hours == 0 else f"{hours}_hours"
+
+# The compiled evaluator wins on small batches; sklearn's Cython trees win on large ones
+COMPILED_MAX_BATCH = 256
+
 class PredictiveEscalationModel:
-    def __init__(self):
+    def __init__(self, weather: Optional[WeatherService] = None):
         self.escalation_model = None
         self.zone_predictor = None
         self.scaler = StandardScaler()
         self.is_trained = False
-        self.weather_cache = {}
+        self.weather = weather or WeatherService(MockWeatherProvider())
         self.historical_data = []
+        self.model_version = 0
+        # Array-compiled copy of scaler + both models used for inference when available
+        self.compiled: Optional[CompiledEscalationModel] = None
+        
+        # (raw feature vector, escalated label) pairs, oldest evicted first
+        self.replay_buffer = deque(maxlen=REPLAY_BUFFER_SIZE)
+        self._unfitted_samples = 0
+        self._retrain_task: Optional[asyncio.Task] = None
+        self._retrain_pending = False
         
     async def initialize(self):
         """Initialize and load pre-trained models"""
         try:
             # Load pre-trained models if available
             try:
-                self.escalation_model = joblib.load('models/escalation_model.pkl')
-                self.zone_predictor = joblib.load('models/zone_predictor.pkl')
-                self.scaler = joblib.load('models/scaler.pkl')
+                self._load_models()
                 self.is_trained = True
-                logger.info("✅ Loaded pre-trained escalation models")
+                logger.info(f"✅ Loaded pre-trained escalation models (v{self.model_version})")
             except FileNotFoundError:
                 logger.info("🔄 No pre-trained models found, will train on first use")
                 await self._initialize_models()
@@ -44,6 +102,93 @@ class PredictiveEscalationModel:
         except Exception as e:
             logger.error(f"❌ Error initializing escalation model: {e}")
     
+    def _load_models(self):
+        """Load the version named in the manifest, or the unversioned files of older deployments"""
+        if os.path.exists(MANIFEST_PATH):
+            with open(MANIFEST_PATH) as f:
+                manifest = json.load(f)
+            files = manifest["files"]
+            self.escalation_model = joblib.load(os.path.join(MODEL_DIR, files["escalation_model"]))
+            self.zone_predictor = joblib.load(os.path.join(MODEL_DIR, files["zone_predictor"]))
+            self.scaler = joblib.load(os.path.join(MODEL_DIR, files["scaler"]))
+            replay_path = os.path.join(MODEL_DIR, files["replay"])
+            if os.path.exists(replay_path):
+                with np.load(replay_path) as replay:
+                    self.replay_buffer.extend(zip(replay["X"], replay["y"]))
+            if files.get("compiled"):
+                self.compiled = CompiledEscalationModel.load(os.path.join(MODEL_DIR, files["compiled"]))
+            self.model_version = manifest["version"]
+        else:
+            self.escalation_model = joblib.load(os.path.join(MODEL_DIR, 'escalation_model.pkl'))
+            self.zone_predictor = joblib.load(os.path.join(MODEL_DIR, 'zone_predictor.pkl'))
+            self.scaler = joblib.load(os.path.join(MODEL_DIR, 'scaler.pkl'))
+        if self.compiled is None:
+            self.compiled = compile_escalation_model(self.escalation_model, self.zone_predictor, self.scaler)
+    
+    def _write_version(self, escalation_model, zone_predictor, scaler,
+                       X: np.ndarray, y: np.ndarray) -> Tuple[int, Optional[CompiledEscalationModel]]:
+        """Write a complete model version, then point the manifest at it
+        
+        Runs off the event loop. Readers only ever follow the manifest, which
+        is replaced atomically once every file of the version is on disk. The
+        version number is allocated under a file lock after the newest one any
+        process published, so concurrent writers never share a vN.
+        Returns the version and its compiled form, if the estimators have one.
+        """
+        os.makedirs(MODEL_DIR, exist_ok=True)
+        with open(MANIFEST_LOCK_PATH, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            published = 0
+            if os.path.exists(MANIFEST_PATH):
+                with open(MANIFEST_PATH) as f:
+                    published = json.load(f)["version"]
+            version = max(published, self.model_version) + 1
+            
+            files = {
+                "escalation_model": f'escalation_model.v{version}.pkl',
+                "zone_predictor": f'zone_predictor.v{version}.pkl',
+                "scaler": f'scaler.v{version}.pkl',
+                "replay": f'escalation_replay.v{version}.npz'
+            }
+            joblib.dump(escalation_model, os.path.join(MODEL_DIR, files["escalation_model"]))
+            joblib.dump(zone_predictor, os.path.join(MODEL_DIR, files["zone_predictor"]))
+            joblib.dump(scaler, os.path.join(MODEL_DIR, files["scaler"]))
+            np.savez_compressed(os.path.join(MODEL_DIR, files["replay"]), X=X, y=y)
+            
+            compiled = compile_escalation_model(escalation_model, zone_predictor, scaler)
+            if compiled is not None:
+                files["compiled"] = f'escalation_compiled.v{version}.npz'
+                compiled.save(os.path.join(MODEL_DIR, files["compiled"]))
+            
+            manifest = {
+                "version": version,
+                "files": files,
+                "samples": int(len(y)),
+                "created_at": datetime.utcnow().isoformat()
+            }
+            tmp_path = MANIFEST_PATH + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(tmp_path, MANIFEST_PATH)
+            
+            # Keep a few previous versions for rollback
+            expired = version - KEEP_MODEL_VERSIONS
+            for name in {*files.values(), f'escalation_compiled.v{version}.npz'}:
+                try:
+                    os.remove(os.path.join(MODEL_DIR, name.replace(f'.v{version}.', f'.v{expired}.')))
+                except FileNotFoundError:
+                    pass
+        
+        return version, compiled
+    
+    def export_compiled(self) -> Optional[str]:
+        """Write the current estimators as a new version including their compiled form"""
+        X = np.array([features for features, _ in self.replay_buffer], dtype=float)
+        y = np.array([label for _, label in self.replay_buffer], dtype=int)
+        version, compiled = self._write_version(self.escalation_model, self.zone_predictor, self.scaler, X, y)
+        self.compiled, self.model_version = compiled, version
+        return os.path.join(MODEL_DIR, f'escalation_compiled.v{version}.npz') if compiled else None
+    
     async def _initialize_models(self):
         """Initialize models with default parameters"""
         self.escalation_model = RandomForestClassifier(
@@ -134,96 +279,128 @@ class PredictiveEscalationModel:
         self.is_trained = True
         logger.info("✅ Models trained with synthetic data")
         
+        # Synthetic samples seed the replay window until real outcomes displace them
+        self.replay_buffer.extend(zip(X, y_escalation))
+        
         # Save models
-        joblib.dump(self.escalation_model, 'models/escalation_model.pkl')
-        joblib.dump(self.zone_predictor, 'models/zone_predictor.pkl')
-        joblib.dump(self.scaler, 'models/scaler.pkl')
+        self.model_version, self.compiled = self._write_version(self.escalation_model, self.zone_predictor,
+                                                                self.scaler, X, y_escalation)
     
     async def get_weather_data(self, lat: float, lon: float) -> Dict[str, Any]:
-        """Fetch weather data from API (mock implementation)"""
-        cache_key = f"{lat:.2f},{lon:.2f}"
-        
-        # Check cache (5-minute expiry)
-        if cache_key in self.weather_cache:
-            cached_time, data = self.weather_cache[cache_key]
-            if datetime.now() - cached_time < timedelta(minutes=5):
-                return data
-        
-        # Mock weather data (in production, use actual weather API)
-        weather_data = {
-            "wave_height": np.random.gamma(2, 1.5),
-            "wind_speed": np.random.gamma(3, 2),
-            "pressure": np.random.normal(1013, 10),
-            "temperature": np.random.normal(25, 5),
-            "humidity": np.random.uniform(60, 90),
-            "visibility": np.random.uniform(5, 15)
-        }
-        
-        # Cache the data
-        self.weather_cache[cache_key] = (datetime.now(), weather_data)
-        return weather_data
+        """Weather at a location, through the shared tile cache"""
+        return await self.weather.get(lat, lon)
     
-    async def predict_escalation(self, reports: List[Dict], location: Tuple[float, float]) -> Dict[str, Any]:
+    async def predict_escalation(self, reports: List[Dict], location: Tuple[float, float],
+                                 horizons: Optional[List[int]] = None,
+                                 polygon_points: int = DEFAULT_POLYGON_POINTS) -> Dict[str, Any]:
         """Predict escalation probability and affected zone"""
+        return (await self.predict_escalation_many([location], [reports], horizons, polygon_points))[0]
+    
+    async def predict_escalation_many(self, locations: List[Tuple[float, float]], 
+                                      reports_by_location: List[List[Dict]],
+                                      horizons: Optional[List[int]] = None,
+                                      polygon_points: int = DEFAULT_POLYGON_POINTS) -> List[Dict[str, Any]]:
+        """Predict escalation for many locations with one scaler and model pass
+        
+        `reports_by_location[i]` holds the reports around `locations[i]`; the
+        result list is in the same order. Features for all locations go into a
+        single matrix so the scaler and both models run once per call, and the
+        horizon projections and zone polygons are computed for all of them at
+        once too.
+        """
+        if not locations:
+            return []
+        if len(reports_by_location) != len(locations):
+            raise ValueError("reports_by_location must have one entry per location")
+        
         if not self.is_trained:
             await self._initialize_models()
         
         try:
-            lat, lon = location
-            
-            # Extract features from reports
-            features = await self._extract_features(reports, lat, lon)
+            feature_rows = await self._feature_matrix(locations, reports_by_location)
+            escalation_probs, zone_sizes = self._score_features(feature_rows)
             
-            # Scale features
-            features_scaled = self.scaler.transform([features])
+            horizons = list(horizons or DEFAULT_HORIZONS)
+            projected = self._project_horizons(escalation_probs, feature_rows[:, 3], horizons)
+            projected_levels = self._levels(projected)
+            centers = np.array(locations, dtype=float)
+            zones = self._affected_zones(centers[:, 0], centers[:, 1], zone_sizes, polygon_points)
+            levels = self._levels(escalation_probs)
             
-            # Predict escalation probability
-            escalation_prob = self.escalation_model.predict_proba(features_scaled)[0][1]
-            
-            # Predict affected zone size
-            zone_size = max(1, self.zone_predictor.predict(features_scaled)[0])
-            
-            # Generate affected zone (circular approximation)
-            affected_zone = self._generate_affected_zone(lat, lon, zone_size)
-            
-            # Determine escalation level
-            if escalation_prob >= 0.8:
-                level = "critical"
-            elif escalation_prob >= 0.6:
-                level = "high"
-            elif escalation_prob >= 0.4:
-                level = "medium"
-            else:
-                level = "low"
-            
-            # Generate time-based predictions
-            time_predictions = await self._generate_time_predictions(features, escalation_prob)
-            
-            return {
-                "escalation_probability": float(escalation_prob),
-                "escalation_level": level,
-                "confidence": float(min(escalation_prob * 1.2, 1.0)),
-                "affected_zone": affected_zone,
-                "zone_size_km2": float(zone_size),
-                "time_predictions": time_predictions,
-                "recommendations": self._generate_recommendations(escalation_prob, level),
-                "prediction_timestamp": datetime.utcnow().isoformat()
-            }
+            return [
+                self._build_prediction(
+                    float(escalation_probs[i]), str(levels[i]), float(zone_sizes[i]), zones[i],
+                    {
+                        _horizon_key(hours): {
+                            "probability": float(projected[i, j]),
+                            "level": str(projected_levels[i, j])
+                        }
+                        for j, hours in enumerate(horizons)
+                    }
+                )
+                for i in range(len(locations))
+            ]
             
         except Exception as e:
             logger.error(f"Error in escalation prediction: {e}")
-            return {
-                "escalation_probability": 0.5,
-                "escalation_level": "unknown",
-                "confidence": 0.0,
-                "affected_zone": [],
-                "zone_size_km2": 1.0,
-                "time_predictions": {},
-                "recommendations": ["Manual assessment required"],
-                "error": str(e)
-            }
+            return [self._fallback_prediction(e) for _ in locations]
+    
+    async def score_locations(self, locations: List[Tuple[float, float]],
+                              reports_by_location: List[List[Dict]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Escalation probabilities and zone sizes (km²) only, for bulk consumers like the risk grid"""
+        if not self.is_trained:
+            await self._initialize_models()
+        feature_rows = await self._feature_matrix(locations, reports_by_location)
+        return self._score_features(feature_rows)
+    
+    async def _feature_matrix(self, locations: List[Tuple[float, float]],
+                              reports_by_location: List[List[Dict]]) -> np.ndarray:
+        # One bulk weather lookup for every location, then per-location report features
+        weather = await self.weather.get_many(locations)
+        feature_rows = await asyncio.gather(*(
+            self._extract_features(reports, lat, lon, conditions)
+            for (lat, lon), reports, conditions in zip(locations, reports_by_location, weather)
+        ))
+        return np.array(feature_rows, dtype=float)
+    
+    def _score_features(self, feature_rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Scale a feature matrix and run both models over it once"""
+        compiled = self.compiled
+        if compiled is not None and len(feature_rows) <= COMPILED_MAX_BATCH:
+            return compiled.score(feature_rows)
+        features_scaled = self.scaler.transform(feature_rows)
+        escalation_probs = self.escalation_model.predict_proba(features_scaled)[:, 1]
+        zone_sizes = np.maximum(1, self.zone_predictor.predict(features_scaled))
+        return escalation_probs, zone_sizes
+    
+    def _build_prediction(self, escalation_prob: float, level: str, zone_size: float,
+                          affected_zone: np.ndarray, time_predictions: Dict[str, Any]) -> Dict[str, Any]:
+        """Assemble the prediction payload for one location"""
+        return {
+            "escalation_probability": escalation_prob,
+            "escalation_level": level,
+            "confidence": min(escalation_prob * 1.2, 1.0),
+            "affected_zone": [{"latitude": lat, "longitude": lon} for lat, lon in affected_zone.tolist()],
+            "zone_size_km2": zone_size,
+            "time_predictions": time_predictions,
+            "recommendations": self._generate_recommendations(escalation_prob, level),
+            "prediction_timestamp": datetime.utcnow().isoformat()
+        }
+    
+    def _fallback_prediction(self, error: Exception) -> Dict[str, Any]:
+        return {
+            "escalation_probability": 0.5,
+            "escalation_level": "unknown",
+            "confidence": 0.0,
+            "affected_zone": [],
+            "zone_size_km2": 1.0,
+            "time_predictions": {},
+            "recommendations": ["Manual assessment required"],
+            "error": str(error)
+        }
     
-    async def _extract_features(self, reports: List[Dict], lat: float, lon: float) -> List[float]:
+    async def _extract_features(self, reports: List[Dict], lat: float, lon: float,
+                                weather: Optional[Dict[str, Any]] = None) -> List[float]:
         """Extract features from reports and external data"""
         now = datetime.utcnow()
         
@@ -247,7 +424,8 @@ class PredictiveEscalationModel:
         sentiment_urgency = np.mean(sentiments) if sentiments else 0.5
         
         # Weather data
-        weather = await self.get_weather_data(lat, lon)
+        if weather is None:
+            weather = await self.get_weather_data(lat, lon)
         
         # Historical hazard frequency (mock)
         historical_freq = 3  # Average hazards per month in this area
@@ -268,72 +446,49 @@ class PredictiveEscalationModel:
             day_of_week
         ]
     
-    def _generate_affected_zone(self, center_lat: float, center_lon: float, radius_km: float) -> List[Dict]:
-        """Generate affected zone as GeoJSON polygon"""
-        # Generate circular zone (simplified)
-        points = []
-        num_points = 16
-        
-        for i in range(num_points):
-            angle = 2 * np.pi * i / num_points
-            # Approximate lat/lon offset for given radius
-            lat_offset = radius_km / 111.0 * np.cos(angle)  # 1 degree lat ≈ 111 km
-            lon_offset = radius_km / (111.0 * np.cos(np.radians(center_lat))) * np.sin(angle)
-            
-            points.append({
-                "latitude": center_lat + lat_offset,
-                "longitude": center_lon + lon_offset
-            })
-        
-        # Close the polygon
-        points.append(points[0])
-        
-        return points
+    def _affected_zones(self, center_lats: np.ndarray, center_lons: np.ndarray,
+                        radii_km: np.ndarray, num_points: int = DEFAULT_POLYGON_POINTS) -> np.ndarray:
+        """Closed circular zone polygons for all locations: (n, num_points + 1, [lat, lon])"""
+        angles = 2 * np.pi * np.arange(num_points + 1) / num_points
+        angles[-1] = 0.0  # close the polygon on its first vertex
+        # Approximate lat/lon offset for given radius, 1 degree lat ≈ 111 km
+        lat_offsets = (radii_km / 111.0)[:, None] * np.cos(angles)
+        lon_offsets = (radii_km / (111.0 * np.cos(np.radians(center_lats))))[:, None] * np.sin(angles)
+        return np.stack([center_lats[:, None] + lat_offsets, center_lons[:, None] + lon_offsets], axis=-1)
     
-    async def _generate_time_predictions(self, features: List[float], base_prob: float) -> Dict[str, Any]:
-        """Generate time-based escalation predictions"""
-        predictions = {}
-        
-        # Current
-        predictions["now"] = {
-            "probability": float(base_prob),
-            "level": self._prob_to_level(base_prob)
-        }
-        
-        # +6 hours (slight increase due to potential development)
-        prob_6h = min(base_prob * 1.1, 1.0)
-        predictions["6_hours"] = {
-            "probability": float(prob_6h),
-            "level": self._prob_to_level(prob_6h)
-        }
-        
-        # +12 hours (weather dependency)
-        weather_factor = 1.0 + (features[3] - 2) * 0.1  # Wave height influence
-        prob_12h = min(base_prob * weather_factor, 1.0)
-        predictions["12_hours"] = {
-            "probability": float(prob_12h),
-            "level": self._prob_to_level(prob_12h)
-        }
-        
-        # +24 hours (natural decay unless sustained)
-        prob_24h = base_prob * 0.8 if base_prob < 0.7 else base_prob * 0.9
-        predictions["24_hours"] = {
-            "probability": float(prob_24h),
-            "level": self._prob_to_level(prob_24h)
-        }
-        
-        return predictions
+    def _project_horizons(self, base_probs: np.ndarray, wave_heights: np.ndarray,
+                          horizons: List[int]) -> np.ndarray:
+        """Escalation probability at each horizon for every location: (n, len(horizons))
+        
+        Multipliers are anchored at now (1.0), +6h (slight development, 1.1),
+        +12h (wave-height dependent) and +24h (decay unless sustained), linearly
+        interpolated in between; beyond 24h the 24h decay keeps compounding.
+        """
+        hours = np.asarray(horizons, dtype=float)
+        decay = np.where(base_probs < 0.7, 0.8, 0.9)
+        anchors = np.column_stack([
+            np.ones_like(base_probs),
+            np.full_like(base_probs, 1.1),
+            1.0 + (wave_heights - 2) * 0.1,  # Wave height influence
+            decay
+        ])
+        
+        # Interpolation weights are the same for every location
+        clipped = np.minimum(hours, _ANCHOR_HOURS[-1])
+        upper = np.clip(np.searchsorted(_ANCHOR_HOURS, clipped, side='right'), 1, len(_ANCHOR_HOURS) - 1)
+        lower = upper - 1
+        weight = (clipped - _ANCHOR_HOURS[lower]) / (_ANCHOR_HOURS[upper] - _ANCHOR_HOURS[lower])
+        multipliers = anchors[:, lower] * (1 - weight) + anchors[:, upper] * weight
+        
+        beyond = hours > _ANCHOR_HOURS[-1]
+        if beyond.any():
+            multipliers[:, beyond] = decay[:, None] ** (hours[beyond] / _ANCHOR_HOURS[-1])
+        
+        return np.clip(base_probs[:, None] * multipliers, 0.0, 1.0)
     
-    def _prob_to_level(self, prob: float) -> str:
-        """Convert probability to escalation level"""
-        if prob >= 0.8:
-            return "critical"
-        elif prob >= 0.6:
-            return "high"
-        elif prob >= 0.4:
-            return "medium"
-        else:
-            return "low"
+    def _levels(self, probs: np.ndarray) -> np.ndarray:
+        """Escalation level of each probability: low, medium (>= 0.4), high (>= 0.6) or critical (>= 0.8)"""
+        return _LEVELS[np.searchsorted(_LEVEL_THRESHOLDS, probs, side='right')]
     
     def _generate_recommendations(self, prob: float, level: str) -> List[str]:
         """Generate recommendations based on escalation probability"""
@@ -371,41 +526,86 @@ class PredictiveEscalationModel:
         
         return recommendations
     
-    async def update_model(self, new_reports: List[Dict], actual_outcomes: List[Dict]):
-        """Update model with new data (online learning)"""
+    async def update_model(self, new_reports: List[Dict], actual_outcomes: List[Dict]) -> Dict[str, Any]:
+        """Record observed outcomes and retrain in the background (online learning)
+        
+        Returns as soon as the samples are buffered; predictions keep using the
+        current model until the retrained one is swapped in.
+        """
         try:
-            # Extract features from new reports
-            features = []
-            labels = []
+            pairs = [
+                (report, outcome) for report, outcome in zip(new_reports, actual_outcomes)
+                if 'latitude' in report and 'longitude' in report
+            ]
+            if not pairs:
+                return {"samples_added": 0, "buffer_size": len(self.replay_buffer), "model_version": self.model_version}
             
-            for report, outcome in zip(new_reports, actual_outcomes):
-                if 'latitude' in report and 'longitude' in report:
-                    feature_vector = await self._extract_features([report], 
-                                                                report['latitude'], 
-                                                                report['longitude'])
-                    features.append(feature_vector)
-                    labels.append(1 if outcome.get('escalated', False) else 0)
+            # Batched feature extraction, each report scored as its own report set
+            features = await self._feature_matrix(
+                [(report['latitude'], report['longitude']) for report, _ in pairs],
+                [[report] for report, _ in pairs]
+            )
+            labels = [1 if outcome.get('escalated', False) else 0 for _, outcome in pairs]
             
-            if features:
-                X = np.array(features)
-                y = np.array(labels)
-                X_scaled = self.scaler.transform(X)
-                
-                # Partial fit (if supported) or retrain
-                if hasattr(self.escalation_model, 'partial_fit'):
-                    self.escalation_model.partial_fit(X_scaled, y)
-                else:
-                    # For models that don't support partial_fit, we'd need to retrain
-                    # with combined old and new data
-                    pass
-                
-                logger.info(f"✅ Model updated with {len(features)} new samples")
-                
-                # Save updated model
-                joblib.dump(self.escalation_model, 'models/escalation_model.pkl')
+            self.replay_buffer.extend(zip(features, labels))
+            self._unfitted_samples += len(labels)
+            self._schedule_retrain()
+            
+            return {"samples_added": len(labels), "buffer_size": len(self.replay_buffer), "model_version": self.model_version}
                 
         except Exception as e:
             logger.error(f"Error updating model: {e}")
+            return {"samples_added": 0, "error": str(e), "model_version": self.model_version}
+    
+    def _schedule_retrain(self):
+        # Outcomes arriving mid-retrain are picked up by one follow-up run
+        if self._retrain_task and not self._retrain_task.done():
+            self._retrain_pending = True
+            return
+        self._retrain_task = asyncio.create_task(self._retrain_loop())
+    
+    async def _retrain_loop(self):
+        while True:
+            self._retrain_pending = False
+            try:
+                await self._retrain()
+            except Exception as e:
+                logger.error(f"Error retraining escalation model: {e}")
+            if not self._retrain_pending:
+                return
+    
+    async def _retrain(self):
+        if len(self.replay_buffer) < MIN_RETRAIN_SAMPLES or not self._unfitted_samples:
+            return
+        X = np.array([features for features, _ in self.replay_buffer], dtype=float)
+        y = np.array([label for _, label in self.replay_buffer], dtype=int)
+        if len(np.unique(y)) < 2:
+            return
+        
+        current, zone_predictor, scaler = self.escalation_model, self.zone_predictor, self.scaler
+        unfitted = min(self._unfitted_samples, len(y))
+        self._unfitted_samples = 0
+        
+        def fit():
+            if hasattr(current, 'partial_fit'):
+                # True online update on the samples the model has not seen yet
+                model = copy.deepcopy(current)
+                model.partial_fit(scaler.transform(X[-unfitted:]), y[-unfitted:], classes=[0, 1])
+            else:
+                # Windowed refit: a fresh estimator with the same hyperparameters, fit
+                # from scratch on the replay window so old samples age out of the forest
+                model = clone(current)
+                model.fit(scaler.transform(X), y)
+            version, compiled = self._write_version(model, zone_predictor, scaler, X, y)
+            return model, version, compiled
+        
+        model, version, compiled = await asyncio.to_thread(fit)
+        
+        # Swapped together with no await in between: in-flight predictions finish on the old model
+        self.escalation_model = model
+        self.compiled = compiled
+        self.model_version = version
+        logger.info(f"✅ Escalation model v{version} trained on {len(y)} samples ({unfitted} new)")
 
 # Global model instance
 escalation_model = PredictiveEscalationModel()
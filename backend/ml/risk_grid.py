@@ -0,0 +1,336 @@
+"""
+Precomputed Escalation Risk Grid
+A background job scores PredictiveEscalationModel over a fixed coastal grid
+and stores the result as a memory-mapped float32 array, so point and bbox
+risk lookups are array indexing and never touch the model.
+
+Run the refresh loop on its own with: python -m ml.risk_grid
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import math
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .predictive_escalation import _LEVEL_THRESHOLDS, _LEVELS
+
+logger = logging.getLogger(__name__)
+
+# lat_min, lat_max, lon_min, lon_max — Indian coastline and territorial waters
+DEFAULT_BOUNDS = (5.0, 25.0, 65.0, 95.0)
+
+# Layers of the stored array
+PROBABILITY, ZONE_SIZE = 0, 1
+
+ReportsSource = Callable[[], Awaitable[List[Dict]]]
+
+RECENT_REPORTS_QUERY = """
+    SELECT latitude, longitude, created_at
+    FROM hazard_reports
+    WHERE created_at >= now() - make_interval(hours => :window_hours)
+"""
+
+def _level(prob: float) -> str:
+    return str(_LEVELS[np.searchsorted(_LEVEL_THRESHOLDS, prob, side='right')])
+
+async def load_recent_reports(window_hours: int = 6) -> List[Dict]:
+    """Legacy hazard reports of the last `window_hours`, shaped as the model's report features expect"""
+    # Imported here so the grid stays importable without the database drivers
+    from core.database import database
+
+    rows = await database.fetch_all(RECENT_REPORTS_QUERY, {"window_hours": window_hours})
+    reports = []
+    for row in rows:
+        created_at = row["created_at"]
+        if created_at.tzinfo is not None:
+            # The model compares against naive UTC timestamps
+            created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+        reports.append({
+            "latitude": row["latitude"],
+            "longitude": row["longitude"],
+            "timestamp": created_at.isoformat()
+        })
+    return reports
+
+class EscalationRiskGrid:
+    def __init__(self, directory: str = 'models/risk_grid',
+                 bounds: Tuple[float, float, float, float] = DEFAULT_BOUNDS,
+                 resolution_deg: float = 0.1, chunk_size: int = 4096):
+        self.chunk_size = chunk_size
+        self._task: Optional[asyncio.Task] = None
+        self.configure(directory, bounds, resolution_deg)
+
+    def configure(self, directory: str, bounds: Tuple[float, float, float, float], resolution_deg: float):
+        """Set where the grid lives and, for the writer, what area and resolution it covers"""
+        self.directory = directory
+        self.bounds = tuple(bounds)
+        self.resolution_deg = resolution_deg
+        self.meta_path = os.path.join(directory, 'meta.json')
+        self.lock_path = os.path.join(directory, '.lock')
+
+        # Reader state: the mapped array of the latest generation on disk
+        self._meta: Optional[Dict[str, Any]] = None
+        self._grid: Optional[np.ndarray] = None
+        self._meta_mtime = None
+        self._checked_at = 0.0
+
+    # ---- writer ----
+
+    def _shape(self) -> Tuple[int, int]:
+        lat_min, lat_max, lon_min, lon_max = self.bounds
+        rows = int(math.ceil((lat_max - lat_min) / self.resolution_deg))
+        cols = int(math.ceil((lon_max - lon_min) / self.resolution_deg))
+        return rows, cols
+
+    def _bucket_reports(self, reports: List[Dict], rows: int, cols: int) -> Dict[int, List[Dict]]:
+        """Group reports by the flat index of the cell they fall in"""
+        lat_min, _, lon_min, _ = self.bounds
+        buckets: Dict[int, List[Dict]] = {}
+        for report in reports:
+            lat, lon = report.get('latitude'), report.get('longitude')
+            if lat is None or lon is None:
+                continue
+            row = int((lat - lat_min) // self.resolution_deg)
+            col = int((lon - lon_min) // self.resolution_deg)
+            if 0 <= row < rows and 0 <= col < cols:
+                buckets.setdefault(row * cols + col, []).append(report)
+        return buckets
+
+    async def refresh(self, model, reports: Optional[List[Dict]] = None) -> Dict[str, Any]:
+        """Score every cell centre and publish the result as a new generation"""
+        started = time.monotonic()
+        lat_min, _, lon_min, _ = self.bounds
+        rows, cols = self._shape()
+        buckets = self._bucket_reports(reports or [], rows, cols)
+
+        lats = lat_min + (np.arange(rows) + 0.5) * self.resolution_deg
+        lons = lon_min + (np.arange(cols) + 0.5) * self.resolution_deg
+        cell_lats = np.repeat(lats, cols)
+        cell_lons = np.tile(lons, rows)
+
+        os.makedirs(self.directory, exist_ok=True)
+        generation = int(time.time() * 1000)
+        filename = f'risk_{generation}.npy'
+        path = os.path.join(self.directory, filename)
+        grid = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(2, rows, cols))
+        flat = grid.reshape(2, rows * cols)
+
+        # Batched features: one scaler and model pass per chunk of cells
+        for start in range(0, rows * cols, self.chunk_size):
+            stop = min(start + self.chunk_size, rows * cols)
+            locations = list(zip(cell_lats[start:stop].tolist(), cell_lons[start:stop].tolist()))
+            reports_by_location = [buckets.get(index, []) for index in range(start, stop)]
+            probabilities, zone_sizes = await model.score_locations(locations, reports_by_location)
+            flat[PROBABILITY, start:stop] = probabilities
+            flat[ZONE_SIZE, start:stop] = zone_sizes
+        grid.flush()
+        del flat, grid
+
+        meta = {
+            "file": filename,
+            "generation": generation,
+            "bounds": list(self.bounds),
+            "resolution_deg": self.resolution_deg,
+            "rows": rows,
+            "cols": cols,
+            "cells_with_reports": len(buckets),
+            "computed_at": datetime.utcnow().isoformat(),
+            "computed_at_epoch": time.time(),
+            "duration_seconds": round(time.monotonic() - started, 3)
+        }
+        # Readers switch generations only once the new array is complete. The lock
+        # keeps concurrent refreshers from publishing over or deleting each other's files.
+        with open(self.lock_path, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            published = self._published_generation()
+            if published is not None and published > generation:
+                # A refresh that started later already published; ours is stale
+                self._remove_generation(filename)
+                logger.info("Risk grid refresh superseded by a newer generation")
+                return self._meta_on_disk()
+            tmp_path = self.meta_path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, self.meta_path)
+            self._remove_old_generations(generation)
+        self._checked_at = 0.0
+
+        logger.info(f"✅ Risk grid refreshed: {rows}x{cols} cells in {meta['duration_seconds']}s")
+        return meta
+
+    def _meta_on_disk(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _published_generation(self) -> Optional[int]:
+        meta = self._meta_on_disk()
+        return meta["generation"] if meta else None
+
+    def _remove_generation(self, name: str):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def _remove_old_generations(self, published: int):
+        """Delete generations older than the published one; newer files belong to refreshes still writing.
+        Processes still mapping an old file keep reading it until they reload."""
+        for name in os.listdir(self.directory):
+            if not (name.startswith('risk_') and name.endswith('.npy')):
+                continue
+            try:
+                generation = int(name[len('risk_'):-len('.npy')])
+            except ValueError:
+                continue
+            if generation < published:
+                self._remove_generation(name)
+
+    async def run(self, model, interval_seconds: float = 300,
+                  reports_source: Optional[ReportsSource] = None):
+        """Refresh the grid every `interval_seconds` until cancelled"""
+        while True:
+            try:
+                reports = await reports_source() if reports_source else []
+                await self.refresh(model, reports)
+            except Exception as e:
+                logger.error(f"❌ Risk grid refresh failed: {e}")
+            await asyncio.sleep(interval_seconds)
+
+    def start(self, model, interval_seconds: float = 300,
+              reports_source: Optional[ReportsSource] = None):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(model, interval_seconds, reports_source))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # ---- reader ----
+
+    def _current(self) -> Optional[Tuple[Dict[str, Any], np.ndarray]]:
+        """Map the latest generation; the metadata file is re-checked at most once a second"""
+        now = time.monotonic()
+        if self._grid is None or now - self._checked_at >= 1.0:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.meta_path).st_mtime_ns
+            except FileNotFoundError:
+                return None
+            if mtime != self._meta_mtime:
+                try:
+                    with open(self.meta_path) as f:
+                        meta = json.load(f)
+                    grid = np.load(os.path.join(self.directory, meta['file']), mmap_mode='r')
+                except (OSError, ValueError) as e:
+                    logger.error(f"Error loading risk grid: {e}")
+                    return (self._meta, self._grid) if self._grid is not None else None
+                self._meta, self._grid, self._meta_mtime = meta, grid, mtime
+        return self._meta, self._grid
+
+    def _freshness(self, meta: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "computed_at": meta["computed_at"],
+            "age_seconds": round(time.time() - meta["computed_at_epoch"], 1),
+            "resolution_deg": meta["resolution_deg"]
+        }
+
+    def lookup(self, lat: float, lon: float) -> Optional[Dict[str, Any]]:
+        """Risk of the cell containing (lat, lon); None outside the grid or before the first refresh"""
+        current = self._current()
+        if current is None:
+            return None
+        meta, grid = current
+        lat_min, _, lon_min, _ = meta["bounds"]
+        row = int((lat - lat_min) // meta["resolution_deg"])
+        col = int((lon - lon_min) // meta["resolution_deg"])
+        if not (0 <= row < meta["rows"] and 0 <= col < meta["cols"]):
+            return None
+
+        probability = float(grid[PROBABILITY, row, col])
+        return {
+            "escalation_probability": probability,
+            "escalation_level": _level(probability),
+            "zone_size_km2": float(grid[ZONE_SIZE, row, col]),
+            "cell": {
+                "latitude": lat_min + (row + 0.5) * meta["resolution_deg"],
+                "longitude": lon_min + (col + 0.5) * meta["resolution_deg"]
+            },
+            **self._freshness(meta)
+        }
+
+    def lookup_bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                    max_cells: int = 10000) -> Optional[Dict[str, Any]]:
+        """Probabilities of every cell overlapping the box, row-major from the south-west corner"""
+        current = self._current()
+        if current is None:
+            return None
+        meta, grid = current
+        lat_min, _, lon_min, _ = meta["bounds"]
+        resolution = meta["resolution_deg"]
+        row_start = max(0, int((min_lat - lat_min) // resolution))
+        row_stop = min(meta["rows"], int((max_lat - lat_min) // resolution) + 1)
+        col_start = max(0, int((min_lon - lon_min) // resolution))
+        col_stop = min(meta["cols"], int((max_lon - lon_min) // resolution) + 1)
+        if row_start >= row_stop or col_start >= col_stop:
+            return None
+        if (row_stop - row_start) * (col_stop - col_start) > max_cells:
+            raise ValueError(f"Bounding box covers more than {max_cells} cells")
+
+        window = np.asarray(grid[PROBABILITY, row_start:row_stop, col_start:col_stop])
+        return {
+            "origin": {
+                "latitude": lat_min + row_start * resolution,
+                "longitude": lon_min + col_start * resolution
+            },
+            "rows": row_stop - row_start,
+            "cols": col_stop - col_start,
+            "max_probability": float(window.max()),
+            "mean_probability": float(window.mean()),
+            "max_level": _level(float(window.max())),
+            "probabilities": np.round(window, 4).tolist(),
+            **self._freshness(meta)
+        }
+
+    def status(self) -> Dict[str, Any]:
+        current = self._current()
+        if current is None:
+            return {"available": False}
+        meta, _ = current
+        return {"available": True, **meta}
+
+# Global grid instance
+risk_grid = EscalationRiskGrid()
+
+if __name__ == "__main__":
+    from core.config import settings
+    from core.database import close_db, init_db
+    from .predictive_escalation import escalation_model
+
+    async def _recent_reports():
+        return await load_recent_reports(settings.RISK_GRID_REPORT_WINDOW_HOURS)
+
+    async def _main():
+        risk_grid.configure(settings.RISK_GRID_DIR, settings.RISK_GRID_BOUNDS, settings.RISK_GRID_RESOLUTION_DEG)
+        await init_db()
+        await escalation_model.initialize()
+        try:
+            await risk_grid.run(escalation_model, settings.RISK_GRID_REFRESH_SECONDS, _recent_reports)
+        finally:
+            await close_db()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -2,14 +2,31 @@
 Trust Score Engine for Volunteer and Reporter Credibility
 """
 import numpy as np
-from typing import Dict, List, Any
-from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Any, Optional
+from datetime import datetime, timedelta, timezone
+import json
 import logging
-from dataclasses import dataclass
+import math
+from collections import deque
+from dataclasses import dataclass, field
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+# Incremental aggregates: rolling accuracy over windows of this many events,
+# keeping the last CONSISTENCY_HISTORY window accuracies for the variance
+CONSISTENCY_WINDOW = 5
+CONSISTENCY_HISTORY = 100
+# Recent performance decays exponentially instead of a hard 90-day cut-off
+RECENCY_HALF_LIFE_DAYS = 30.0
+_RECENCY_TAU = RECENCY_HALF_LIFE_DAYS * 86400 / math.log(2)
+
+def _epoch(dt: datetime) -> float:
+    """Seconds since the epoch; naive datetimes are UTC, as produced by datetime.utcnow()"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
 class ReportType(Enum):
     VERIFIED_CORRECT = "verified_correct"
     VERIFIED_INCORRECT = "verified_incorrect"
@@ -28,8 +45,172 @@ class TrustEvent:
     location_accuracy: float  # 0-1, how accurate the location was
     time_to_verify: timedelta  # How long it took to verify
 
-class TrustScoreEngine:
+@dataclass
+class TrustAggregate:
+    """Running per-user aggregates; every TrustScoreEngine score component can be
+    read from these in O(1), and each new TrustEvent updates them in O(1)"""
+    user_id: str
+    total: int = 0
+    counts: Dict[str, int] = field(default_factory=dict)
+    accuracy_sum: float = 0.0
+    weight_sum: float = 0.0
+    verify_hours_sum: float = 0.0
+    verify_count: int = 0
+    complex_total: int = 0
+    complex_correct: int = 0
+    last_timestamp: Optional[float] = None
+    # Exponentially decayed event and correct counts, valid as of decay_anchor
+    decay_anchor: Optional[float] = None
+    decayed_total: float = 0.0
+    decayed_correct: float = 0.0
+    # Correctness of the last CONSISTENCY_WINDOW events and the accuracies of past windows
+    window: deque = field(default_factory=lambda: deque(maxlen=CONSISTENCY_WINDOW))
+    window_accuracies: deque = field(default_factory=lambda: deque(maxlen=CONSISTENCY_HISTORY))
+    window_sum: float = 0.0
+    window_sumsq: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dict(self.__dict__)
+        data["window"] = list(self.window)
+        data["window_accuracies"] = list(self.window_accuracies)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TrustAggregate":
+        data = dict(data)
+        data["window"] = deque(data.get("window", []), maxlen=CONSISTENCY_WINDOW)
+        data["window_accuracies"] = deque(data.get("window_accuracies", []), maxlen=CONSISTENCY_HISTORY)
+        return cls(**data)
+
+class TrustStore:
+    """Persistence for TrustAggregate
+
+    `update` is an atomic read-modify-write: `apply` folds new events into the
+    aggregate and returns its score, which stores may keep alongside it. The
+    event itself is appended to the store's event log when it keeps one.
+    """
+
+    def get(self, user_id: str) -> Optional[TrustAggregate]:
+        raise NotImplementedError
+
+    def update(self, user_id: str, apply: Callable[[TrustAggregate], Dict[str, Any]],
+               event: Optional[TrustEvent] = None) -> TrustAggregate:
+        raise NotImplementedError
+
+class InMemoryTrustStore(TrustStore):
     def __init__(self):
+        self._aggregates: Dict[str, TrustAggregate] = {}
+
+    def get(self, user_id: str) -> Optional[TrustAggregate]:
+        return self._aggregates.get(user_id)
+
+    def update(self, user_id: str, apply: Callable[[TrustAggregate], Dict[str, Any]],
+               event: Optional[TrustEvent] = None) -> TrustAggregate:
+        aggregate = self._aggregates.get(user_id) or TrustAggregate(user_id=user_id)
+        apply(aggregate)
+        self._aggregates[user_id] = aggregate
+        return aggregate
+
+class SQLTrustStore(TrustStore):
+    """Aggregates as JSON rows in user_trust_aggregates, one row lock per update;
+    events are logged to trust_events in the same transaction"""
+
+    def __init__(self, engine):
+        from sqlalchemy import text
+        self.engine = engine
+        self._select = text("SELECT state FROM user_trust_aggregates WHERE user_id = :user_id")
+        self._select_for_update = text(
+            "SELECT state FROM user_trust_aggregates WHERE user_id = :user_id FOR UPDATE"
+        )
+        self._upsert = text("""
+            INSERT INTO user_trust_aggregates (user_id, state, trust_score, confidence, updated_at)
+            VALUES (:user_id, CAST(:state AS jsonb), :trust_score, :confidence, now())
+            ON CONFLICT (user_id) DO UPDATE
+            SET state = EXCLUDED.state,
+                trust_score = EXCLUDED.trust_score,
+                confidence = EXCLUDED.confidence,
+                updated_at = EXCLUDED.updated_at
+        """)
+        self._insert_event = text("""
+            INSERT INTO trust_events (user_id, event_type, timestamp, confidence, report_complexity,
+                                      verification_source, location_accuracy, time_to_verify_seconds)
+            VALUES (:user_id, :event_type, :timestamp, :confidence, :report_complexity,
+                    :verification_source, :location_accuracy, :time_to_verify_seconds)
+        """)
+
+    def get(self, user_id: str) -> Optional[TrustAggregate]:
+        with self.engine.connect() as conn:
+            row = conn.execute(self._select, {"user_id": user_id}).first()
+        return TrustAggregate.from_dict(row.state) if row else None
+
+    def update(self, user_id: str, apply: Callable[[TrustAggregate], Dict[str, Any]],
+               event: Optional[TrustEvent] = None) -> TrustAggregate:
+        with self.engine.begin() as conn:
+            if event is not None:
+                conn.execute(self._insert_event, {
+                    "user_id": user_id,
+                    "event_type": event.event_type.value,
+                    "timestamp": event.timestamp,
+                    "confidence": event.confidence,
+                    "report_complexity": event.report_complexity,
+                    "verification_source": event.verification_source,
+                    "location_accuracy": event.location_accuracy,
+                    "time_to_verify_seconds": event.time_to_verify.total_seconds()
+                })
+            row = conn.execute(self._select_for_update, {"user_id": user_id}).first()
+            aggregate = TrustAggregate.from_dict(row.state) if row else TrustAggregate(user_id=user_id)
+            score = apply(aggregate)
+            conn.execute(self._upsert, {
+                "user_id": user_id,
+                "state": json.dumps(aggregate.to_dict()),
+                "trust_score": score["trust_score"],
+                "confidence": score["confidence"]
+            })
+        return aggregate
+
+# Accuracy base score per ReportType, in enum order
+EVENT_TYPES = list(ReportType)
+_EVENT_BASE_SCORES = np.array([
+    {ReportType.VERIFIED_CORRECT: 5.0, ReportType.PARTIALLY_CORRECT: 3.5,
+     ReportType.VERIFIED_INCORRECT: 2.0, ReportType.FALSE_ALARM: 1.0}.get(t, 3.0)
+    for t in EVENT_TYPES
+])
+_EVENT_CODE = {t: i for i, t in enumerate(EVENT_TYPES)}
+
+@dataclass
+class TrustEventColumns:
+    """Trust events of many users as parallel arrays, for bulk scoring
+
+    `users` holds integer user codes (index into `user_ids`), `event_types`
+    ReportType codes in enum order and `timestamps` epoch seconds.
+    """
+    user_ids: np.ndarray
+    users: np.ndarray
+    event_types: np.ndarray
+    timestamps: np.ndarray
+    confidence: np.ndarray
+    report_complexity: np.ndarray
+    verification_sources: np.ndarray
+    location_accuracy: np.ndarray
+    time_to_verify_seconds: np.ndarray
+
+    @classmethod
+    def from_events(cls, events: List[TrustEvent]) -> "TrustEventColumns":
+        user_ids, users = np.unique([e.user_id for e in events], return_inverse=True)
+        return cls(
+            user_ids=user_ids,
+            users=users,
+            event_types=np.array([_EVENT_CODE[e.event_type] for e in events], dtype=np.int64),
+            timestamps=np.array([_epoch(e.timestamp) for e in events], dtype=float),
+            confidence=np.array([e.confidence for e in events], dtype=float),
+            report_complexity=np.array([e.report_complexity for e in events], dtype=float),
+            verification_sources=np.array([e.verification_source for e in events], dtype=object),
+            location_accuracy=np.array([e.location_accuracy for e in events], dtype=float),
+            time_to_verify_seconds=np.array([e.time_to_verify.total_seconds() for e in events], dtype=float)
+        )
+
+class TrustScoreEngine:
+    def __init__(self, store: Optional[TrustStore] = None):
         self.base_score = 3.0  # Starting trust score (out of 5)
         self.max_score = 5.0
         self.min_score = 0.5
@@ -40,19 +221,133 @@ class TrustScoreEngine:
             "automated": 0.6,
             "peer_review": 0.7
         }
+        self.store = store or InMemoryTrustStore()
+    
+    def record_event(self, event: TrustEvent) -> Dict[str, Any]:
+        """Fold one event into the user's stored aggregates and return the new score, O(1)"""
+        def apply(aggregate: TrustAggregate) -> Dict[str, Any]:
+            self._apply_event(aggregate, event)
+            return self.score_aggregate(aggregate)
+        
+        aggregate = self.store.update(event.user_id, apply, event)
+        return self.score_aggregate(aggregate)
+    
+    def get_trust_score(self, user_id: str) -> Dict[str, Any]:
+        """Current score from the stored aggregates, O(1) regardless of history length"""
+        aggregate = self.store.get(user_id)
+        return self.score_aggregate(aggregate or TrustAggregate(user_id=user_id))
+    
+    def _apply_event(self, agg: TrustAggregate, event: TrustEvent):
+        correct = event.event_type == ReportType.VERIFIED_CORRECT
+        agg.total += 1
+        agg.counts[event.event_type.value] = agg.counts.get(event.event_type.value, 0) + 1
+        
+        event_score, weight = self._event_accuracy(event)
+        agg.accuracy_sum += event_score * weight
+        agg.weight_sum += weight
+        
+        hours = event.time_to_verify.total_seconds() / 3600
+        if hours > 0:
+            agg.verify_hours_sum += hours
+            agg.verify_count += 1
+        
+        if event.report_complexity > 0.7:
+            agg.complex_total += 1
+            agg.complex_correct += int(correct)
+        
+        ts = _epoch(event.timestamp)
+        agg.last_timestamp = ts if agg.last_timestamp is None else max(agg.last_timestamp, ts)
+        
+        # Decayed counts: move the anchor forward for new events, discount late ones
+        if agg.decay_anchor is None or ts >= agg.decay_anchor:
+            factor = 1.0 if agg.decay_anchor is None else math.exp(-(ts - agg.decay_anchor) / _RECENCY_TAU)
+            agg.decayed_total *= factor
+            agg.decayed_correct *= factor
+            agg.decay_anchor = ts
+            weight = 1.0
+        else:
+            weight = math.exp(-(agg.decay_anchor - ts) / _RECENCY_TAU)
+        agg.decayed_total += weight
+        agg.decayed_correct += weight * correct
+        
+        # Rolling window accuracy with running sum / sum of squares for the variance
+        agg.window.append(int(correct))
+        if len(agg.window) == CONSISTENCY_WINDOW:
+            if len(agg.window_accuracies) == CONSISTENCY_HISTORY:
+                evicted = agg.window_accuracies[0]
+                agg.window_sum -= evicted
+                agg.window_sumsq -= evicted * evicted
+            accuracy = sum(agg.window) / CONSISTENCY_WINDOW
+            agg.window_accuracies.append(accuracy)
+            agg.window_sum += accuracy
+            agg.window_sumsq += accuracy * accuracy
+    
+    def score_aggregate(self, agg: TrustAggregate, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Score components from running aggregates
+        
+        Accuracy, timeliness, complexity, confidence and verification rate
+        match calculate_trust_score exactly. Consistency uses fixed-size
+        windows over recent history, and recency and trend use exponentially
+        decayed counts in place of the 90-day cut-off; calculate_trust_score
+        stays the full recompute for audits.
+        """
+        if agg.total == 0:
+            return self._new_user_score()
+        
+        now_ts = _epoch(now or datetime.utcnow())
+        correct = agg.counts.get(ReportType.VERIFIED_CORRECT.value, 0)
+        incorrect = agg.counts.get(ReportType.VERIFIED_INCORRECT.value, 0)
+        false_alarms = agg.counts.get(ReportType.FALSE_ALARM.value, 0)
+        verification_rate = correct / max(1, correct + incorrect + false_alarms)
+        
+        accuracy_score = agg.accuracy_sum / max(1, agg.weight_sum)
+        
+        if agg.total < 3 or not agg.window_accuracies:
+            consistency_score = self.base_score
+        else:
+            n = len(agg.window_accuracies)
+            variance = max(0.0, agg.window_sumsq / n - (agg.window_sum / n) ** 2)
+            consistency_score = self._consistency_from_variance(variance)
+        
+        if agg.verify_count:
+            timeliness_score = self._timeliness_from_hours(agg.verify_hours_sum / agg.verify_count)
+        else:
+            timeliness_score = self.base_score
         
+        if agg.complex_total:
+            complexity_score = self.base_score + (agg.complex_correct / agg.complex_total - 0.5) * 4
+        else:
+            complexity_score = self.base_score
+        
+        decay = math.exp(-max(0.0, now_ts - agg.decay_anchor) / _RECENCY_TAU)
+        recent_activity = agg.decayed_total * decay
+        recent_accuracy = agg.decayed_correct / agg.decayed_total if agg.decayed_total > 0 else None
+        days_since_last = int(max(0.0, now_ts - agg.last_timestamp) // 86400)
+        decay_factor = self.decay_rate ** (days_since_last / 30)
+        if recent_activity >= 0.5 and recent_accuracy is not None:
+            recency_score = (self.base_score + (recent_accuracy - 0.5) * 4) * decay_factor
+        else:
+            recency_score = self.base_score * decay_factor
+        
+        if agg.total < 5 or recent_accuracy is None:
+            trend = "insufficient_data"
+        else:
+            trend = self._trend_from_accuracies(correct / agg.total, recent_accuracy)
+        
+        return self._assemble_score(
+            accuracy_score, consistency_score, timeliness_score, complexity_score, recency_score,
+            total_reports=agg.total,
+            verification_rate=verification_rate,
+            trend=trend,
+            recent_activity=int(round(recent_activity)),
+            last_report=datetime.utcfromtimestamp(agg.last_timestamp).isoformat()
+        )
+    
     def calculate_trust_score(self, user_id: str, trust_events: List[TrustEvent]) -> Dict[str, Any]:
         """Calculate comprehensive trust score for a user"""
         try:
             if not trust_events:
-                return {
-                    "trust_score": self.base_score,
-                    "confidence": 0.1,
-                    "total_reports": 0,
-                    "verification_rate": 0.0,
-                    "reliability_trend": "new_user",
-                    "score_breakdown": self._get_empty_breakdown()
-                }
+                return self._new_user_score()
             
             # Sort events by timestamp
             events = sorted(trust_events, key=lambda x: x.timestamp)
@@ -74,41 +369,15 @@ class TrustScoreEngine:
             complexity_score = self._calculate_complexity_score(events)
             recency_score = self._calculate_recency_score(events, recent_events)
             
-            # Combine scores with weights
-            final_score = (
-                accuracy_score * 0.35 +
-                consistency_score * 0.25 +
-                timeliness_score * 0.15 +
-                complexity_score * 0.15 +
-                recency_score * 0.10
+            return self._assemble_score(
+                accuracy_score, consistency_score, timeliness_score, complexity_score, recency_score,
+                total_reports=total_reports,
+                verification_rate=verification_rate,
+                trend=self._calculate_trend(events),
+                recent_activity=len(recent_events),
+                last_report=events[-1].timestamp.isoformat() if events else None
             )
             
-            # Apply bounds
-            final_score = max(self.min_score, min(self.max_score, final_score))
-            
-            # Calculate confidence based on number of events
-            confidence = min(1.0, total_reports / 20)  # Full confidence at 20+ reports
-            
-            # Determine reliability trend
-            trend = self._calculate_trend(events)
-            
-            return {
-                "trust_score": round(final_score, 2),
-                "confidence": round(confidence, 2),
-                "total_reports": total_reports,
-                "verification_rate": round(verification_rate * 100, 1),
-                "reliability_trend": trend,
-                "score_breakdown": {
-                    "accuracy": round(accuracy_score, 2),
-                    "consistency": round(consistency_score, 2),
-                    "timeliness": round(timeliness_score, 2),
-                    "complexity": round(complexity_score, 2),
-                    "recency": round(recency_score, 2)
-                },
-                "recent_activity": len(recent_events),
-                "last_report": events[-1].timestamp.isoformat() if events else None
-            }
-            
         except Exception as e:
             logger.error(f"Error calculating trust score for {user_id}: {e}")
             return {
@@ -121,6 +390,274 @@ class TrustScoreEngine:
                 "error": str(e)
             }
     
+    def calculate_trust_scores_bulk(self, columns: TrustEventColumns,
+                                    now: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """calculate_trust_score for every user at once, vectorised
+        
+        Events are sorted by (user, timestamp) and every component is reduced
+        per user with np.add.reduceat over the sorted arrays. Returns arrays
+        aligned with `columns.user_ids`.
+        """
+        now_ts = _epoch(now or datetime.utcnow())
+        order = np.lexsort((columns.timestamps, columns.users))
+        users = columns.users[order]
+        codes = columns.event_types[order]
+        ts = columns.timestamps[order]
+        n_events = len(order)
+        if n_events == 0:
+            return {"user_ids": columns.user_ids[:0], "trust_score": np.zeros(0), "confidence": np.zeros(0)}
+        
+        starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        counts = np.diff(np.r_[starts, n_events])
+        group = np.repeat(np.arange(len(starts)), counts)
+        seg = lambda values: np.add.reduceat(values, starts)
+        
+        correct = (codes == _EVENT_CODE[ReportType.VERIFIED_CORRECT]).astype(float)
+        correct_cum = np.r_[0.0, np.cumsum(correct)]
+        correct_total = seg(correct)
+        
+        # Verification rate
+        incorrect = seg((codes == _EVENT_CODE[ReportType.VERIFIED_INCORRECT]).astype(float))
+        false_alarms = seg((codes == _EVENT_CODE[ReportType.FALSE_ALARM]).astype(float))
+        verification_rate = correct_total / np.maximum(1, correct_total + incorrect + false_alarms)
+        
+        # Accuracy: source weights looked up once per distinct source
+        sources, source_index = np.unique(columns.verification_sources[order].astype(str), return_inverse=True)
+        weights = np.array([self.verification_weights.get(source, 0.5) for source in sources])[source_index]
+        event_scores = _EVENT_BASE_SCORES[codes] * (
+            columns.confidence[order] * 0.7 + columns.location_accuracy[order] * 0.3
+        )
+        accuracy = seg(event_scores * weights) / np.maximum(1, seg(weights))
+        
+        # Consistency: rolling accuracy over windows of max(5, n // 4) events per user
+        window = np.maximum(5, counts // 4)[group]
+        position = np.arange(n_events) - starts[group]
+        valid = position >= window - 1
+        end = np.arange(n_events) + 1
+        window_correct = correct_cum[end] - correct_cum[np.where(valid, end - window, end)]
+        window_accuracy = np.where(valid, window_correct / window, 0.0)
+        n_windows = seg(valid.astype(float))
+        mean_accuracy = seg(window_accuracy) / np.maximum(1, n_windows)
+        variance = seg(window_accuracy ** 2) / np.maximum(1, n_windows) - mean_accuracy ** 2
+        consistency = np.where(
+            (counts >= 3) & (n_windows > 0),
+            self.base_score + (np.maximum(0, 1 - np.maximum(0, variance) * 2) - 0.5) * 4,
+            self.base_score
+        )
+        
+        # Timeliness: mean verification time bucketed
+        hours = columns.time_to_verify_seconds[order] / 3600
+        verified = hours > 0
+        verified_count = seg(verified.astype(float))
+        avg_hours = seg(np.where(verified, hours, 0.0)) / np.maximum(1, verified_count)
+        timeliness = np.where(
+            verified_count > 0,
+            np.select([avg_hours <= 1, avg_hours <= 6, avg_hours <= 24, avg_hours <= 72], [5.0, 4.0, 3.0, 2.0], 1.0),
+            self.base_score
+        )
+        
+        # Complexity
+        complex_events = columns.report_complexity[order] > 0.7
+        complex_total = seg(complex_events.astype(float))
+        complex_correct = seg((complex_events & (correct > 0)).astype(float))
+        complexity = np.where(
+            complex_total > 0,
+            self.base_score + (complex_correct / np.maximum(1, complex_total) - 0.5) * 4,
+            self.base_score
+        )
+        
+        # Recency: decay since the last event and accuracy over the last 90 days
+        last_ts = np.maximum.reduceat(ts, starts)
+        days_since_last = np.floor((now_ts - last_ts) / 86400)
+        decay_factor = self.decay_rate ** (days_since_last / 30)
+        recent = (now_ts - ts) < 90 * 86400
+        recent_count = seg(recent.astype(float))
+        recent_correct = seg(np.where(recent, correct, 0.0))
+        recent_score = np.where(
+            recent_count > 0,
+            self.base_score + (recent_correct / np.maximum(1, recent_count) - 0.5) * 4,
+            self.base_score
+        )
+        recency = recent_score * decay_factor
+        
+        # Trend: first half against second half
+        mid = counts // 2
+        early_accuracy = (correct_cum[starts + mid] - correct_cum[starts]) / np.maximum(1, mid)
+        late_accuracy = (correct_cum[starts + counts] - correct_cum[starts + mid]) / np.maximum(1, counts - mid)
+        diff = late_accuracy - early_accuracy
+        trend = np.where(
+            counts < 5, "insufficient_data",
+            np.select([diff > 0.1, diff < -0.1], ["improving", "declining"], "stable")
+        )
+        
+        final_score = np.clip(
+            accuracy * 0.35 + consistency * 0.25 + timeliness * 0.15 + complexity * 0.15 + recency * 0.10,
+            self.min_score, self.max_score
+        )
+        
+        return {
+            "user_ids": columns.user_ids[users[starts]],
+            "trust_score": np.round(final_score, 2),
+            "confidence": np.round(np.minimum(1.0, counts / 20), 2),
+            "total_reports": counts,
+            "verification_rate": np.round(verification_rate * 100, 1),
+            "reliability_trend": trend,
+            "accuracy": accuracy,
+            "consistency": consistency,
+            "timeliness": timeliness,
+            "complexity": complexity,
+            "recency": recency,
+            "recent_activity": recent_count.astype(int),
+            "last_report": last_ts
+        }
+    
+    def build_aggregates_bulk(self, columns: TrustEventColumns) -> List[TrustAggregate]:
+        """The TrustAggregate record_event would have built for every user, vectorised
+        
+        Equivalent to folding each user's events in timestamp order with
+        _apply_event, so score_aggregate of the result is the score that
+        record_event keeps persisting afterwards. Sums are reduced per user
+        with np.add.reduceat; only the rolling windows are sliced per user.
+        """
+        order = np.lexsort((columns.timestamps, columns.users))
+        if len(order) == 0:
+            return []
+        users = columns.users[order]
+        codes = columns.event_types[order]
+        ts = columns.timestamps[order]
+        n_events = len(order)
+        
+        starts = np.flatnonzero(np.r_[True, users[1:] != users[:-1]])
+        ends = np.r_[starts[1:], n_events]
+        group = np.repeat(np.arange(len(starts)), ends - starts)
+        seg = lambda values: np.add.reduceat(values, starts)
+        
+        correct = codes == _EVENT_CODE[ReportType.VERIFIED_CORRECT]
+        type_counts = np.stack([seg((codes == code).astype(np.int64)) for code in range(len(EVENT_TYPES))], axis=1)
+        
+        sources, source_index = np.unique(columns.verification_sources[order].astype(str), return_inverse=True)
+        weights = np.array([self.verification_weights.get(source, 0.5) for source in sources])[source_index]
+        event_scores = _EVENT_BASE_SCORES[codes] * (
+            columns.confidence[order] * 0.7 + columns.location_accuracy[order] * 0.3
+        )
+        accuracy_sum = seg(event_scores * weights)
+        weight_sum = seg(weights)
+        
+        hours = columns.time_to_verify_seconds[order] / 3600
+        verified = hours > 0
+        verify_hours_sum = seg(np.where(verified, hours, 0.0))
+        verify_count = seg(verified.astype(np.int64))
+        
+        complex_events = columns.report_complexity[order] > 0.7
+        complex_total = seg(complex_events.astype(np.int64))
+        complex_correct = seg((complex_events & correct).astype(np.int64))
+        
+        # In timestamp order every event moves the decay anchor forward, so it ends on the last one
+        last_ts = np.maximum.reduceat(ts, starts)
+        decay = np.exp(-(last_ts[group] - ts) / _RECENCY_TAU)
+        decayed_total = seg(decay)
+        decayed_correct = seg(np.where(correct, decay, 0.0))
+        
+        # Rolling accuracy of every full CONSISTENCY_WINDOW-event window, per user
+        correct_cum = np.r_[0, np.cumsum(correct)]
+        end = np.arange(n_events) + 1
+        full = end - starts[group] >= CONSISTENCY_WINDOW
+        window_accuracy = (correct_cum[end] - correct_cum[np.maximum(end - CONSISTENCY_WINDOW, 0)]) / CONSISTENCY_WINDOW
+        
+        aggregates = []
+        for i, (start, stop) in enumerate(zip(starts.tolist(), ends.tolist())):
+            accuracies = window_accuracy[start:stop][full[start:stop]][-CONSISTENCY_HISTORY:]
+            aggregates.append(TrustAggregate(
+                user_id=str(columns.user_ids[users[start]]),
+                total=stop - start,
+                counts={t.value: int(type_counts[i, code]) for code, t in enumerate(EVENT_TYPES) if type_counts[i, code]},
+                accuracy_sum=float(accuracy_sum[i]),
+                weight_sum=float(weight_sum[i]),
+                verify_hours_sum=float(verify_hours_sum[i]),
+                verify_count=int(verify_count[i]),
+                complex_total=int(complex_total[i]),
+                complex_correct=int(complex_correct[i]),
+                last_timestamp=float(last_ts[i]),
+                decay_anchor=float(last_ts[i]),
+                decayed_total=float(decayed_total[i]),
+                decayed_correct=float(decayed_correct[i]),
+                window=deque(correct[max(start, stop - CONSISTENCY_WINDOW):stop].astype(int).tolist(),
+                             maxlen=CONSISTENCY_WINDOW),
+                window_accuracies=deque(accuracies.tolist(), maxlen=CONSISTENCY_HISTORY),
+                window_sum=float(accuracies.sum()),
+                window_sumsq=float((accuracies ** 2).sum())
+            ))
+        return aggregates
+    
+    def _new_user_score(self) -> Dict[str, Any]:
+        return {
+            "trust_score": self.base_score,
+            "confidence": 0.1,
+            "total_reports": 0,
+            "verification_rate": 0.0,
+            "reliability_trend": "new_user",
+            "score_breakdown": self._get_empty_breakdown(),
+            "recent_activity": 0,
+            "last_report": None
+        }
+    
+    def _assemble_score(self, accuracy_score: float, consistency_score: float, timeliness_score: float,
+                        complexity_score: float, recency_score: float, total_reports: int,
+                        verification_rate: float, trend: str, recent_activity: int,
+                        last_report: Optional[str]) -> Dict[str, Any]:
+        # Combine scores with weights
+        final_score = (
+            accuracy_score * 0.35 +
+            consistency_score * 0.25 +
+            timeliness_score * 0.15 +
+            complexity_score * 0.15 +
+            recency_score * 0.10
+        )
+        
+        # Apply bounds
+        final_score = max(self.min_score, min(self.max_score, final_score))
+        
+        # Calculate confidence based on number of events
+        confidence = min(1.0, total_reports / 20)  # Full confidence at 20+ reports
+        
+        return {
+            "trust_score": round(final_score, 2),
+            "confidence": round(confidence, 2),
+            "total_reports": total_reports,
+            "verification_rate": round(verification_rate * 100, 1),
+            "reliability_trend": trend,
+            "score_breakdown": {
+                "accuracy": round(accuracy_score, 2),
+                "consistency": round(consistency_score, 2),
+                "timeliness": round(timeliness_score, 2),
+                "complexity": round(complexity_score, 2),
+                "recency": round(recency_score, 2)
+            },
+            "recent_activity": recent_activity,
+            "last_report": last_report
+        }
+    
+    def _event_accuracy(self, event: TrustEvent):
+        """(adjusted event score, verification source weight) for the accuracy component"""
+        # Base score for event type
+        if event.event_type == ReportType.VERIFIED_CORRECT:
+            event_score = 5.0
+        elif event.event_type == ReportType.PARTIALLY_CORRECT:
+            event_score = 3.5
+        elif event.event_type == ReportType.VERIFIED_INCORRECT:
+            event_score = 2.0
+        elif event.event_type == ReportType.FALSE_ALARM:
+            event_score = 1.0
+        else:  # UNVERIFIED
+            event_score = 3.0  # Neutral
+        
+        # Weight by verification source reliability
+        weight = self.verification_weights.get(event.verification_source, 0.5)
+        
+        # Adjust by confidence and location accuracy
+        event_score *= (event.confidence * 0.7 + event.location_accuracy * 0.3)
+        return event_score, weight
+    
     def _calculate_accuracy_score(self, events: List[TrustEvent]) -> float:
         """Calculate accuracy component of trust score"""
         if not events:
@@ -130,24 +667,7 @@ class TrustScoreEngine:
         weight_sum = 0
         
         for event in events:
-            # Base score for event type
-            if event.event_type == ReportType.VERIFIED_CORRECT:
-                event_score = 5.0
-            elif event.event_type == ReportType.PARTIALLY_CORRECT:
-                event_score = 3.5
-            elif event.event_type == ReportType.VERIFIED_INCORRECT:
-                event_score = 2.0
-            elif event.event_type == ReportType.FALSE_ALARM:
-                event_score = 1.0
-            else:  # UNVERIFIED
-                event_score = 3.0  # Neutral
-            
-            # Weight by verification source reliability
-            weight = self.verification_weights.get(event.verification_source, 0.5)
-            
-            # Adjust by confidence and location accuracy
-            event_score *= (event.confidence * 0.7 + event.location_accuracy * 0.3)
-            
+            event_score, weight = self._event_accuracy(event)
             score_sum += event_score * weight
             weight_sum += weight
         
@@ -171,10 +691,11 @@ class TrustScoreEngine:
         if not accuracies:
             return self.base_score
         
+        return self._consistency_from_variance(np.var(accuracies))
+    
+    def _consistency_from_variance(self, variance: float) -> float:
         # Consistency is inverse of variance
-        variance = np.var(accuracies)
         consistency = max(0, 1 - variance * 2)  # Scale variance to 0-1
-        
         return self.base_score + (consistency - 0.5) * 4  # Scale to 1-5 range
     
     def _calculate_timeliness_score(self, events: List[TrustEvent]) -> float:
@@ -189,8 +710,9 @@ class TrustScoreEngine:
         if not verification_times:
             return self.base_score
         
-        avg_time = np.mean(verification_times)
-        
+        return self._timeliness_from_hours(np.mean(verification_times))
+    
+    def _timeliness_from_hours(self, avg_time: float) -> float:
         # Score based on average verification time
         # Faster verification = higher score
         if avg_time <= 1:  # Within 1 hour
@@ -262,6 +784,9 @@ class TrustScoreEngine:
         early_accuracy = early_correct / len(early_events)
         recent_accuracy = recent_correct / len(recent_events)
         
+        return self._trend_from_accuracies(early_accuracy, recent_accuracy)
+    
+    def _trend_from_accuracies(self, early_accuracy: float, recent_accuracy: float) -> str:
         diff = recent_accuracy - early_accuracy
         
         if diff > 0.1:
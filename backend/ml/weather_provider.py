@@ -0,0 +1,162 @@
+"""
+Weather Data Providers
+A provider fetches conditions for a list of points; WeatherService sits in
+front of it with a bounded LRU+TTL cache keyed by grid tile, coalesces
+concurrent lookups of the same tile into one fetch and batches every
+missing tile of a bulk lookup into a single provider call.
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+Point = Tuple[float, float]
+Tile = Tuple[int, int]
+
+class WeatherProvider:
+    """Source of weather conditions; subclasses implement `fetch_many`"""
+    name = "base"
+
+    async def fetch_many(self, points: List[Point]) -> List[Dict[str, Any]]:
+        """Conditions for every (lat, lon) in `points`, in the same order"""
+        raise NotImplementedError
+
+class MockWeatherProvider(WeatherProvider):
+    """Random but plausible coastal conditions (no external API)"""
+    name = "mock"
+
+    async def fetch_many(self, points: List[Point]) -> List[Dict[str, Any]]:
+        n = len(points)
+        columns = {
+            "wave_height": np.random.gamma(2, 1.5, n),
+            "wind_speed": np.random.gamma(3, 2, n),
+            "pressure": np.random.normal(1013, 10, n),
+            "temperature": np.random.normal(25, 5, n),
+            "humidity": np.random.uniform(60, 90, n),
+            "visibility": np.random.uniform(5, 15, n)
+        }
+        return [{key: float(values[i]) for key, values in columns.items()} for i in range(n)]
+
+class FileWeatherProvider(WeatherProvider):
+    """Fixed conditions from a JSON file, for tests and offline runs
+
+    The file holds {"default": {...}, "tiles": {"19.00,72.80": {...}}} with
+    tile keys formatted like the tile centres WeatherService asks for.
+    """
+    name = "file"
+
+    def __init__(self, path: str):
+        with open(path) as f:
+            data = json.load(f)
+        self.default = data.get("default", {})
+        self.tiles = data.get("tiles", {})
+        self.fetches = 0
+        self.points_fetched = 0
+
+    async def fetch_many(self, points: List[Point]) -> List[Dict[str, Any]]:
+        self.fetches += 1
+        self.points_fetched += len(points)
+        return [dict(self.tiles.get(f"{lat:.2f},{lon:.2f}", self.default)) for lat, lon in points]
+
+class WeatherCache:
+    """LRU cache whose entries also expire `ttl` seconds after they were stored"""
+
+    def __init__(self, ttl: float = 300, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tile, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, tile: Tile) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(tile)
+        if entry is None:
+            return None
+        expires, data = entry
+        if expires < time.monotonic():
+            del self._entries[tile]
+            return None
+        self._entries.move_to_end(tile)
+        return data
+
+    def put(self, tile: Tile, data: Dict[str, Any]):
+        self._entries[tile] = (time.monotonic() + self.ttl, data)
+        self._entries.move_to_end(tile)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class WeatherService:
+    def __init__(self, provider: WeatherProvider, ttl: float = 300,
+                 max_entries: int = 10000, tile_deg: float = 0.01):
+        self.provider = provider
+        self.tile_deg = tile_deg
+        self.cache = WeatherCache(ttl, max_entries)
+        # Tiles being fetched right now -> future of that fetch's {tile: data}
+        self._inflight: Dict[Tile, asyncio.Future] = {}
+
+    def tile(self, lat: float, lon: float) -> Tile:
+        return (int(round(lat / self.tile_deg)), int(round(lon / self.tile_deg)))
+
+    def tile_center(self, tile: Tile) -> Point:
+        return (round(tile[0] * self.tile_deg, 6), round(tile[1] * self.tile_deg, 6))
+
+    async def get(self, lat: float, lon: float) -> Dict[str, Any]:
+        return (await self.get_many([(lat, lon)]))[0]
+
+    async def get_many(self, points: List[Point]) -> List[Dict[str, Any]]:
+        """Weather for many points: cached tiles are free, tiles already being
+        fetched are awaited, and all remaining tiles go to the provider in one call"""
+        tiles = [self.tile(lat, lon) for lat, lon in points]
+        found: Dict[Tile, Dict[str, Any]] = {}
+        waiting: Dict[Tile, asyncio.Future] = {}
+        missing: List[Tile] = []
+        for tile in dict.fromkeys(tiles):
+            data = self.cache.get(tile)
+            if data is not None:
+                found[tile] = data
+            elif tile in self._inflight:
+                waiting[tile] = self._inflight[tile]
+            else:
+                missing.append(tile)
+
+        if missing:
+            found.update(await self._fetch(missing))
+        for tile, future in waiting.items():
+            found[tile] = (await future)[tile]
+
+        return [found[tile] for tile in tiles]
+
+    async def _fetch(self, tiles: List[Tile]) -> Dict[Tile, Dict[str, Any]]:
+        future = asyncio.get_running_loop().create_future()
+        for tile in tiles:
+            self._inflight[tile] = future
+        try:
+            results = await self.provider.fetch_many([self.tile_center(tile) for tile in tiles])
+            fetched = dict(zip(tiles, results))
+            for tile, data in fetched.items():
+                self.cache.put(tile, data)
+            future.set_result(fetched)
+            return fetched
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved: the error is raised here even if nobody else was waiting
+            future.exception()
+            raise
+        finally:
+            if not future.done():
+                future.cancel()
+            for tile in tiles:
+                self._inflight.pop(tile, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "provider": self.provider.name,
+            "cached_tiles": len(self.cache),
+            "max_entries": self.cache.max_entries,
+            "ttl_seconds": self.cache.ttl,
+            "inflight_tiles": len(self._inflight)
+        }
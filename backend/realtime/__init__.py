@@ -0,0 +1,5 @@
+"""
+Realtime delivery building blocks shared by the app and legacy WebSocket managers
+(per-client queues, the cross-worker bus, the connect snapshot and geohash/
+subscription geometry)
+"""
@@ -0,0 +1,187 @@
+"""
+Pub/sub backplane for realtime events across server workers
+Every worker publishes events to the bus and delivers to its own sockets only
+what it receives back from the bus, so each client gets an event exactly once
+no matter which worker produced it.
+
+Events published with sequenced=True get their stream position from the bus
+itself: an epoch naming the stream and a seq that increases by one per
+event, the same on every worker. Subscribers receive them as event["epoch"]
+and event["seq"], plus a STREAM_POSITION event with the current position
+whenever the bus (re)connects, so a worker can tell which events it missed.
+"""
+import asyncio
+import json
+import logging
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+EventHandler = Callable[[Dict], Awaitable[None]]
+
+logger = logging.getLogger(__name__)
+
+STREAM_POSITION = "stream_position"
+
+# KEYS: epoch key, seq key; ARGV: channel, epoch to use if none exists, event JSON.
+# A missing epoch (new or flushed Redis) starts a new stream from seq 1.
+SEQUENCED_PUBLISH = """
+local epoch = redis.call('GET', KEYS[1])
+if not epoch then
+    epoch = ARGV[2]
+    redis.call('SET', KEYS[1], epoch)
+    redis.call('SET', KEYS[2], 0)
+end
+local seq = redis.call('INCR', KEYS[2])
+redis.call('PUBLISH', ARGV[1], epoch .. ' ' .. seq .. ' ' .. ARGV[3])
+return seq
+"""
+
+def new_epoch() -> str:
+    return uuid.uuid4().hex[:12]
+
+class InProcessBus:
+    """Single-process bus: publishing hands the event straight to the handler"""
+
+    name = "memory"
+    connected = True
+
+    def __init__(self):
+        self._handler: Optional[EventHandler] = None
+        self.epoch = new_epoch()
+        self.seq = 0
+
+    async def start(self, handler: EventHandler):
+        self._handler = handler
+        await handler({"event": STREAM_POSITION, "epoch": self.epoch, "seq": self.seq})
+
+    async def publish(self, event: Dict, sequenced: bool = False):
+        if sequenced:
+            self.seq += 1
+            event = {**event, "epoch": self.epoch, "seq": self.seq}
+        if self._handler is not None:
+            await self._handler(event)
+
+    async def stop(self):
+        self._handler = None
+
+class RedisBus:
+    """
+    Redis pub/sub bus shared by all workers (and hosts) using the same channel
+
+    Starting never fails on an unreachable Redis: the listener keeps retrying
+    in the background with backoff, logging each failure. Until it is
+    connected, publish raises and the managers deliver to local clients only.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, channel: str, reconnect_seconds: float = 1.0,
+                 max_reconnect_seconds: float = 30.0, connect_timeout: float = 5.0):
+        self.url = url
+        self.channel = channel
+        self.connect_timeout = connect_timeout
+        self.reconnect_seconds = reconnect_seconds
+        self.max_reconnect_seconds = max_reconnect_seconds
+        self.connected = False
+        self._epoch_key = f"{channel}:epoch"
+        self._seq_key = f"{channel}:seq"
+        self._redis = None
+        self._sequenced_publish = None
+        self._handler: Optional[EventHandler] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self, handler: EventHandler):
+        import redis.asyncio as aioredis
+
+        self._handler = handler
+        self._redis = aioredis.from_url(self.url, socket_connect_timeout=self.connect_timeout)
+        self._sequenced_publish = self._redis.register_script(SEQUENCED_PUBLISH)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def publish(self, event: Dict, sequenced: bool = False):
+        if not self.connected:
+            raise ConnectionError(f"Realtime bus is not connected to {self.url}")
+        if sequenced:
+            await self._sequenced_publish(
+                keys=[self._epoch_key, self._seq_key],
+                args=[self.channel, new_epoch(), json.dumps(event)]
+            )
+        else:
+            await self._redis.publish(self.channel, json.dumps(event))
+
+    @staticmethod
+    def _decode(data) -> Dict:
+        """Plain events are JSON objects; sequenced ones arrive as <epoch> <seq> <json>"""
+        if isinstance(data, str):
+            data = data.encode()
+        if data[:1] == b"{":
+            return json.loads(data)
+        epoch, seq, payload = data.split(b" ", 2)
+        event = json.loads(payload)
+        event["epoch"] = epoch.decode()
+        event["seq"] = int(seq)
+        return event
+
+    async def _position(self) -> Optional[Dict]:
+        epoch, seq = await self._redis.mget(self._epoch_key, self._seq_key)
+        if epoch is None:
+            return None
+        return {"event": STREAM_POSITION, "epoch": epoch.decode(), "seq": int(seq or 0)}
+
+    async def _listen(self):
+        delay = self.reconnect_seconds
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                # Read before subscribing: an event published in between shows up
+                # as a gap after this position rather than being mistaken for old
+                position = await self._position()
+                await pubsub.subscribe(self.channel)
+                if position is not None:
+                    await self._handler(position)
+                if not self.connected:
+                    logger.info("Realtime bus connected to %s (channel %s)", self.url, self.channel)
+                self.connected = True
+                delay = self.reconnect_seconds
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    try:
+                        await self._handler(self._decode(message["data"]))
+                    except Exception:
+                        logger.exception("Realtime bus handler error")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Events published while disconnected are lost (pub/sub has no
+                # history); the seq gap after reconnecting tells subscribers so
+                self.connected = False
+                logger.error(
+                    "Realtime bus: Redis at %s unavailable (%s), broadcasts stay on this worker; retrying in %.0fs",
+                    self.url, e, delay
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_seconds)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            self._listener = None
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+        self.connected = False
+
+async def create_bus(handler: EventHandler, kind: str, redis_url: str, channel: str):
+    """
+    Start a bus of the given kind ("redis" or "memory"). A Redis bus starts
+    even when Redis is down and connects once it is reachable.
+    """
+    bus = RedisBus(redis_url, channel) if kind == "redis" else InProcessBus()
+    await bus.start(handler)
+    return bus
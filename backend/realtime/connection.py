@@ -0,0 +1,217 @@
+"""
+Per-client outbound queues for WebSocket broadcasting
+Broadcasts enqueue without awaiting the network; each connection has its own
+writer task, so a slow client only delays itself.
+"""
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Union
+
+from fastapi import WebSocket
+
+# Slow-consumer policies applied when a client's queue is full
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (DROP_OLDEST, COALESCE, DISCONNECT)
+
+class BroadcastMetrics:
+    """Fan-out and delivery timings shared by all connections of a manager"""
+
+    def __init__(self, sample_size: int = 2048):
+        self.broadcasts = 0
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.slow_disconnects = 0
+        self.fanout_seconds_max = 0.0
+        self._fanout_samples: Deque[float] = deque(maxlen=sample_size)
+        self._delivery_samples: Deque[float] = deque(maxlen=sample_size)
+
+    def record_fanout(self, recipients: int, seconds: float):
+        self.broadcasts += 1
+        self.enqueued += recipients
+        self.fanout_seconds_max = max(self.fanout_seconds_max, seconds)
+        self._fanout_samples.append(seconds)
+
+    def record_delivery(self, seconds: float):
+        self.sent += 1
+        self._delivery_samples.append(seconds)
+
+    @staticmethod
+    def _percentiles(samples) -> Dict[str, float]:
+        if not samples:
+            return {"p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(samples)
+        last = len(ordered) - 1
+        return {
+            "p50_ms": round(ordered[int(last * 0.5)] * 1000, 3),
+            "p99_ms": round(ordered[int(last * 0.99)] * 1000, 3),
+            "max_ms": round(ordered[last] * 1000, 3)
+        }
+
+    def snapshot(self) -> Dict:
+        return {
+            "broadcasts": self.broadcasts,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "slow_disconnects": self.slow_disconnects,
+            "fanout": self._percentiles(self._fanout_samples),
+            "delivery": self._percentiles(self._delivery_samples)
+        }
+
+class ClientConnection:
+    """A WebSocket with a bounded outbound queue drained by its own writer task"""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        metrics: BroadcastMetrics,
+        on_close: Callable[[], None],
+        max_queue: int = 256,
+        policy: str = DROP_OLDEST,
+        send_timeout: float = 5.0
+    ):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+
+        self.websocket = websocket
+        self.metrics = metrics
+        self.on_close = on_close
+        self.max_queue = max_queue
+        self.policy = policy
+        self.send_timeout = send_timeout
+        self.encoding = "json"  # Event frame encoding negotiated on connect
+        self.closed = False
+
+        # Entries are [coalesce_key, payload, enqueued_at, seq, superseded seqs];
+        # urgent messages (alerts) bypass the bound and the drop policy
+        self._queue: Deque[List] = deque()
+        self._urgent: Deque[List] = deque()
+        self._by_key: Dict[str, List] = {}
+        # Coalesced entries left in the queue with their payload cleared
+        self._stale = 0
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._drain())
+
+    def enqueue(
+        self,
+        payload: Union[str, bytes],
+        key: Optional[str] = None,
+        urgent: bool = False,
+        seq: Optional[int] = None
+    ) -> bool:
+        """
+        Queue a serialized message without blocking (str goes out as a text
+        frame, bytes as binary); False if it was not accepted.
+
+        `key` marks a frame carrying the full state of something (a zone),
+        which a newer full state may replace under the coalesce policy.
+        Partial updates must not have a key.
+        """
+        if self.closed:
+            return False
+
+        now = time.perf_counter()
+
+        if urgent:
+            self._urgent.append([None, payload, now, seq, None])
+            self._wakeup.set()
+            return True
+
+        # Coalescing: a newer full state for the same key replaces the queued
+        # one. It goes to the back of the queue, after any update queued in
+        # between, and the client is told which seqs it stands in for.
+        superseded = None
+        if self.policy == COALESCE and key is not None:
+            queued = self._by_key.pop(key, None)
+            if queued is not None:
+                superseded = (queued[4] or []) + ([queued[3]] if queued[3] is not None else [])
+                queued[1] = None
+                self._stale += 1
+                self.metrics.coalesced += 1
+
+        if superseded is None and len(self._queue) - self._stale >= self.max_queue:
+            if self.policy == DISCONNECT:
+                self.metrics.slow_disconnects += 1
+                self.close(reason="slow consumer")
+                return False
+            self._pop()
+            self.metrics.dropped += 1
+
+        entry = [key, payload, now, seq, superseded]
+        self._queue.append(entry)
+        if self.policy == COALESCE and key is not None:
+            self._by_key[key] = entry
+        self._wakeup.set()
+        return True
+
+    def _pop(self) -> Optional[List]:
+        """Oldest live entry of the bounded queue, skipping coalesced ones"""
+        while self._queue:
+            entry = self._queue.popleft()
+            if entry[1] is None:
+                self._stale -= 1
+                continue
+            if entry[0] is not None and self._by_key.get(entry[0]) is entry:
+                del self._by_key[entry[0]]
+            return entry
+        return None
+
+    def _next(self) -> Optional[List]:
+        if self._urgent:
+            return self._urgent.popleft()
+        return self._pop()
+
+    async def _drain(self):
+        try:
+            while not self.closed:
+                entry = self._next()
+                if entry is None:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                if entry[4]:
+                    # Seqs the client will never see; their state is in this frame
+                    notice = json.dumps({"type": "superseded", "seqs": entry[4]})
+                    await asyncio.wait_for(self.websocket.send_text(notice), timeout=self.send_timeout)
+                payload = entry[1]
+                send = self.websocket.send_bytes(payload) if isinstance(payload, bytes) else self.websocket.send_text(payload)
+                await asyncio.wait_for(send, timeout=self.send_timeout)
+                self.metrics.record_delivery(time.perf_counter() - entry[2])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Send failed or timed out: the client is gone or hopelessly slow
+            self.close(reason="send failed")
+
+    def pending(self) -> int:
+        return len(self._queue) - self._stale + len(self._urgent)
+
+    def close(self, reason: str = ""):
+        """Stop the writer, close the socket and notify the manager (idempotent)"""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._urgent.clear()
+        self._by_key.clear()
+        self._stale = 0
+
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        if reason:
+            asyncio.create_task(self._close_socket())
+        self.on_close()
+
+    async def _close_socket(self):
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
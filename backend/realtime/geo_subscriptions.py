@@ -0,0 +1,186 @@
+"""
+Spatial subscription index for WebSocket clients
+Clients register bounding boxes and/or geohashes (plus optional hazard-type
+filters); events are routed only to the subscribers whose areas they touch.
+"""
+import math
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Set, Tuple
+
+# (min_lon, min_lat, max_lon, max_lat)
+BBox = Tuple[float, float, float, float]
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+_GEOHASH_DECODE = {char: i for i, char in enumerate(GEOHASH_ALPHABET)}
+
+def geohash_bbox(geohash: str) -> BBox:
+    """Bounding box covered by a geohash cell"""
+    lon_range = [-180.0, 180.0]
+    lat_range = [-90.0, 90.0]
+    even = True
+
+    for char in geohash.lower():
+        if char not in _GEOHASH_DECODE:
+            raise ValueError(f"Invalid geohash: {geohash}")
+        bits = _GEOHASH_DECODE[char]
+        for shift in range(4, -1, -1):
+            target = lon_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bits >> shift & 1:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+
+    return (lon_range[0], lat_range[0], lon_range[1], lat_range[1])
+
+def geohash_cell(lat: float, lon: float, precision: int) -> Tuple[int, int]:
+    """(lat index, lon index) of the geohash cell containing a point"""
+    bits = 5 * precision
+    lat_cells, lon_cells = 1 << (bits // 2), 1 << ((bits + 1) // 2)
+    lat_index = min(lat_cells - 1, max(0, int((lat + 90.0) / 180.0 * lat_cells)))
+    lon_index = min(lon_cells - 1, max(0, int((lon + 180.0) / 360.0 * lon_cells)))
+    return lat_index, lon_index
+
+def geohash_from_cell(lat_index: int, lon_index: int, precision: int) -> str:
+    """Geohash of a cell given as (lat index, lon index); the bits interleave starting with longitude"""
+    bits = 5 * precision
+    lat_bits, lon_bits = bits // 2, (bits + 1) // 2
+    code = 0
+    for i in range(bits):
+        if i % 2 == 0:
+            bit = lon_index >> (lon_bits - 1 - i // 2) & 1
+        else:
+            bit = lat_index >> (lat_bits - 1 - i // 2) & 1
+        code = code << 1 | bit
+    return "".join(GEOHASH_ALPHABET[code >> shift & 31] for shift in range(bits - 5, -1, -5))
+
+def geohash_encode(lat: float, lon: float, precision: int = 5) -> str:
+    return geohash_from_cell(*geohash_cell(lat, lon, precision), precision)
+
+def parse_bbox(value: Sequence[float]) -> BBox:
+    """Validate a [min_lon, min_lat, max_lon, max_lat] list"""
+    if len(value) != 4:
+        raise ValueError("bbox must be [min_lon, min_lat, max_lon, max_lat]")
+    min_lon, min_lat, max_lon, max_lat = (float(v) for v in value)
+    if not (-180 <= min_lon <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise ValueError(f"Invalid bbox: {value}")
+    return (min_lon, min_lat, max_lon, max_lat)
+
+def point_bbox(lat: float, lon: float) -> BBox:
+    return (lon, lat, lon, lat)
+
+def radius_bbox(lat: float, lon: float, radius_km: float) -> BBox:
+    """Approximate bbox of a circle, used to route zone events"""
+    dlat = radius_km / 111.0
+    dlon = radius_km / (111.0 * max(math.cos(math.radians(lat)), 0.01))
+    return (max(lon - dlon, -180.0), max(lat - dlat, -90.0),
+            min(lon + dlon, 180.0), min(lat + dlat, 90.0))
+
+def _intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+class Subscription:
+    """Areas and hazard types a client wants events for"""
+
+    def __init__(self, areas: List[BBox], hazard_types: Optional[Iterable[str]] = None):
+        self.areas = areas
+        self.hazard_types: Optional[Set[str]] = set(hazard_types) if hazard_types else None
+
+    @classmethod
+    def from_message(cls, message: Dict) -> "Subscription":
+        """
+        Build from a client `subscribe` message:
+        {"action": "subscribe", "bbox": [...], "geohashes": [...], "hazard_types": [...]}
+        """
+        areas = []
+        if message.get("bbox"):
+            areas.append(parse_bbox(message["bbox"]))
+        for geohash in message.get("geohashes") or ():
+            areas.append(geohash_bbox(geohash))
+        if not areas:
+            raise ValueError("subscribe needs a bbox or at least one geohash")
+        return cls(areas, message.get("hazard_types"))
+
+    def matches(self, bbox: BBox, hazard_types: Optional[Iterable[str]] = None) -> bool:
+        if self.hazard_types is not None and hazard_types is not None:
+            if self.hazard_types.isdisjoint(hazard_types):
+                return False
+        return any(_intersects(area, bbox) for area in self.areas)
+
+class SubscriptionIndex:
+    """
+    Uniform lat/lon grid mapping cells to subscriber keys. An event looks up
+    only the cells its bbox covers, then checks the exact areas and filters
+    of those candidates.
+    """
+
+    def __init__(self, cell_degrees: float = 1.0, max_cells: int = 4096):
+        self.cell_degrees = cell_degrees
+        self.max_cells = max_cells
+        self._subscriptions: Dict[Hashable, Subscription] = {}
+        self._cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self._cells_by_key: Dict[Hashable, Set[Tuple[int, int]]] = {}
+        # Areas too large to enumerate cells for; checked on every event
+        self._wide: Set[Hashable] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._subscriptions
+
+    def keys(self) -> List[Hashable]:
+        return list(self._subscriptions)
+
+    def _cell_range(self, bbox: BBox) -> Tuple[range, range]:
+        size = self.cell_degrees
+        xs = range(math.floor(bbox[0] / size), math.floor(bbox[2] / size) + 1)
+        ys = range(math.floor(bbox[1] / size), math.floor(bbox[3] / size) + 1)
+        return xs, ys
+
+    def subscribe(self, key: Hashable, subscription: Subscription):
+        """Register (or replace) the subscription of `key`"""
+        self.unsubscribe(key)
+        self._subscriptions[key] = subscription
+
+        cells = set()
+        for area in subscription.areas:
+            xs, ys = self._cell_range(area)
+            if len(xs) * len(ys) > self.max_cells:
+                self._wide.add(key)
+                continue
+            cells.update((x, y) for x in xs for y in ys)
+
+        for cell in cells:
+            self._cells.setdefault(cell, set()).add(key)
+        self._cells_by_key[key] = cells
+
+    def unsubscribe(self, key: Hashable):
+        if self._subscriptions.pop(key, None) is None:
+            return
+        self._wide.discard(key)
+        for cell in self._cells_by_key.pop(key, ()):
+            members = self._cells.get(cell)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._cells[cell]
+
+    def match(self, bbox: BBox, hazard_types: Optional[Iterable[str]] = None) -> Set[Hashable]:
+        """Subscriber keys whose areas intersect `bbox` and whose filters accept the event"""
+        hazard_types = set(hazard_types) if hazard_types else None
+        xs, ys = self._cell_range(bbox)
+
+        if len(xs) * len(ys) > len(self._cells):
+            candidates = {key for members in self._cells.values() for key in members}
+        else:
+            candidates = set()
+            for x in xs:
+                for y in ys:
+                    candidates.update(self._cells.get((x, y), ()))
+        candidates.update(self._wide)
+
+        return {
+            key for key in candidates
+            if self._subscriptions[key].matches(bbox, hazard_types)
+        }
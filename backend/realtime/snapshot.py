@@ -0,0 +1,122 @@
+"""
+Last-known realtime state kept in memory for connecting clients
+Active zones, recent high-priority reports and active alerts, updated from
+the same events that are broadcast, so a (re)connecting dashboard gets the
+full picture in its first message instead of rebuilding it over REST.
+"""
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+HIGH_PRIORITY = {"high", "critical"}
+CLOSED_ALERT_STATUSES = {"resolved", "cancelled", "expired", "closed"}
+
+def _is_high_priority(report: Dict) -> bool:
+    level = report.get("severity") or report.get("threat_level") or report.get("priority")
+    return str(level).lower() in HIGH_PRIORITY
+
+class RealtimeSnapshot:
+    """
+    Incrementally updated state with a version counter. The serialized
+    snapshot is cached per version, so a reconnect storm serializes it once.
+    """
+
+    def __init__(self, report_window_hours: int = 6, alert_window_hours: int = 24, max_reports: int = 200):
+        self.report_window_seconds = report_window_hours * 3600
+        self.alert_window_seconds = alert_window_hours * 3600
+        self.max_reports = max_reports
+        self.version = 0
+        self.zones: Dict[Any, Dict] = {}
+        # id -> (received_at, report); insertion order is arrival order
+        self.reports: "OrderedDict[Any, tuple]" = OrderedDict()
+        self.alerts: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._encoded: Optional[tuple] = None
+
+    def load(self, zones: Iterable[Dict], reports: Iterable[Tuple[float, Dict]],
+             alerts: Iterable[Tuple[float, Dict]]):
+        """
+        Set the initial state (once per process, before events are applied):
+        zone dicts, and (timestamp, data) pairs of reports and alerts, oldest first
+        """
+        for zone in zones:
+            self.zones[zone["zone_id"]] = zone
+        for received_at, report in reports:
+            self.reports[report.get("id")] = (received_at, report)
+        while len(self.reports) > self.max_reports:
+            self.reports.popitem(last=False)
+        for received_at, alert in alerts:
+            self.alerts[alert.get("id", alert.get("alert_id"))] = (received_at, alert)
+        self.version += 1
+
+    def apply(self, message_type: str, data: Dict) -> bool:
+        """Fold a broadcast message into the snapshot; True if it changed state"""
+        now = time.time()
+
+        if message_type == "new_report":
+            if not _is_high_priority(data):
+                return False
+            self.reports[data.get("id")] = (now, data)
+            self.reports.move_to_end(data.get("id"))
+            while len(self.reports) > self.max_reports:
+                self.reports.popitem(last=False)
+        elif message_type in ("new_zone", "zone_created", "zone_updated"):
+            zone_id = data.get("zone_id")
+            self.zones[zone_id] = {**self.zones.get(zone_id, {}), **data}
+        elif message_type == "zone_deactivated":
+            if self.zones.pop(data.get("zone_id"), None) is None:
+                return False
+        elif message_type in ("alert_issued", "emergency_alert"):
+            alert_id = data.get("id", data.get("alert_id"))
+            self.alerts[alert_id] = (now, data)
+        elif message_type == "alert_status_update":
+            alert_id = data.get("alert_id")
+            if str(data.get("new_status")).lower() in CLOSED_ALERT_STATUSES:
+                if self.alerts.pop(alert_id, None) is None:
+                    return False
+            elif alert_id in self.alerts:
+                received_at, alert = self.alerts[alert_id]
+                self.alerts[alert_id] = (received_at, {**alert, "status": data.get("new_status")})
+            else:
+                return False
+        else:
+            return False
+
+        self.version += 1
+        return True
+
+    def _expire(self):
+        """Drop reports and alerts that aged out of their windows"""
+        now = time.time()
+        expired = False
+        for entries, window in ((self.reports, self.report_window_seconds), (self.alerts, self.alert_window_seconds)):
+            while entries:
+                received_at, _ = next(iter(entries.values()))
+                if now - received_at <= window:
+                    break
+                entries.popitem(last=False)
+                expired = True
+        if expired:
+            self.version += 1
+
+    def message(self, **stream) -> Dict:
+        """The snapshot message; `stream` adds fields such as epoch and seq"""
+        self._expire()
+        return {
+            "type": "snapshot",
+            "version": self.version,
+            **stream,
+            "data": {
+                "zones": list(self.zones.values()),
+                "reports": [report for _, report in self.reports.values()],
+                "alerts": [alert for _, alert in self.alerts.values()]
+            }
+        }
+
+    def encoded(self, **stream) -> str:
+        """JSON of message(**stream), reused until the version or stream position moves"""
+        self._expire()
+        key = (self.version, tuple(sorted(stream.items())))
+        if self._encoded is None or self._encoded[0] != key:
+            self._encoded = (key, json.dumps(self.message(**stream), default=str))
+        return self._encoded[1]
@@ -2,10 +2,13 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import List, Dict, Any, Optional
 from ml.model_manager import ModelManager
+from api.ml.predict_escalation import router as escalation_router
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
+# Escalation prediction, batch scoring, outcomes and the precomputed risk grid
+router.include_router(escalation_router)
 
 # Dependency to get model manager
 async def get_model_manager():
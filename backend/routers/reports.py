@@ -4,12 +4,13 @@ from typing import List, Optional, Dict
 import logging
 from datetime import datetime
 
-from ..core.database import get_db
+from ..core.database import get_db, database
 from ..models.schemas import ReportCreate, ReportOut, ReportUpdate
 from ..ml.advanced_classifiers import HazardClassifier, ThreatScorer
 from ..services.clustering_service import HotspotDetector
 from ..mock_data.data_generator import MockDataGenerator
 from ..core.websocket_manager import websocket_manager
+from ..ml.activity_index import RecentActivityIndex
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/reports", tags=["reports"])
@@ -18,6 +19,38 @@ router = APIRouter(prefix="/reports", tags=["reports"])
 hazard_classifier = HazardClassifier()
 threat_scorer = ThreatScorer()
 
+# This worker's index of recent reports, fed from every worker's new_report broadcasts
+activity_index = RecentActivityIndex()
+
+def _index_report(data: Dict):
+    activity_index.add_report(data.get('latitude'), data.get('longitude'), data.get('created_at'))
+
+websocket_manager.add_listener('new_report', _index_report)
+
+# Running trust aggregates the trust engine persists for the reporter
+REPORTER_TRUST_QUERY = """
+    SELECT COALESCE((state -> 'counts' ->> 'verified_correct')::int, 0) AS correct,
+           COALESCE((state -> 'counts' ->> 'verified_correct')::int, 0)
+           + COALESCE((state -> 'counts' ->> 'verified_incorrect')::int, 0)
+           + COALESCE((state -> 'counts' ->> 'false_alarm')::int, 0) AS judged,
+           (state ->> 'total')::int AS total
+    FROM user_trust_aggregates
+    WHERE user_id = :user_id
+"""
+
+async def _reporter_profile(user_id: Optional[str]) -> Dict:
+    """ThreatScorer reporter inputs; users without a trust history get the neutral defaults"""
+    if not user_id:
+        return {'verified': False, 'historical_accuracy': 0.7, 'total_reports': 1}
+    row = await database.fetch_one(REPORTER_TRUST_QUERY, {'user_id': str(user_id)})
+    if row is None or not row['total']:
+        return {'verified': False, 'historical_accuracy': 0.7, 'total_reports': 1}
+    return {
+        'verified': False,
+        'historical_accuracy': row['correct'] / row['judged'] if row['judged'] else 0.7,
+        'total_reports': row['total']
+    }
+
 @router.post("/", response_model=Dict)
 async def create_report(
     report: ReportCreate,
@@ -29,11 +62,21 @@ async def create_report(
         # Perform ML analysis
         text_analysis = hazard_classifier.classify_hazard(report.text)
         
+        # Reporter profile from the persisted trust aggregates (no history scan)
+        reporter = await _reporter_profile(getattr(report, 'user_id', None))
+        
+        # Recent reports and social posts around the report, from the in-memory index
+        activity = activity_index.corroboration_features(report.latitude, report.longitude)
+        
         # Calculate threat score
         report_data = {
             'text_classification': text_analysis,
-            'location_analysis': {'nearby_reports': 0},  # TODO: Implement
-            'reporter': {'verified': False, 'historical_accuracy': 0.7, 'total_reports': 1},
+            'social_correlation': {
+                'nearby_posts': activity['nearby_posts'],
+                'threat_score': activity['social_corroboration'] * 10.0
+            },
+            'location_analysis': {'nearby_reports': activity['nearby_reports']},
+            'reporter': reporter,
             'temporal_analysis': {'risk_multiplier': 1.0}
         }
         
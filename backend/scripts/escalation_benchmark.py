@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Escalation model inference benchmark
+
+Compares the sklearn estimators (scaler.transform + predict_proba +
+zone_predictor.predict) with their compiled NumPy form for single-row and
+batched calls, and checks that both give the same answers:
+
+    python scripts/escalation_benchmark.py
+    python scripts/escalation_benchmark.py --batch-sizes 1 16 256 --repeats 500 --output bench.json
+
+Models are loaded from models/ (trained on synthetic data if none exist yet).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+def sample_features(rng: np.random.Generator, rows: int) -> np.ndarray:
+    """Feature rows drawn like the synthetic training data"""
+    return np.column_stack([
+        rng.exponential(5, rows),
+        rng.gamma(2, 2, rows),
+        rng.beta(2, 5, rows),
+        rng.gamma(2, 1.5, rows),
+        rng.gamma(3, 2, rows),
+        rng.normal(1013, 10, rows),
+        rng.poisson(3, rows),
+        rng.integers(0, 24, rows),
+        rng.integers(0, 7, rows)
+    ]).astype(float)
+
+def time_calls(fn, features: np.ndarray, repeats: int) -> dict:
+    fn(features)  # warm-up
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn(features)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "p50_ms": round(statistics.median(timings), 4),
+        "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 4),
+        "per_row_us": round(statistics.median(timings) * 1000 / features.shape[0], 2)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Escalation model inference benchmark")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    from ml.compiled_trees import compile_escalation_model
+    from ml.predictive_escalation import escalation_model
+
+    asyncio.run(escalation_model.initialize())
+    compiled = compile_escalation_model(
+        escalation_model.escalation_model, escalation_model.zone_predictor, escalation_model.scaler
+    )
+    if compiled is None:
+        print("Current estimators have no compiled form")
+        sys.exit(1)
+
+    def sklearn_score(features):
+        scaled = escalation_model.scaler.transform(features)
+        return (escalation_model.escalation_model.predict_proba(scaled)[:, 1],
+                np.maximum(1, escalation_model.zone_predictor.predict(scaled)))
+
+    rng = np.random.default_rng(args.seed)
+    results = []
+    print(f"{'batch':>7}{'sklearn p50 ms':>16}{'compiled p50 ms':>17}{'speed-up':>10}{'max |diff|':>12}")
+    for batch_size in args.batch_sizes:
+        features = sample_features(rng, batch_size)
+        expected_prob, expected_zone = sklearn_score(features)
+        actual_prob, actual_zone = compiled.score(features)
+        max_diff = float(max(np.abs(expected_prob - actual_prob).max(), np.abs(expected_zone - actual_zone).max()))
+
+        reference = time_calls(sklearn_score, features, args.repeats)
+        fast = time_calls(compiled.score, features, args.repeats)
+        speedup = reference["p50_ms"] / fast["p50_ms"] if fast["p50_ms"] else 0.0
+        print(f"{batch_size:>7}{reference['p50_ms']:>16}{fast['p50_ms']:>17}{speedup:>9.1f}x{max_diff:>12.2e}")
+        results.append({
+            "batch_size": batch_size,
+            "sklearn": reference,
+            "compiled": fast,
+            "speedup": round(speedup, 1),
+            "max_abs_diff": max_diff
+        })
+
+    if args.output:
+        report = {
+            "model_version": escalation_model.model_version,
+            "python": sys.version.split()[0],
+            "cpu_count": os.cpu_count(),
+            "results": results
+        }
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+WebSocket fan-out load test and latency benchmark
+
+Runs N simulated clients against the WebSocket manager in-process (no
+server, database or Redis needed), fires a mix of report/zone/alert events
+and reports delivery latency percentiles, throughput and memory per
+connection. Results can be written as JSON and compared with a previous run:
+
+    python scripts/ws_benchmark.py --clients 5000 --events 2000 --output bench.json
+    python scripts/ws_benchmark.py --clients 5000 --events 2000 --compare bench.json
+
+With --url the same clients connect to a running server instead and
+latency is measured for reports POSTed to its API.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add backend to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+# Roughly the Indian coastline, where reports come from
+REGION = (68.0, 6.0, 90.0, 24.0)
+HAZARD_TYPES = ["flood", "tsunami", "storm_surge", "high_waves", "oil_spill"]
+
+class LatencyRecorder:
+    """Collects per-delivery latencies and frame counts for all clients"""
+
+    def __init__(self):
+        self.latencies = []
+        self.frames = 0
+        self.deliveries = 0
+        self.last_delivery = 0.0
+
+    def record_frame(self, frame, received_at: float):
+        self.frames += 1
+        events = frame.get("events", [frame]) if frame.get("type") == "batch" else [frame]
+        for event in events:
+            sent_at = (event.get("data") or {}).get("sent_at")
+            if sent_at is not None:
+                self.latencies.append(received_at - sent_at)
+                self.deliveries += 1
+                self.last_delivery = received_at
+
+    def percentiles(self):
+        if not self.latencies:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0, "mean_ms": 0.0}
+        ordered = sorted(self.latencies)
+        last = len(ordered) - 1
+        return {
+            "p50_ms": round(ordered[int(last * 0.50)] * 1000, 3),
+            "p95_ms": round(ordered[int(last * 0.95)] * 1000, 3),
+            "p99_ms": round(ordered[int(last * 0.99)] * 1000, 3),
+            "max_ms": round(ordered[last] * 1000, 3),
+            "mean_ms": round(statistics.fmean(ordered) * 1000, 3)
+        }
+
+class SimulatedWebSocket:
+    """Stands in for starlette's WebSocket; decodes frames as a client would"""
+
+    def __init__(self, recorder: LatencyRecorder, send_delay: float = 0.0, encoding: str = "json"):
+        self.recorder = recorder
+        self.send_delay = send_delay
+        self.query_params = {"encoding": encoding}
+
+    async def accept(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def send_text(self, payload: str):
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        try:
+            frame = json.loads(payload)
+        except ValueError:
+            return
+        if isinstance(frame, dict):
+            self.recorder.record_frame(frame, time.perf_counter())
+
+    async def send_bytes(self, payload: bytes):
+        import msgpack
+
+        if self.send_delay:
+            await asyncio.sleep(self.send_delay)
+        self.recorder.record_frame(msgpack.unpackb(payload, raw=False), time.perf_counter())
+
+def random_viewport(rng: random.Random, size_deg: float):
+    min_lon = rng.uniform(REGION[0], REGION[2] - size_deg)
+    min_lat = rng.uniform(REGION[1], REGION[3] - size_deg)
+    return [min_lon, min_lat, min_lon + size_deg, min_lat + size_deg]
+
+def random_point(rng: random.Random):
+    return rng.uniform(REGION[1], REGION[3]), rng.uniform(REGION[0], REGION[2])
+
+def room_for(lat: float, lon: float, size_deg: float) -> str:
+    return f"cell:{int(lon // size_deg)}:{int(lat // size_deg)}"
+
+def event_schedule(args, rng: random.Random):
+    """The event mix: mostly reports, some zone runs, a few alerts"""
+    for i in range(args.events):
+        roll = rng.random()
+        lat, lon = random_point(rng)
+        if roll < args.alert_fraction:
+            yield "alert", {"id": i, "message": "benchmark alert", "lat": lat, "lon": lon, "radius_km": 20}
+        elif roll < args.alert_fraction + args.zone_fraction:
+            yield "zones", {"created": [{
+                "zone_id": i,
+                "type": "red",
+                "confidence": rng.random(),
+                "report_count": rng.randint(3, 40),
+                "radius_km": 2.0,
+                "bbox": [lon - 0.02, lat - 0.02, lon + 0.02, lat + 0.02],
+                "hazard_types": [rng.choice(HAZARD_TYPES)]
+            }], "updated": [], "deactivated": []}
+        else:
+            yield "report", {
+                "id": i,
+                "hazard_type": rng.choice(HAZARD_TYPES),
+                "lat": lat,
+                "lon": lon,
+                "severity": rng.choice(["low", "medium", "high"])
+            }
+
+def stamp(kind: str, data: dict) -> dict:
+    """Attach the send time the clients measure latency against"""
+    now = time.perf_counter()
+    if kind == "zones":
+        for zone in data["created"]:
+            zone["sent_at"] = now
+        return data
+    return {**data, "sent_at": now}
+
+async def fire_events(args, rng: random.Random, publish):
+    interval = 1.0 / args.rate if args.rate else 0.0
+    started = time.perf_counter()
+    for i, (kind, data) in enumerate(event_schedule(args, rng)):
+        if interval:
+            delay = started + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await publish(kind, stamp(kind, data))
+        if not interval and i % 100 == 0:
+            await asyncio.sleep(0)  # let writer tasks run between bursts
+    return time.perf_counter() - started
+
+async def drain(manager, timeout: float):
+    """Wait until every client queue and the pending batch are empty"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        pending = sum(connection.pending() for connection in manager.active_connections.values())
+        if not pending and not getattr(manager, "_pending", None):
+            await asyncio.sleep(0.05)
+            return True
+        await asyncio.sleep(0.01)
+    return False
+
+async def run_in_process(args) -> dict:
+    rng = random.Random(args.seed)
+    recorder = LatencyRecorder()
+    send_delay = args.send_delay_ms / 1000
+
+    if args.manager == "app":
+        from app.config import settings
+        settings.realtime_bus = "memory"
+        settings.websocket_batch_window_ms = args.batch_window_ms
+        from app.websocket_manager import WebSocketManager
+        manager = WebSocketManager()
+    else:
+        from core.websocket_manager import WebSocketManager
+        manager = WebSocketManager()
+
+    gc.collect()
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    connect_started = time.perf_counter()
+
+    for i in range(args.clients):
+        websocket = SimulatedWebSocket(recorder, send_delay, args.encoding)
+        subscribed = rng.random() < args.subscribed_fraction
+        viewport = random_viewport(rng, args.viewport_deg)
+        if args.manager == "app":
+            await manager.connect(websocket)
+            if subscribed:
+                await manager.handle_client_message(websocket, json.dumps({"action": "subscribe", "bbox": viewport}))
+        else:
+            client_id = f"bench-{i}"
+            await manager.connect(websocket, client_id)
+            if subscribed:
+                await manager.join_room(client_id, room_for(viewport[1], viewport[0], args.viewport_deg))
+
+    connect_seconds = time.perf_counter() - connect_started
+    await drain(manager, args.drain_timeout)
+    memory_per_connection = (tracemalloc.get_traced_memory()[0] - memory_before) / max(args.clients, 1)
+    tracemalloc.stop()
+
+    # Snapshot/ack frames carry no send time; only event deliveries count
+    recorder.frames = 0
+
+    async def publish(kind, data):
+        if args.manager == "app":
+            if kind == "alert":
+                await manager.broadcast_alert_issued(data)
+            elif kind == "zones":
+                await manager.broadcast_zone_changes(data)
+            else:
+                await manager.broadcast_new_report(data)
+        else:
+            message = {"type": {"alert": "emergency_alert", "zones": "zones_updated", "report": "new_report"}[kind], "data": data}
+            if kind == "alert":
+                await manager.broadcast_to_all(message, urgent=True)
+            else:
+                point = data["created"][0] if kind == "zones" else data
+                lat = point.get("lat", (point.get("bbox") or [0, 0])[1])
+                lon = point.get("lon", (point.get("bbox") or [0, 0])[0])
+                await manager.broadcast_to_room(room_for(lat, lon, args.viewport_deg), message)
+
+    fire_started = time.perf_counter()
+    fire_seconds = await fire_events(args, rng, publish)
+    drained = await drain(manager, args.drain_timeout)
+    total_seconds = (recorder.last_delivery if recorder.deliveries else time.perf_counter()) - fire_started
+
+    metrics = manager.get_metrics() if hasattr(manager, "get_metrics") else manager.metrics.snapshot()
+    return {
+        "connect_seconds": round(connect_seconds, 3),
+        "fire_seconds": round(fire_seconds, 3),
+        "drained": drained,
+        "deliveries": recorder.deliveries,
+        "frames": recorder.frames,
+        "events_per_frame": round(recorder.deliveries / recorder.frames, 3) if recorder.frames else 0.0,
+        "deliveries_per_second": round(recorder.deliveries / total_seconds, 1) if total_seconds > 0 else 0.0,
+        "memory_per_connection_bytes": int(memory_per_connection),
+        "latency": recorder.percentiles(),
+        "dropped": metrics.get("dropped", 0),
+        "slow_disconnects": metrics.get("slow_disconnects", 0),
+        "fanout": metrics.get("fanout")
+    }
+
+async def run_live(args) -> dict:
+    """Real sockets against a running server; reports are POSTed to trigger events"""
+    import httpx
+    import websockets
+
+    rng = random.Random(args.seed)
+    recorder = LatencyRecorder()
+    sent_at = {}
+
+    async def client(ready: asyncio.Event):
+        async with websockets.connect(args.url, max_queue=None) as ws:
+            if rng.random() < args.subscribed_fraction:
+                await ws.send(json.dumps({"action": "subscribe", "bbox": random_viewport(rng, args.viewport_deg)}))
+            ready.set()
+            async for payload in ws:
+                received = time.perf_counter()
+                try:
+                    frame = json.loads(payload)
+                except ValueError:
+                    continue
+                events = frame.get("events", [frame]) if frame.get("type") == "batch" else [frame]
+                for event in events:
+                    report_id = (event.get("data") or {}).get("id")
+                    if event.get("type") == "new_report" and report_id in sent_at:
+                        recorder.latencies.append(received - sent_at[report_id])
+                        recorder.deliveries += 1
+                        recorder.last_delivery = received
+                recorder.frames += 1
+
+    readies = [asyncio.Event() for _ in range(args.clients)]
+    tasks = [asyncio.create_task(client(ready)) for ready in readies]
+    await asyncio.wait_for(asyncio.gather(*(ready.wait() for ready in readies)), timeout=args.drain_timeout)
+
+    fire_started = time.perf_counter()
+    async with httpx.AsyncClient(base_url=args.api, timeout=30) as http:
+        for i in range(args.events):
+            lat, lon = random_point(rng)
+            started = time.perf_counter()
+            response = await http.post("/api/reports/", json={
+                "source": "benchmark",
+                "hazard_type": rng.choice(HAZARD_TYPES),
+                "description": "ws benchmark",
+                "lat": lat,
+                "lon": lon,
+                "severity": "medium"
+            })
+            sent_at[response.json().get("id")] = started
+            if args.rate:
+                await asyncio.sleep(1.0 / args.rate)
+
+    await asyncio.sleep(min(args.drain_timeout, 5.0))
+    for task in tasks:
+        task.cancel()
+    total_seconds = (recorder.last_delivery or time.perf_counter()) - fire_started
+
+    return {
+        "deliveries": recorder.deliveries,
+        "frames": recorder.frames,
+        "deliveries_per_second": round(recorder.deliveries / total_seconds, 1) if total_seconds > 0 else 0.0,
+        "latency": recorder.percentiles()
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=backend_dir, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def compare(current: dict, baseline: dict, max_regression: float) -> bool:
+    """Print a side-by-side of the headline numbers; False if latency regressed too far"""
+    rows = [
+        ("latency p50 ms", ("latency", "p50_ms"), False),
+        ("latency p99 ms", ("latency", "p99_ms"), False),
+        ("latency max ms", ("latency", "max_ms"), False),
+        ("deliveries/s", ("deliveries_per_second",), True),
+        ("bytes/connection", ("memory_per_connection_bytes",), False),
+        ("events/frame", ("events_per_frame",), True)
+    ]
+    ok = True
+    print(f"\n{'metric':<20}{'baseline':>14}{'current':>14}{'change':>10}")
+    for label, path, higher_is_better in rows:
+        old, new = baseline["results"], current["results"]
+        for key in path:
+            old = old.get(key) if isinstance(old, dict) else None
+            new = new.get(key) if isinstance(new, dict) else None
+        if old is None or new is None:
+            continue
+        change = (new - old) / old if old else 0.0
+        print(f"{label:<20}{old:>14}{new:>14}{change:>+10.1%}")
+        if label == "latency p99 ms" and change > max_regression:
+            ok = False
+    print(f"\nbaseline {baseline.get('commit')} vs current {current.get('commit')}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket fan-out load test")
+    parser.add_argument("--manager", choices=["app", "core"], default="app",
+                        help="app: viewport subscriptions (/ws/realtime); core: rooms (/ws/{client_id})")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=0.0, help="Events per second, 0 for as fast as possible")
+    parser.add_argument("--viewport-deg", type=float, default=2.0, help="Side of each client's viewport")
+    parser.add_argument("--subscribed-fraction", type=float, default=1.0)
+    parser.add_argument("--zone-fraction", type=float, default=0.15)
+    parser.add_argument("--alert-fraction", type=float, default=0.05)
+    parser.add_argument("--batch-window-ms", type=int, default=50)
+    parser.add_argument("--encoding", choices=["json", "msgpack"], default="json")
+    parser.add_argument("--send-delay-ms", type=float, default=0.0, help="Simulated per-frame network delay")
+    parser.add_argument("--drain-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--url", help="Benchmark a running server, e.g. ws://localhost:8000/ws/realtime")
+    parser.add_argument("--api", default="http://localhost:8000", help="API base for --url mode")
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("--compare", help="Baseline JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2,
+                        help="Fail when p99 latency grows more than this fraction over the baseline")
+    args = parser.parse_args()
+
+    mode = "live" if args.url else "in-process"
+    print(f"Running {mode} WebSocket benchmark: {args.clients} clients, {args.events} events, manager={args.manager}")
+    results = asyncio.run(run_live(args) if args.url else run_in_process(args))
+
+    report = {
+        "commit": git_commit(),
+        "mode": mode,
+        "python": sys.version.split()[0],
+        "cpu_count": os.cpu_count(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results
+    }
+    print(json.dumps(report["results"], indent=2))
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+        print(f"Report written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if not compare(report, baseline, args.max_regression):
+            print(f"p99 latency regressed more than {args.max_regression:.0%}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Dict
+
+import numpy as np
+import shapely
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def _to_local_metric(lons: np.ndarray, lats: np.ndarray, lon0: float, lat0: float) -> np.ndarray:
+    """Project lon/lat to metres on a plane tangent at (lon0, lat0)"""
+    x = np.radians(lons - lon0) * EARTH_RADIUS_M * np.cos(np.radians(lat0))
+    y = np.radians(lats - lat0) * EARTH_RADIUS_M
+    return np.column_stack((x, y))
+
+
+def _from_local_metric(xy: np.ndarray, lon0: float, lat0: float) -> np.ndarray:
+    """Inverse of _to_local_metric, returns an (n, 2) lon/lat array"""
+    lats = lat0 + np.degrees(xy[:, 1] / EARTH_RADIUS_M)
+    lons = lon0 + np.degrees(xy[:, 0] / (EARTH_RADIUS_M * np.cos(np.radians(lat0))))
+    return np.column_stack((lons, lats))
+
+
+class ClusterPolygonBuilder:
+    """Builds buffered, simplified cluster hulls and caches them per cluster fingerprint"""
+
+    def __init__(self, max_vertices: int = 64, cache_size: int = 1024, coordinate_precision: int = 6):
+        self.max_vertices = max_vertices
+        self.cache_size = cache_size
+        self.coordinate_precision = coordinate_precision  # 6 decimals ≈ 0.1 m
+        self._cache: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def fingerprint(self, lons: np.ndarray, lats: np.ndarray, buffer_m: float) -> str:
+        """Order-independent key for a set of cluster points and buffer distance"""
+        order = np.lexsort((lats, lons))
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.ascontiguousarray(lons[order]).tobytes())
+        digest.update(np.ascontiguousarray(lats[order]).tobytes())
+        digest.update(np.float64(round(buffer_m, 1)).tobytes())
+        digest.update(np.int64(self.max_vertices).tobytes())
+        return digest.hexdigest()
+
+    def build(self, lons, lats, buffer_m: float) -> Dict:
+        """Return the cluster polygon as a GeoJSON geometry dict"""
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+
+        key = self.fingerprint(lons, lats, buffer_m)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        polygon = self._build_uncached(lons, lats, buffer_m)
+
+        self._cache[key] = polygon
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+        return polygon
+
+    def _build_uncached(self, lons: np.ndarray, lats: np.ndarray, buffer_m: float) -> Dict:
+        lon0 = float(lons.mean())
+        lat0 = float(lats.mean())
+        xy = _to_local_metric(lons, lats, lon0, lat0)
+
+        # Hull of the raw coordinates: a point, segment or polygon depending on input
+        hull = shapely.convex_hull(shapely.multipoints(xy))
+        area = shapely.buffer(hull, max(buffer_m, 1.0), quad_segs=8)
+        area = self._simplify_to_budget(area, buffer_m)
+
+        ring = _from_local_metric(np.asarray(area.exterior.coords), lon0, lat0)
+        ring = np.round(ring, self.coordinate_precision)
+
+        return {"type": "Polygon", "coordinates": [ring.tolist()]}
+
+    def _simplify_to_budget(self, area, buffer_m: float):
+        """Douglas-Peucker with a growing tolerance until the ring fits the vertex budget"""
+        tolerance = max(buffer_m, 1.0) * 0.01
+        simplified = area
+
+        for _ in range(16):
+            if len(simplified.exterior.coords) - 1 <= self.max_vertices:
+                return simplified
+            simplified = shapely.simplify(area, tolerance, preserve_topology=True)
+            tolerance *= 2
+
+        logger.warning(f"Cluster polygon kept {len(simplified.exterior.coords) - 1} vertices "
+                       f"(budget {self.max_vertices})")
+        return simplified
+
+    def cache_info(self) -> Dict[str, int]:
+        return {"size": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+
+# Shared across HotspotDetector instances, which are created per DB session
+polygon_builder = ClusterPolygonBuilder()
@@ -4,11 +4,10 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 import logging
 from datetime import datetime, timedelta
-import geojson
-from shapely.geometry import Point, Polygon
-from shapely.ops import unary_union
 import math
 
+from .cluster_geometry import polygon_builder
+
 logger = logging.getLogger(__name__)
 
 class HotspotDetector:
@@ -19,6 +18,7 @@ class HotspotDetector:
         self.cluster_distance_km = 5.0  # 5km clustering radius
         self.min_reports_for_hotspot = 3
         self.threat_threshold = 6.0
+        self.polygon_builder = polygon_builder
         
     def detect_hotspots(self, time_window_hours: int = 24) -> List[Dict]:
         """Detect hazard hotspots using spatial-temporal clustering"""
@@ -182,26 +182,14 @@ class HotspotDetector:
     
     def _generate_cluster_polygon(self, reports: List[Dict], radius_km: float) -> Dict:
         """Generate a polygon representing the cluster area"""
-        if len(reports) == 1:
-            # Single point - create circle
-            center = Point(reports[0]['longitude'], reports[0]['latitude'])
-            # Convert km to degrees (rough approximation)
-            radius_deg = radius_km / 111.0  # 1 degree ≈ 111 km
-            polygon = center.buffer(radius_deg)
-        else:
-            # Multiple points - create convex hull with buffer
-            points = [Point(r['longitude'], r['latitude']) for r in reports]
-            if len(points) >= 3:
-                polygon = unary_union(points).convex_hull
-                # Add buffer for safety zone
-                buffer_deg = (radius_km * 0.5) / 111.0
-                polygon = polygon.buffer(buffer_deg)
-            else:
-                # Two points - create line with buffer
-                polygon = unary_union(points).buffer(radius_km / 111.0)
+        lons = np.fromiter((r['longitude'] for r in reports), dtype=np.float64, count=len(reports))
+        lats = np.fromiter((r['latitude'] for r in reports), dtype=np.float64, count=len(reports))
+        
+        # Hulls of 3+ points get half the radius as safety margin, points and
+        # segments the full radius (same margins as before, now in metres)
+        buffer_km = radius_km * 0.5 if len(reports) >= 3 else radius_km
         
-        # Convert to GeoJSON
-        return geojson.loads(geojson.dumps(polygon))
+        return self.polygon_builder.build(lons, lats, buffer_km * 1000)
     
     def _haversine_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calculate distance between two points using Haversine formula"""
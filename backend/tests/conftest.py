@@ -0,0 +1,43 @@
+"""
+Shared fixtures for the database-backed tests
+They need a disposable PostGIS database named by TEST_DATABASE_URL and are
+skipped when it is not set, e.g. TEST_DATABASE_URL=postgresql://postgres@localhost/atlas_test
+"""
+import os
+import sys
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+if TEST_DATABASE_URL:
+    # app.config reads this when first imported, so it must be set before any app module loads
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+@pytest.fixture(scope="session")
+def app_modules():
+    """Import the app package, skipping when its dependencies are missing"""
+    pytest.importorskip("pydantic_settings")
+    pytest.importorskip("geoalchemy2")
+    from app.database import Base, engine
+    from app.models import db_models
+    return Base, engine, db_models
+
+@pytest.fixture(scope="session")
+def db_engine(app_modules):
+    """Engine on the test database with the schema and partitions created"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    from sqlalchemy import text
+    from app.services.partitioning import ensure_partitions
+
+    Base, engine, _ = app_modules
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+    Base.metadata.create_all(bind=engine)
+    ensure_partitions()
+    yield engine
+    Base.metadata.drop_all(bind=engine)
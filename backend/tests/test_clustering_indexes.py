@@ -0,0 +1,95 @@
+"""
+Plan regression tests for the hotspot clustering inputs
+CLUSTERING_CANDIDATES_QUERY filters on created_at and the confidence threshold
+only; it has no spatial predicate, so the GIST indexes on geom are not
+expected in its plan. What it must use are the BRIN and partial indexes from
+migration 001 (on every partition of reports and social_posts).
+"""
+import os
+import pytest
+from sqlalchemy import text
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+REPORT_INDEXES = {"ix_reports_cluster_candidates", "ix_reports_created_at_brin"}
+SOCIAL_INDEXES = {"ix_social_posts_cluster_candidates", "ix_social_posts_created_at_brin"}
+
+PARENT_INDEX_QUERY = text("""
+    SELECT parent.relname FROM pg_inherits i
+    JOIN pg_class child ON child.oid = i.inhrelid
+    JOIN pg_class parent ON parent.oid = i.inhparent
+    WHERE child.relname = :name
+""")
+
+def _plan_nodes(node):
+    yield node
+    for child in node.get("Plans", ()):
+        yield from _plan_nodes(child)
+
+def _root_index(conn, name: str) -> str:
+    """Partitioned index a partition's index was created from (itself if none)"""
+    while True:
+        parent = conn.execute(PARENT_INDEX_QUERY, {"name": name}).scalar()
+        if parent is None:
+            return name
+        name = parent
+
+def _explain(conn) -> list:
+    from app.config import settings
+    from app.services.hotspot_detection import CLUSTERING_CANDIDATES_QUERY
+
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = conn.execute(
+        text("EXPLAIN (FORMAT JSON) " + CLUSTERING_CANDIDATES_QUERY.text),
+        {
+            "window_hours": settings.cluster_time_window_hours,
+            "eps_meters": float(settings.cluster_eps_meters),
+            "min_points": settings.cluster_min_points
+        }
+    ).scalar()
+    return list(_plan_nodes(plan[0]["Plan"]))
+
+def _is_table(relation: str, table: str) -> bool:
+    return relation == table or relation.startswith(f"{table}_p") or relation == f"{table}_default"
+
+def test_clustering_query_uses_time_indexes(db_engine):
+    with db_engine.begin() as conn:
+        nodes = _explain(conn)
+        used = {_root_index(conn, node["Index Name"]) for node in nodes if "Index Name" in node}
+
+    seq_scans = [node["Relation Name"] for node in nodes if node["Node Type"] == "Seq Scan"]
+    assert not [r for r in seq_scans if _is_table(r, "reports") or _is_table(r, "social_posts")], seq_scans
+    assert used & REPORT_INDEXES, used
+    assert used & SOCIAL_INDEXES, used
+
+def test_partial_index_predicates_match_query():
+    """The planner only uses a partial index whose predicate the query implies,
+    so the literal threshold in the query has to match the index definitions
+
+    Needs no database; it also fails if the models stop importing.
+    """
+    from app.models import db_models
+    from app.services.hotspot_detection import CLUSTERING_CANDIDATES_QUERY
+
+    threshold = db_models.CLUSTER_CONFIDENCE_THRESHOLD
+    indexes = {
+        index.name: str(index.dialect_options["postgresql"]["where"])
+        for table in (db_models.Report.__table__, db_models.SocialPost.__table__)
+        for index in table.indexes
+    }
+
+    assert str(threshold) in indexes["ix_reports_cluster_candidates"]
+    assert str(threshold) in indexes["ix_social_posts_cluster_candidates"]
+    assert f"confidence >= {threshold}" in CLUSTERING_CANDIDATES_QUERY.text
+    assert f"relevance >= {threshold}" in CLUSTERING_CANDIDATES_QUERY.text
+
+@pytest.mark.parametrize("migration", ["001_clustering_indexes.sql", "002_partition_append_only_tables.sql"])
+def test_migration_index_predicates_match_threshold(migration):
+    """Migrations create the same partial indexes with the threshold as a literal"""
+    from app.models.db_models import CLUSTER_CONFIDENCE_THRESHOLD
+
+    with open(os.path.join(MIGRATIONS_DIR, migration)) as f:
+        sql = f.read()
+
+    assert f"WHERE confidence >= {CLUSTER_CONFIDENCE_THRESHOLD};" in sql
+    assert f"WHERE relevance >= {CLUSTER_CONFIDENCE_THRESHOLD} AND geom IS NOT NULL;" in sql
@@ -0,0 +1,49 @@
+"""
+The nightly trust recompute writes build_aggregates_bulk's aggregates, and
+record_event keeps folding events into them afterwards; both must describe
+the same state, or a reporter's score jumps between the two definitions.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from ml.trust_score_engine import EVENT_TYPES, TrustEvent, TrustEventColumns, TrustScoreEngine
+
+def _events(seed: int = 7):
+    rng = random.Random(seed)
+    start = datetime.utcnow() - timedelta(days=300)
+    events = []
+    for user in range(12):
+        timestamp = start
+        for _ in range(rng.randint(1, 150)):
+            timestamp += timedelta(hours=rng.random() * 40)
+            events.append(TrustEvent(
+                user_id=f"user-{user}",
+                event_type=rng.choice(EVENT_TYPES),
+                timestamp=timestamp,
+                confidence=rng.random(),
+                report_complexity=rng.random(),
+                verification_source=rng.choice(["analyst", "volunteer", "unknown"]),
+                location_accuracy=rng.random(),
+                time_to_verify=timedelta(hours=rng.choice([0, 0.5, 4, 30]))
+            ))
+    return events
+
+def test_bulk_aggregates_match_incremental_fold():
+    events = _events()
+    incremental = TrustScoreEngine()
+    for event in sorted(events, key=lambda e: e.timestamp):
+        incremental.record_event(event)
+
+    now = datetime.utcnow()
+    bulk = TrustScoreEngine().build_aggregates_bulk(TrustEventColumns.from_events(events))
+    assert len(bulk) == 12
+    for aggregate in bulk:
+        folded = incremental.store.get(aggregate.user_id)
+        assert aggregate.total == folded.total
+        assert aggregate.counts == folded.counts
+        assert list(aggregate.window) == list(folded.window)
+        assert list(aggregate.window_accuracies) == pytest.approx(list(folded.window_accuracies))
+        assert aggregate.decayed_total == pytest.approx(folded.decayed_total)
+        assert incremental.score_aggregate(aggregate, now) == incremental.score_aggregate(folded, now)
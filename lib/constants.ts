@@ -146,6 +146,8 @@ export const SOCIAL_MEDIA_PLATFORMS = {
   },
 } as const
 
+export type VectorTileLayer = "reports" | "zones" | "hotspots"
+
 export const API_ENDPOINTS = {
   // Reports
   REPORTS: "/api/reports",
@@ -173,6 +175,9 @@ export const API_ENDPOINTS = {
   // Hotspots
   HOTSPOTS: "/api/hotspots",
 
+  // Vector tiles (reports, zones, hotspots)
+  VECTOR_TILE: (layer: VectorTileLayer, z: number, x: number, y: number) => `/api/tiles/${layer}/${z}/${x}/${y}.mvt`,
+
   // Media
   MEDIA_UPLOAD: "/api/media/upload",
   MEDIA_PRESIGN: "/api/media/presign",
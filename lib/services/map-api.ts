@@ -1,3 +1,5 @@
+import { API_ENDPOINTS, type VectorTileLayer } from "@/lib/constants"
+
 export interface MapboxConfig {
   accessToken: string
   style: string
@@ -449,6 +451,62 @@ export class MapAPIService {
   }
 }
 
+export interface TileCoord {
+  z: number
+  x: number
+  y: number
+}
+
+/**
+ * XYZ tiles covering the visible bounds at a zoom level
+ */
+export function getVisibleTiles(bounds: MapBounds, zoom: number): TileCoord[] {
+  const z = Math.max(0, Math.min(22, Math.round(zoom)))
+  const n = 2 ** z
+  const clampLat = (lat: number) => Math.max(-85.0511, Math.min(85.0511, lat))
+  const tileX = (lng: number) => Math.min(n - 1, Math.max(0, Math.floor(((lng + 180) / 360) * n)))
+  const tileY = (lat: number) => {
+    const rad = (clampLat(lat) * Math.PI) / 180
+    const y = Math.floor(((1 - Math.log(Math.tan(rad) + 1 / Math.cos(rad)) / Math.PI) / 2) * n)
+    return Math.min(n - 1, Math.max(0, y))
+  }
+
+  const tiles: TileCoord[] = []
+  for (let x = tileX(bounds.west); x <= tileX(bounds.east); x++) {
+    for (let y = tileY(bounds.north); y <= tileY(bounds.south); y++) {
+      tiles.push({ z, x, y })
+    }
+  }
+  return tiles
+}
+
+/**
+ * Fetch the vector tiles of a layer that intersect the viewport.
+ * Tiles are served with ETags, so unchanged tiles revalidate from the browser cache.
+ * Empty tiles (HTTP 204) are omitted from the result.
+ */
+export async function fetchVisibleTiles(
+  layer: VectorTileLayer,
+  bounds: MapBounds,
+  zoom: number,
+  baseUrl = "",
+): Promise<Array<TileCoord & { data: ArrayBuffer }>> {
+  const tiles = getVisibleTiles(bounds, zoom)
+  const results = await Promise.all(
+    tiles.map(async (tile) => {
+      try {
+        const response = await fetch(`${baseUrl}${API_ENDPOINTS.VECTOR_TILE(layer, tile.z, tile.x, tile.y)}`)
+        if (response.status !== 200) return null
+        return { ...tile, data: await response.arrayBuffer() }
+      } catch (error) {
+        console.error("[v0] Vector tile fetch error:", error)
+        return null
+      }
+    }),
+  )
+  return results.filter((tile): tile is TileCoord & { data: ArrayBuffer } => tile !== null)
+}
+
 /**
  * Create a map API service instance
  */